@@ -7,6 +7,7 @@ from typing import Literal, List, Optional
 from datetime import date, timedelta, datetime
 import requests
 import json
+import os
 
 app = FastAPI()
 
@@ -458,7 +459,12 @@ def activity_information(information: UpdateActivity):
         "activity": activity_for_scheduler,
         "calendar": calendar_info_for_scheduler
     }
-    scheduler_new_info = requests.post("http://scheduler:8001/scheduler/logic/activity/", json=scheduler_info)
+    # Presupuesto de tiempo opcional de la búsqueda para acotar la latencia del organizador
+    if os.getenv("SCHEDULER_DEADLINE_MS"):
+        scheduler_info["deadlineMs"] = int(os.getenv("SCHEDULER_DEADLINE_MS"))
+    # Las soluciones llegan en el formato compacto del scheduler (fecha de inicio, desplazamientos y horas)
+    scheduler_new_info = requests.post("http://scheduler:8001/scheduler/logic/activity/", json=scheduler_info,
+                                       headers={"Accept": "application/vnd.uc3m.scheduler.compact+json"})
     scheduler_response = scheduler_new_info.json()
     
 
@@ -490,19 +496,21 @@ def activity_information(information: UpdateActivity):
 
     newCalendarPayload = []
     newSchedulePayload = []
-    for date in chosen_solution["schedule"]:
+    solution_start = date.fromisoformat(chosen_solution["startDate"])
+    holidays = set(chosen_solution["holidays"])
+    for i, (offset, hours) in enumerate(zip(chosen_solution["offsets"], chosen_solution["hours"])):
+        calendarDate = (solution_start + timedelta(days=offset)).isoformat()
+        dayType = "Festivo" if i in holidays else "Normal"
         newSchedulePayload.append({
-            "calendarDate": date["calendarDate"],
-            "hours": date["assignedHours"],
+            "calendarDate": calendarDate,
+            "hours": hours,
             "activityId": activityId
         })
-        
-    for date in chosen_solution["modifiedCalendar"]:
         newCalendarPayload.append({
-            "calendarDate": date["calendarDate"],
-            "dayType": date["dayType"],
-            "weekDay": obtener_dia_semana(date["calendarDate"]),
-            "status": date["status"]
+            "calendarDate": calendarDate,
+            "dayType": dayType,
+            "weekDay": obtener_dia_semana(calendarDate),
+            "status": "Ocupado" if hours == (4 if dayType == "Normal" else 8) else "Libre"
         })
     
     calendar_creation_confirmation = requests.post("http://backend_api:8000/scheduler/days/", json=newCalendarPayload)
@@ -1,19 +1,52 @@
-from fastapi import FastAPI, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse, StreamingResponse, PlainTextResponse, ORJSONResponse
 from fastapi.encoders import jsonable_encoder
-from pydantic import BaseModel, conint, model_validator
+from pydantic import BaseModel, conint, conlist, constr, model_validator
 from typing import Literal, List, Optional
-from datetime import date
+from datetime import date, timedelta
+from contextlib import asynccontextmanager
+import threading
+import asyncio
+import json
+import time
+import numpy as np
 import scheduler as SchedulerController
+import solve_queue as SolveQueueController
+import schedule_cache as ScheduleCacheController
+import metrics as MetricsController
+import capacity_simulation as CapacitySimulationController
+import load_analytics as LoadAnalyticsController
 
-app = FastAPI()
+""" Cola de resoluciones, caché de resultados y métricas compartidas por todas las peticiones """
+solve_queue = SolveQueueController.SolveQueue()
+schedule_cache = ScheduleCacheController.ScheduleCache()
+scheduler_metrics = MetricsController.SchedulerMetrics()
+# Estado de preparación del proceso: sólo está listo tras la resolución de calentamiento
+readiness = {"ready": False, "warmUpSeconds": None}
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    started = time.perf_counter()
+    await solve_queue.warm_up()
+    readiness.update(ready=True, warmUpSeconds=round(time.perf_counter() - started, 3))
+    yield
+    readiness["ready"] = False
+    solve_queue.shutdown()
+
+app = FastAPI(lifespan=lifespan)
 
 """ Definición del formato de las peticiones """
+class Cohort(BaseModel):
+    degree: constr(min_length=1)
+    year: conint(ge=1,le=4)
+
 class Activity(BaseModel):
     estimatedHours: conint(ge=0)
-    strategy: Literal["Agresiva","Calmada","Completa"]
+    strategy: Literal["Agresiva","Calmada","Completa","FinesDeSemana","Holgada"]
     startOfActivity: Optional[date] = None
     endOfActivity: date
+    # Cohorte (grado y curso) de la actividad; sin ella se usa la capacidad de todos los alumnos
+    cohort: Optional[Cohort] = None
 
     class Config:
         extra = "forbid"
@@ -22,10 +55,35 @@ class Calendar(BaseModel):
     calendarDate: date
     dayType: Literal["Festivo","Normal"]
     totalHoursBusy: conint(ge=0)
+    # Franjas de una hora ocupadas por clases (0-3 Normal / 0-7 Festivo), sólo para el motor "Franjas"
+    busySlots: Optional[List[conint(ge=0, le=7)]] = None
+
+class CohortBusyHours(Cohort):
+    """ Horas ocupadas de una cohorte en un día, además de totalHoursBusy. Sólo se envían los días con horas de la cohorte """
+    calendarDate: date
+    hours: conint(ge=1)
+
+class ScheduledDay(BaseModel):
+    calendarDate: date
+    hours: conint(ge=1)
 
 class ScheduleActivity(BaseModel):
     activity: Activity
     calendar: List[Calendar]
+    searchMode: Literal["Iterativa","Unica","Incremental"] = "Iterativa"
+    engine: Literal["Enumeracion","Optimizacion","Diversa","Franjas"] = "Enumeracion"
+    # Número de planes distintos entre sí que se piden con el motor "Diversa"
+    diverseSolutions: conint(ge=1, le=10) = 5
+    # Máximo de horas seguidas de la actividad en un mismo día con el motor "Franjas". Por defecto no hay límite dentro del día,
+    # así que Franjas admite las mismas horas que el resto de motores; con un límite menor algunos días admiten menos horas
+    maxConsecutiveHours: conint(ge=1, le=8) = 8
+    # Plan anterior de la actividad al editarla: pista para el solver y, con minimizeDeviation, plan del que apartarse lo mínimo.
+    # Con minimizeDeviation el motor "Enumeracion" resuelve con "Optimizacion" y "Diversa" no se admite
+    previousSchedule: Optional[List[ScheduledDay]] = None
+    minimizeDeviation: bool = False
+    # Presupuesto de tiempo de la búsqueda; al agotarse se devuelven las soluciones encontradas con metadata.partial
+    deadlineMs: Optional[conint(gt=0)] = None
+    cohortBusyHours: List[CohortBusyHours] = []
 
     @model_validator(mode="after")
     def check_calendar_days(self) -> 'ScheduleActivity':
@@ -43,29 +101,375 @@ class ScheduleActivity(BaseModel):
         
         return self
 
+    @model_validator(mode="after")
+    def check_minimize_deviation(self) -> 'ScheduleActivity':
+        """ El motor "Diversa" busca planes distintos entre sí y no puede minimizar la desviación respecto al plan anterior """
+        if self.minimizeDeviation and self.previousSchedule and self.engine == "Diversa":
+            raise ValueError("minimizeDeviation is not supported with the Diversa engine.")
+        return self
+
+class ColumnarCalendar(BaseModel):
+    """ Calendario en columnas: fechas ascendentes y contiguas con el tipo de día y las horas ocupadas de cada una en la misma posición """
+    dates: conlist(date, min_length=1)
+    dayTypes: List[Literal["Festivo","Normal"]]
+    busyHours: List[conint(ge=0)]
+
+    @model_validator(mode="after")
+    def check_columns(self) -> 'ColumnarCalendar':
+        """ Comprueba todas las fechas a la vez: mismas longitudes y diferencia de un día entre cada fecha y la anterior """
+        if not len(self.dates) == len(self.dayTypes) == len(self.busyHours):
+            raise ValueError(f"Calendar columns must have the same length. They have {len(self.dates)}, {len(self.dayTypes)} and {len(self.busyHours)}.")
+        steps = np.diff(np.array(self.dates, dtype="datetime64[D]").astype(np.int64))
+        if (steps <= 0).any():
+            raise ValueError(f"Calendar dates must be sorted and not repeated. Position {int(np.argmax(steps <= 0)) + 1} is not after the previous date.")
+        if (steps > 1).any():
+            raise ValueError(f"Calendar dates must be contiguous. There is a gap after position {int(np.argmax(steps > 1))}.")
+        return self
+
+class ScheduleActivityColumnar(ScheduleActivity):
+    calendar: ColumnarCalendar
+
+    @model_validator(mode="after")
+    def check_calendar_days(self) -> 'ScheduleActivityColumnar':
+        """ Comprueba la cantidad de días igual que la lista de días (exactamente 21 sin fecha de inicio) y que el calendario cubre la
+            ventana de la actividad y los 3 días de margen tras la fecha de fin. Como las fechas son contiguas basta con comparar la primera y la última """
+        if not self.activity.startOfActivity and len(self.calendar.dates) != 21:
+            raise ValueError(f"Call expected 21 days on the Calendar columns. It was given {len(self.calendar.dates)}.")
+        end = self.activity.endOfActivity + timedelta(days=3)
+        start = self.activity.startOfActivity or self.activity.endOfActivity - timedelta(days=17)
+        if self.calendar.dates[0] > start or self.calendar.dates[-1] < end:
+            raise ValueError(f"Call expected the Calendar columns to cover from {start} to {end}. They cover from {self.calendar.dates[0]} to {self.calendar.dates[-1]}.")
+        return self
+
+class ScheduleActivities(BaseModel):
+    activities: conlist(Activity, min_length=1)
+    calendar: List[Calendar]
+    cohortBusyHours: List[CohortBusyHours] = []
+
+    @model_validator(mode="after")
+    def check_calendar_coverage(self) -> 'ScheduleActivities':
+        """ Comprueba que el calendario cubre la ventana de cada una de las actividades """
+        calendar_dates = {day.calendarDate for day in self.calendar}
+        for i, activity in enumerate(self.activities):
+            start = activity.startOfActivity or activity.endOfActivity - timedelta(days=14)
+            missing = [start + timedelta(days=d) for d in range((activity.endOfActivity - start).days + 1) if start + timedelta(days=d) not in calendar_dates]
+            if missing:
+                raise ValueError(f"Activity {i} expected the Calendar list to cover from {start} to {activity.endOfActivity}. It is missing {len(missing)} days.")
+        return self
+
+class RepairActivity(Activity):
+    activityId: int
+    # Plan actual de la actividad; vacío si hay que organizarla de nuevo
+    schedule: List[ScheduledDay] = []
+
+class ScheduleRepair(ScheduleActivities):
+    activities: conlist(RepairActivity, min_length=1)
+    # Días con horas liberadas (actividad borrada) o requeridas (actividad actualizada)
+    changedDays: List[date] = []
+
+class AnalyticsDay(BaseModel):
+    calendarDate: date
+    dayType: Literal["Festivo","Normal"]
+
+class AnalyticsScheduledHours(BaseModel):
+    calendarDate: date
+    hours: conint(ge=1)
+    activityId: int
+    subjectId: int
+
+class LoadAnalytics(BaseModel):
+    calendar: conlist(AnalyticsDay, min_length=1)
+    # Filas de 'schedule' con la asignatura de su actividad
+    schedule: List[AnalyticsScheduledHours] = []
+
+""" Mensajes de la respuesta según el código devuelto por el Organizador """
+RESULT_MESSAGES = {
+    200: "Assigned activity to the scheduler successfully.",
+    201: "Assigned activity to the scheduler successfully. However, the endOfActivity given had to be changed in order to schedule it properly.",
+    401: "Could not assign the activity to the scheduler successfully.",
+    503: "Scheduler is saturated. Try again later.",
+    505: "Unknown Error"
+}
+
+def encode_event(event, data, sse):
+    """ Serializa un evento de la respuesta en streaming como una línea NDJSON o como un Server-Sent Event """
+    payload = json.dumps(jsonable_encoder(dict(event=event, **data)))
+    if sse:
+        return f"event: {event}\ndata: {payload}\n\n"
+    return payload + "\n"
+
+""" Formato compacto de las soluciones: fecha de inicio, desplazamientos en días y horas en columnas """
+COMPACT_MEDIA_TYPE = "application/vnd.uc3m.scheduler.compact+json"
+
+def compact_requested(request):
+    """ Indica si el cliente ha pedido el formato compacto con la cabecera Accept o con ?format=compact """
+    return request.query_params.get("format") == "compact" or COMPACT_MEDIA_TYPE in request.headers.get("accept", "")
+
+def compact_solution(solution):
+    """ Solución en columnas: offsets son los días desde startDate, hours las horas de cada uno y holidays las posiciones festivas.
+        El estado de cada día del calendario se deduce de las horas (Ocupado si completa 4 horas Normal u 8 Festivo) """
+    schedule = solution["schedule"]
+    start = min((day["calendarDate"] for day in schedule), default=None)
+    compact = {key: value for key, value in solution.items() if key not in ("schedule", "modifiedCalendar")}
+    compact.update(
+        startDate=start,
+        offsets=[(day["calendarDate"] - start).days for day in schedule],
+        hours=[day["assignedHours"] for day in schedule],
+        holidays=[i for i, day in enumerate(solution["modifiedCalendar"]) if day["dayType"] == "Festivo"])
+    return compact
+
+def compact_response(status_code, content):
+    """ Respuesta en formato compacto serializada con orjson """
+    return ORJSONResponse(status_code=status_code, content=content, media_type=COMPACT_MEDIA_TYPE)
+
+def debug_requested(request):
+    """ Indica si el cliente ha pedido el bloque 'diagnostics' con la cabecera X-Scheduler-Debug """
+    return request.headers.get("x-scheduler-debug", "").lower() in ("1", "true")
+
+def search_options(information):
+    """ Opciones de search_day_to_assign de una petición; también forman parte de la clave de la caché """
+    # "Unica" e "Incremental" se mantienen por compatibilidad como alias de "Iterativa", que ya construye un único modelo por petición
+    options = {"search_mode": "Iterativa" if information.searchMode in ("Unica", "Incremental") else information.searchMode, "engine": information.engine}
+    if information.engine == "Diversa":
+        options["diverse_solutions"] = information.diverseSolutions
+    if information.engine == "Franjas":
+        options["max_consecutive_hours"] = information.maxConsecutiveHours
+    if information.previousSchedule:
+        options["previous_schedule"] = [day.dict() for day in information.previousSchedule]
+        options["minimize_deviation"] = information.minimizeDeviation
+    if information.activity.cohort and information.cohortBusyHours:
+        vectors = SchedulerController.Scheduler.cohort_busy_vectors([row.dict() for row in information.cohortBusyHours])
+        options["cohort_busy"] = vectors.get(SchedulerController.Scheduler.cohort_key(information.activity.cohort.dict()), [])
+    return options
+
+def merge_diagnostics(diagnostics):
+    """ Telemetría de un lote resuelto en varios subproblemas: suma los tiempos y contadores de todos """
+    merged = dict(diagnostics[0], subproblems=len(diagnostics))
+    for other in diagnostics[1:]:
+        for key, value in other.items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                merged[key] = merged.get(key, 0) + value
+    return merged
+
+def split_diagnostics(metadata, cached, result):
+    """ Separa la telemetría de los metadatos de la respuesta y la añade a las métricas si la búsqueda no viene de la caché """
+    metadata = dict(metadata, cached=bool(cached))
+    diagnostics = metadata.pop("diagnostics", None)
+    if diagnostics and not cached:
+        scheduler_metrics.record(diagnostics, result)
+    return metadata, diagnostics
+
 """ Endpoints relacionados con la Lógica del Organizador """
-@app.post("/scheduler/logic/activity/", description= "CreateCalendarScheduledActivities", tags=["Scheduler"])
-def create_calendar_scheduled_activities(information: ScheduleActivity):
-    scheduler = SchedulerController.Scheduler()
-    result, solutions = scheduler.search_day_to_assign(
-            activity=information.activity.dict(),
-            calendar=[calendar.dict() for calendar in information.calendar])
+async def schedule_activity(information, calendar, request):
+    """ Organiza la actividad de la petición con la caché y la cola de resoluciones. calendar es la lista de días o el índice ya construido """
+    activity = information.activity.dict()
+    options = search_options(information)
+    cache_key = schedule_cache.key(activity, calendar, options)
+    cached = schedule_cache.get(cache_key)
+    if cached:
+        result, solutions, metadata = cached
+    else:
+        try:
+            result, solutions, metadata = await solve_queue.submit(SolveQueueController.run_search, activity, calendar, dict(options, deadline_ms=information.deadlineMs))
+        except SolveQueueController.SolveQueueSaturated:
+            raise HTTPException(status_code=503, detail=RESULT_MESSAGES[503], headers={"Retry-After": str(solve_queue.retry_after)})
+        # Los resultados parciales dependen del presupuesto de tiempo y no se guardan en la caché
+        if result in (200, 201, 401) and not metadata.get("partial"):
+            schedule_cache.set(cache_key, (result, solutions, metadata))
+    metadata, diagnostics = split_diagnostics(metadata, cached, result)
+    debug = {"diagnostics": diagnostics} if debug_requested(request) else {}
+    if result in (200, 201) and compact_requested(request):
+        return compact_response(result, {
+            "result": result,
+            "message": RESULT_MESSAGES[result],
+            "solutions": [compact_solution(solution) for solution in solutions],
+            "metadata": metadata,
+            **debug
+            })
     match result:
         case 200:
             return {
                 "result": result, 
-                "message": "Assigned activity to the scheduler successfully.",
-                "solutions": solutions
+                "message": RESULT_MESSAGES[200],
+                "solutions": solutions,
+                "metadata": metadata,
+                **debug
                 }
         case 201:
             return JSONResponse(status_code=201,content=jsonable_encoder({
                 "result": result, 
-                "message": "Assigned activity to the scheduler successfully. However, the endOfActivity given had to be changed in order to schedule it properly.",
-                "solutions": solutions
+                "message": RESULT_MESSAGES[201],
+                "solutions": solutions,
+                "metadata": metadata,
+                **debug
                 }))
         case 401:
-            raise HTTPException(status_code=401, detail="Could not assign the activity to the scheduler successfully.")
+            # Se mantiene el campo 'detail' de HTTPException y se añaden los metadatos de la búsqueda
+            return JSONResponse(status_code=401,content=jsonable_encoder({
+                "detail": RESULT_MESSAGES[401],
+                "metadata": metadata,
+                **debug
+                }))
         case 505:
-            raise HTTPException(status_code=505, detail="Unknown Error")
+            raise HTTPException(status_code=505, detail=RESULT_MESSAGES[505])
         case _:
-            raise HTTPException(status_code=400, detail="Unknown Code")
\ No newline at end of file
+            raise HTTPException(status_code=400, detail="Unknown Code")
+
+@app.post("/scheduler/logic/activity/", description= "CreateCalendarScheduledActivities", tags=["Scheduler"])
+async def create_calendar_scheduled_activities(information: ScheduleActivity, request: Request):
+    return await schedule_activity(information, [calendar.dict() for calendar in information.calendar], request)
+
+@app.post("/scheduler/logic/activity/columnar", description= "CreateCalendarScheduledActivitiesColumnar", tags=["Scheduler"])
+async def create_calendar_scheduled_activities_columnar(information: ScheduleActivityColumnar, request: Request):
+    """ Misma petición con el calendario en columnas, que se convierte directamente en el índice del Organizador sin objetos por día """
+    calendar = information.calendar
+    return await schedule_activity(information, SchedulerController.CalendarIndex.from_columns(calendar.dates, calendar.dayTypes, calendar.busyHours), request)
+
+@app.post("/scheduler/logic/activity/stream", description= "StreamCalendarScheduledActivities", tags=["Scheduler"])
+async def stream_calendar_scheduled_activities(information: ScheduleActivity, request: Request):
+    """ Variante en streaming: cada solución se envía en cuanto el solver la encuentra y el último evento lleva el código del resultado.
+        Devuelve Server-Sent Events si la cabecera Accept incluye text/event-stream y NDJSON en otro caso """
+    activity = information.activity.dict()
+    calendar = [calendar.dict() for calendar in information.calendar]
+    options = search_options(information)
+    sse = "text/event-stream" in request.headers.get("accept", "")
+    cache_key = schedule_cache.key(activity, calendar, options)
+    cached = schedule_cache.get(cache_key)
+    if not cached and solve_queue.saturated():
+        raise HTTPException(status_code=503, detail=RESULT_MESSAGES[503], headers={"Retry-After": str(solve_queue.retry_after)})
+    loop = asyncio.get_running_loop()
+    found_solutions = asyncio.Queue()
+    cancelled = threading.Event()
+
+    async def stream():
+        if cached:
+            result, solutions, metadata = cached
+            for solution in solutions or []:
+                yield encode_event("solution", {"solution": solution}, sse)
+        else:
+            # El solver se ejecuta en un hilo del propio proceso para poder recibir sus soluciones a medida que aparecen
+            search = asyncio.ensure_future(solve_queue.submit(
+                SolveQueueController.run_search, activity, calendar, dict(options, deadline_ms=information.deadlineMs),
+                lambda solution: loop.call_soon_threadsafe(found_solutions.put_nowait, solution), cancelled, local=True))
+            search.add_done_callback(lambda _search: found_solutions.put_nowait(None))
+            try:
+                while (solution := await found_solutions.get()) is not None:
+                    yield encode_event("solution", {"solution": solution}, sse)
+            finally:
+                # Si el cliente cierra la conexión antes de terminar, la búsqueda se detiene (StopSearch) en la siguiente solución
+                cancelled.set()
+            try:
+                result, solutions, metadata = search.result()
+            except SolveQueueController.SolveQueueSaturated:
+                yield encode_event("result", {"result": 503, "message": RESULT_MESSAGES[503]}, sse)
+                return
+            if result in (200, 201, 401) and not metadata.get("partial"):
+                schedule_cache.set(cache_key, (result, solutions, metadata))
+        response_metadata, diagnostics = split_diagnostics(metadata, cached, result)
+        yield encode_event("result", {
+            "result": result,
+            "message": RESULT_MESSAGES.get(result, "Unknown Code"),
+            "metadata": response_metadata,
+            **({"diagnostics": diagnostics} if debug_requested(request) else {})
+        }, sse)
+
+    return StreamingResponse(stream(), media_type="text/event-stream" if sse else "application/x-ndjson")
+
+@app.post("/scheduler/logic/activities/batch", description= "CreateCalendarScheduledActivitiesBatch", tags=["Scheduler"])
+async def create_calendar_scheduled_activities_batch(information: ScheduleActivities, request: Request):
+    """ Las actividades de cohortes distintas no comparten capacidad: cada cohorte es un subproblema independiente.
+        Las actividades sin cohorte se organizan primero y sus horas se descuentan de la capacidad de todas las cohortes. El lote ocupa un único hueco de la cola de resoluciones, sea cual sea su número de cohortes, y dentro de él
+        las cohortes se resuelven con paralelismo limitado (SCHEDULER_BATCH_PARALLELISM) """
+    activities = [activity.dict() for activity in information.activities]
+    calendar = [calendar.dict() for calendar in information.calendar]
+    subproblems = SchedulerController.Scheduler.cohort_subproblems(activities, [row.dict() for row in information.cohortBusyHours])
+    try:
+        outputs = await solve_queue.submit(SolveQueueController.run_cohort_batch_search,
+                                           [(group, cohort_busy) for _positions, group, cohort_busy in subproblems], calendar)
+    except SolveQueueController.SolveQueueSaturated:
+        raise HTTPException(status_code=503, detail=RESULT_MESSAGES[503], headers={"Retry-After": str(solve_queue.retry_after)})
+    results = [None] * len(activities)
+    for (positions, _group, _cohort_busy), (group_results, group_diagnostics) in zip(subproblems, outputs):
+        scheduler_metrics.record(group_diagnostics, 200)
+        for position, result in zip(positions, group_results):
+            results[position] = result
+    diagnostics = merge_diagnostics([group_diagnostics for _results, group_diagnostics in outputs])
+    content = {
+        "result": 200,
+        "message": "Batch of activities processed. Check the result of each activity.",
+        "activities": [{"result": result, "solutions": solutions} for result, solutions in results],
+        **({"diagnostics": diagnostics} if debug_requested(request) else {})
+        }
+    if compact_requested(request):
+        for activity in content["activities"]:
+            activity["solutions"] = [compact_solution(solution) for solution in activity["solutions"]] if activity["solutions"] is not None else None
+        return compact_response(200, content)
+    return JSONResponse(status_code=200,content=jsonable_encoder(content))
+
+@app.post("/scheduler/logic/activities/repair", description= "RepairCalendarScheduledActivities", tags=["Scheduler"])
+async def repair_calendar_scheduled_activities(information: ScheduleRepair, request: Request):
+    activities = []
+    current_schedule = []
+    for activity in information.activities:
+        activity = activity.dict()
+        current_schedule += [{"activityId": activity["activityId"], "calendarDate": day["calendarDate"], "hours": day["hours"]} for day in activity.pop("schedule")]
+        activities.append(activity)
+    try:
+        result, diff, metadata = await solve_queue.submit(
+            SolveQueueController.run_repair,
+            activities,
+            [calendar.dict() for calendar in information.calendar],
+            current_schedule,
+            information.changedDays)
+    except SolveQueueController.SolveQueueSaturated:
+        raise HTTPException(status_code=503, detail=RESULT_MESSAGES[503], headers={"Retry-After": str(solve_queue.retry_after)})
+    diagnostics = metadata.pop("diagnostics")
+    scheduler_metrics.record(diagnostics, result)
+    return JSONResponse(status_code=200 if result == 200 else 401, content=jsonable_encoder({
+        "result": result,
+        "message": "Repaired the schedule of the affected activities." if result == 200 else RESULT_MESSAGES[401],
+        "changes": diff,
+        "metadata": metadata,
+        **({"diagnostics": diagnostics} if debug_requested(request) else {})
+        }))
+
+@app.post("/scheduler/logic/activities/simulate", description= "SimulateCalendarCapacity", tags=["Scheduler"])
+def simulate_calendar_capacity(information: ScheduleActivities):
+    """ Simulación de solo lectura para coordinadores: viabilidad, fecha de fin más temprana y carga por día de actividades hipotéticas.
+        Se evalúa en el propio proceso y no ocupa la cola de resoluciones: la pasada de NumPy tarda menos que enviar el calendario
+        a los procesos de la cola (ver benchmark_capacity_simulation) """
+    activities = [activity.dict() for activity in information.activities]
+    calendar = [calendar.dict() for calendar in information.calendar]
+    return JSONResponse(status_code=200, content=jsonable_encoder({
+        "result": 200,
+        "message": "Simulated the activities without assigning them.",
+        **CapacitySimulationController.simulate(activities, calendar)
+        }))
+
+@app.post("/scheduler/analytics/load", description= "CalendarLoadAnalytics", tags=["Scheduler"])
+def calendar_load_analytics(information: LoadAnalytics):
+    """ Utilización por día, carga por asignatura, picos de 7 días y días con más de la mitad de su capacidad ocupada (aboveBalanceDays)
+        en columnas desde startDate """
+    analytics = LoadAnalyticsController.analyze(
+        [day.dict() for day in information.calendar],
+        [row.dict() for row in information.schedule])
+    return ORJSONResponse(status_code=200, content={"result": 200, **analytics})
+
+@app.get("/scheduler/cache/", description= "ScheduleCacheStatistics", tags=["Scheduler"])
+def schedule_cache_statistics():
+    return {
+        "result": 200,
+        "cache": schedule_cache.stats()
+    }
+
+@app.get("/scheduler/ready", description= "SchedulerReadiness", tags=["Scheduler"])
+def scheduler_readiness():
+    """ Sonda de preparación: 503 hasta que el proceso termina la resolución de calentamiento """
+    if not readiness["ready"]:
+        return JSONResponse(status_code=503, content={"result": 503, "ready": False})
+    return {"result": 200, "ready": True, "warmUpSeconds": readiness["warmUpSeconds"]}
+
+@app.get("/metrics", description= "SchedulerMetrics", tags=["Scheduler"])
+def scheduler_metrics_export():
+    """ Métricas del Organizador en el formato de texto de Prometheus """
+    return PlainTextResponse(scheduler_metrics.render(), media_type="text/plain; version=0.0.4")
@@ -0,0 +1,89 @@
+import numpy as np
+from datetime import date, timedelta
+import scheduler as SchedulerController
+
+""" Simulación de capacidad sin escrituras: viabilidad, fecha de fin más temprana y carga por día de actividades hipotéticas.
+    Todas las actividades se evalúan a la vez con sumas prefijas de NumPy sobre el calendario en un array denso por día """
+
+
+def dense_calendar(calendar):
+    """ Calendario como arrays por día desde la primera fecha hasta la última: capacidad (4 Normal / 8 Festivo) y horas ocupadas.
+        Los días que faltan en el calendario no tienen capacidad """
+    ordinals = np.fromiter((day["calendarDate"].toordinal() for day in calendar), dtype=np.int64, count=len(calendar))
+    start = int(ordinals.min())
+    positions = ordinals - start
+    capacity = np.zeros(int(positions.max()) + 1, dtype=np.int64)
+    busy = np.zeros_like(capacity)
+    capacity[positions] = np.fromiter((4 if day["dayType"] == "Normal" else 8 for day in calendar), dtype=np.int64, count=len(calendar))
+    busy[positions] = np.fromiter((day["totalHoursBusy"] for day in calendar), dtype=np.int64, count=len(calendar))
+    return date.fromordinal(start), capacity, busy
+
+
+def strategy_free_hours(start, capacity, busy, strategy):
+    """ Horas libres de cada día para una estrategia del registro: sólo sus días de la semana y descontando su margen """
+    spec = SchedulerController.STRATEGIES[strategy]
+    free = np.maximum(capacity - busy - spec.buffer_hours, 0)
+    if spec.weekdays is not None:
+        weekdays = (start.weekday() + np.arange(len(free))) % 7
+        free[~np.isin(weekdays, spec.weekdays)] = 0
+    return free
+
+
+def simulate(activities, calendar):
+    """ Evalúa las actividades sobre el calendario sin organizarlas. Para cada actividad devuelve si su ventana tiene horas libres
+        suficientes, las horas libres de la ventana y la fecha de fin más temprana posible. La carga simulada de cada día reparte
+        las horas de cada actividad entre los días de su ventana en proporción a sus horas libres; overloadedDays son las posiciones
+        de los días cuyas horas ocupadas más las simuladas superan su capacidad """
+    start, capacity, busy = dense_calendar(calendar)
+    n = len(capacity)
+    results = [None] * len(activities)
+    simulated = np.zeros(n, dtype=np.float64)
+    groups = {}
+    for i, activity in enumerate(activities):
+        groups.setdefault(activity["strategy"], []).append(i)
+    for strategy, indexes in groups.items():
+        free = strategy_free_hours(start, capacity, busy, strategy)
+        prefix = np.concatenate(([0], np.cumsum(free)))
+        hours = np.array([activities[i]["estimatedHours"] for i in indexes], dtype=np.int64)
+        ends = np.array([(activities[i]["endOfActivity"] - start).days for i in indexes], dtype=np.int64)
+        has_start = np.array([activities[i]["startOfActivity"] is not None for i in indexes])
+        starts = np.array([(activities[i]["startOfActivity"] - start).days if activities[i]["startOfActivity"] else 0 for i in indexes], dtype=np.int64)
+        # Sin fecha de inicio se usan los 14 días anteriores a la fecha de fin, como en el Organizador
+        starts = np.where(has_start, starts, ends - 14)
+        low, high = np.clip(starts, 0, n), np.clip(ends + 1, 0, n)
+        window_free = prefix[high] - prefix[np.minimum(low, high)]
+        feasible = (hours > 0) & (window_free >= hours)
+
+        # Fecha de fin más temprana con fecha de inicio: primer día en el que las horas libres acumuladas desde el inicio cubren las estimadas
+        earliest = np.searchsorted(prefix, prefix[low] + hours, side="left") - 1
+        # Sin fecha de inicio: primer día cuya ventana de 15 días tiene horas suficientes (máximo acumulado de las ventanas deslizantes)
+        days = np.arange(n)
+        sliding = prefix[days + 1] - prefix[np.maximum(days - 14, 0)]
+        earliest = np.where(has_start, earliest, np.searchsorted(np.maximum.accumulate(sliding), hours, side="left"))
+        earliest_valid = (hours > 0) & (earliest >= 0) & (earliest < n)
+
+        # Carga simulada: diferencias acumuladas de la fracción de horas libres que ocupa cada actividad en su ventana
+        ratio = np.divide(hours, window_free, out=np.zeros(len(indexes), dtype=np.float64), where=window_free > 0)
+        coverage = np.zeros(n + 1, dtype=np.float64)
+        np.add.at(coverage, low, ratio)
+        np.add.at(coverage, high, -ratio)
+        simulated += free * np.cumsum(coverage)[:n]
+
+        for k, i in enumerate(indexes):
+            results[i] = {
+                "feasible": bool(feasible[k]),
+                "freeHours": int(window_free[k]),
+                "earliestEndDate": start + timedelta(days=int(earliest[k])) if earliest_valid[k] else None
+            }
+    simulated = simulated.round(2)
+    return {
+        "activities": results,
+        "load": {
+            "startDate": start,
+            "capacity": capacity.tolist(),
+            "busyHours": busy.tolist(),
+            "simulatedHours": simulated.tolist(),
+            "overloadedDays": np.flatnonzero(busy + simulated > capacity).tolist()
+        }
+    }
+
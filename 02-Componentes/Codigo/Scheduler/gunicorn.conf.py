@@ -0,0 +1,31 @@
+import os
+
+""" Modo de producción del Scheduler: gunicorn -c gunicorn.conf.py api_controller:app
+    El proceso master importa api_controller (y con él scheduler.py y OR-Tools) una sola vez antes de crear los workers,
+    que heredan los módulos ya cargados. Cada worker realiza su resolución de calentamiento al arrancar y responde
+    en /scheduler/ready sólo cuando ha terminado
+
+    Cada worker HTTP es un proceso independiente con su propia cola de resolución, por lo que:
+    - SCHEDULER_POOL_SIZE y SCHEDULER_MAX_BACKLOG son totales del contenedor y se reparten entre los workers HTTP
+      (con SCHEDULER_POOL_SIZE=4 y SCHEDULER_HTTP_WORKERS=2, cada worker lanza 2 procesos de CP-SAT y admite la mitad de la cola)
+    - La caché en memoria, la cola pendiente y /metrics son de cada worker: /metrics sólo describe al worker que responde.
+      Sólo la caché en SQLite (SCHEDULER_CACHE_DB) se comparte entre workers
+    - Los procesos de la cola se crean con spawn y vuelven a importar OR-Tools: preload_app no los calienta, lo hace
+      warm_up_worker al arrancar cada proceso
+"""
+
+bind = f"0.0.0.0:{os.getenv('SCHEDULER_PORT', '8001')}"
+workers = int(os.getenv("SCHEDULER_HTTP_WORKERS", "2"))
+worker_class = "uvicorn_worker.UvicornWorker"
+preload_app = True
+# El calentamiento de cada worker (y de su cola de procesos) ocurre antes de aceptar peticiones
+timeout = int(os.getenv("SCHEDULER_WORKER_TIMEOUT", "120"))
+graceful_timeout = 30
+
+# Reparto de la cola entre workers: este fichero se ejecuta antes de precargar api_controller, así que la SolveQueue
+# de cada worker lee ya la parte que le corresponde. Nunca hay más workers HTTP que procesos de la cola
+pool_size = int(os.getenv("SCHEDULER_POOL_SIZE", "0"))
+if pool_size > 0:
+    workers = max(1, min(workers, pool_size))
+    os.environ["SCHEDULER_POOL_SIZE"] = str(pool_size // workers)
+os.environ["SCHEDULER_MAX_BACKLOG"] = str(max(1, int(os.getenv("SCHEDULER_MAX_BACKLOG", "32")) // max(1, workers)))
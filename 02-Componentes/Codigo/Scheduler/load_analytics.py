@@ -0,0 +1,61 @@
+import numpy as np
+from datetime import date
+
+""" Analítica de carga del calendario con NumPy: utilización por día, carga por asignatura, picos semanales y días por encima del equilibrio.
+    El calendario y las filas de 'schedule' se convierten una vez en arrays densos por día y todas las métricas salen de ellos """
+
+# Un día está por encima del equilibrio si sus horas superan esta fracción de su capacidad, la misma mitad a partir de la que la reorganización
+# del curso penaliza la carga. No es una sobrecarga: en la simulación de capacidad "overloadedDays" son los días que superan la capacidad
+BALANCE_RATIO = 0.5
+ROLLING_DAYS = 7
+
+
+def load_arrays(calendar, schedule):
+    """ Arrays por día desde la primera fecha del calendario hasta la última: capacidad (4 Normal / 8 Festivo, 0 si falta el día)
+        y las horas de 'schedule' como índices de día y de asignatura con sus horas. Se ignoran las filas fuera del calendario """
+    calendar_ordinals = np.fromiter((day["calendarDate"].toordinal() for day in calendar), dtype=np.int64, count=len(calendar))
+    start = int(calendar_ordinals.min())
+    capacity = np.zeros(int(calendar_ordinals.max()) - start + 1, dtype=np.int64)
+    capacity[calendar_ordinals - start] = np.fromiter((4 if day["dayType"] == "Normal" else 8 for day in calendar), dtype=np.int64, count=len(calendar))
+    days = np.fromiter((row["calendarDate"].toordinal() for row in schedule), dtype=np.int64, count=len(schedule)) - start
+    hours = np.fromiter((row["hours"] for row in schedule), dtype=np.int64, count=len(schedule))
+    subject_ids, subjects = np.unique(np.fromiter((row["subjectId"] for row in schedule), dtype=np.int64, count=len(schedule)), return_inverse=True)
+    inside = (days >= 0) & (days < len(capacity))
+    return date.fromordinal(start), capacity, days[inside], subjects[inside], hours[inside], subject_ids
+
+
+def analyze(calendar, schedule):
+    """ Calcula todas las métricas de carga en una pasada. Cada fila de schedule tiene calendarDate, hours y subjectId.
+        Las series por día se devuelven como listas desde startDate y los días por encima del equilibrio como posiciones en ellas """
+    start, capacity, days, subjects, hours, subject_ids = load_arrays(calendar, schedule)
+    n = len(capacity)
+    load = np.bincount(days, weights=hours, minlength=n).astype(np.int64)
+    utilisation = np.divide(load, capacity, out=np.zeros(n, dtype=np.float64), where=capacity > 0)
+
+    # Carga de los últimos 7 días de cada día con sumas prefijas
+    prefix = np.concatenate(([0], np.cumsum(load)))
+    rolling = prefix[1:] - prefix[np.maximum(np.arange(1, n + 1) - ROLLING_DAYS, 0)]
+    peak = int(np.argmax(rolling))
+
+    # Carga por asignatura: horas totales, días con horas y máximo de horas en un mismo día, a partir de los pares (asignatura, día)
+    subject_hours = np.bincount(subjects, weights=hours, minlength=len(subject_ids)).astype(np.int64)
+    pairs, pair_index = np.unique(subjects * n + days, return_inverse=True)
+    pair_hours = np.bincount(pair_index, weights=hours, minlength=len(pairs)).astype(np.int64)
+    active_days = np.bincount(pairs // n, minlength=len(subject_ids))
+    peak_day_hours = np.zeros(len(subject_ids), dtype=np.int64)
+    np.maximum.at(peak_day_hours, pairs // n, pair_hours)
+    return {
+        "startDate": start,
+        "capacity": capacity.tolist(),
+        "hours": load.tolist(),
+        "utilisation": utilisation.round(3).tolist(),
+        "rollingHours": rolling.tolist(),
+        "peakWeek": {"endDate": date.fromordinal(start.toordinal() + peak), "hours": int(rolling[peak])},
+        "aboveBalanceDays": np.flatnonzero(load > capacity * BALANCE_RATIO).tolist(),
+        "subjects": {
+            "subjectIds": subject_ids.tolist(),
+            "hours": subject_hours.tolist(),
+            "activeDays": active_days.tolist(),
+            "peakDayHours": peak_day_hours.tolist()
+        }
+    }
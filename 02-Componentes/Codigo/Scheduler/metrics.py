@@ -0,0 +1,95 @@
+import threading
+
+
+SECONDS_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+SEARCH_BUCKETS = (0, 10, 100, 1000, 10000, 100000, 1000000)
+COUNT_BUCKETS = (0, 1, 2, 3, 4, 5, 7, 10, 25)
+
+
+def format_labels(labels, **extra):
+    """ Etiquetas de una serie en el formato de texto de Prometheus """
+    labels = list(labels) + list(extra.items())
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{value}"' for name, value in labels) + "}"
+
+
+class Counter():
+    """ Contador con etiquetas en el formato de texto de Prometheus """
+    def __init__(self, name, description):
+        self.name = name
+        self.description = description
+        self.series = {}
+        self.lock = threading.Lock()
+
+    def inc(self, **labels):
+        key = tuple(sorted(labels.items()))
+        with self.lock:
+            self.series[key] = self.series.get(key, 0) + 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} counter"]
+        with self.lock:
+            for key, value in sorted(self.series.items()):
+                lines.append(f"{self.name}{format_labels(key)} {value}")
+        return lines
+
+
+class Histogram():
+    """ Histograma acumulativo con etiquetas en el formato de texto de Prometheus """
+    def __init__(self, name, description, buckets):
+        self.name = name
+        self.description = description
+        self.buckets = tuple(buckets)
+        self.series = {}
+        self.lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(sorted(labels.items()))
+        with self.lock:
+            series = self.series.setdefault(key, {"buckets": [0] * len(self.buckets), "sum": 0, "count": 0})
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series["buckets"][i] += 1
+            series["sum"] += value
+            series["count"] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} histogram"]
+        with self.lock:
+            for key, series in sorted(self.series.items()):
+                for bound, count in zip(self.buckets, series["buckets"]):
+                    lines.append(f"{self.name}_bucket{format_labels(key, le=bound)} {count}")
+                lines.append(f"{self.name}_bucket{format_labels(key, le='+Inf')} {series['count']}")
+                lines.append(f"{self.name}_sum{format_labels(key)} {series['sum']}")
+                lines.append(f"{self.name}_count{format_labels(key)} {series['count']}")
+        return lines
+
+
+class SchedulerMetrics():
+    """ Métricas de todas las peticiones del Organizador a partir de la telemetría de cada Scheduler """
+    def __init__(self):
+        self.requests = Counter("scheduler_requests_total", "Peticiones resueltas por estrategia, motor y código de resultado")
+        # Clave de la telemetría del Scheduler -> histograma que la agrega
+        self.histograms = {
+            "modelBuildSeconds": Histogram("scheduler_model_build_seconds", "Tiempo de construcción de los modelos de CP-SAT", SECONDS_BUCKETS),
+            "solveSeconds": Histogram("scheduler_solve_seconds", "Tiempo de resolución de CP-SAT", SECONDS_BUCKETS),
+            "totalSeconds": Histogram("scheduler_request_seconds", "Tiempo total de la búsqueda del Organizador", SECONDS_BUCKETS),
+            "branches": Histogram("scheduler_solver_branches", "Ramas exploradas por CP-SAT", SEARCH_BUCKETS),
+            "conflicts": Histogram("scheduler_solver_conflicts", "Conflictos encontrados por CP-SAT", SEARCH_BUCKETS),
+            "solutionsFound": Histogram("scheduler_solutions_found", "Soluciones devueltas", COUNT_BUCKETS),
+            "candidatesTried": Histogram("scheduler_candidates_tried", "Fechas de fin candidatas probadas", COUNT_BUCKETS)
+        }
+
+    def record(self, diagnostics, result):
+        """ Añade la telemetría de una petición resuelta """
+        labels = {"strategy": diagnostics["strategy"], "engine": diagnostics["engine"]}
+        self.requests.inc(result=result, **labels)
+        for key, histogram in self.histograms.items():
+            histogram.observe(diagnostics[key], **labels)
+
+    def render(self):
+        lines = self.requests.render()
+        for histogram in self.histograms.values():
+            lines += histogram.render()
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,128 @@
+from collections import OrderedDict
+from datetime import date, timedelta
+import threading
+import hashlib
+import sqlite3
+import json
+import time
+import os
+import scheduler as SchedulerController
+
+
+def date_converter(obj):
+    # Convierte el objeto 'date' a una cadena ISO
+    if isinstance(obj, date):
+        return obj.isoformat()
+    raise TypeError(f"Type {obj.__class__.__name__} not serializable")
+
+def restore_dates(value):
+    """ Recupera los objetos 'date' de un resultado leído desde la base de datos compartida """
+    for solution in value[1] or []:
+        solution["newEndDate"] = date.fromisoformat(solution["newEndDate"])
+        for day in solution["schedule"] + solution["modifiedCalendar"]:
+            day["calendarDate"] = date.fromisoformat(day["calendarDate"])
+    return tuple(value)
+
+
+class ScheduleCache():
+    """ Memoización de los resultados del Organizador con expulsión LRU + TTL y almacenamiento compartido opcional en SQLite """
+    def __init__(self, max_size=None, ttl=None, backend_path=None):
+        self.max_size = max_size if max_size is not None else int(os.getenv("SCHEDULER_CACHE_SIZE", "256"))
+        self.ttl = ttl if ttl is not None else float(os.getenv("SCHEDULER_CACHE_TTL", "300"))
+        self.backend_path = backend_path if backend_path is not None else os.getenv("SCHEDULER_CACHE_DB", "")
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        if self.backend_path:
+            self.__execute(("PRAGMA journal_mode=WAL;", ()))
+            self.__execute(("CREATE TABLE IF NOT EXISTS schedule_cache (CacheKey TEXT PRIMARY KEY, Expires REAL NOT NULL, Value TEXT NOT NULL);", ()))
+
+    def __execute(self, *statements):
+        """ Ejecuta las sentencias (consulta, parámetros) en una única transacción y devuelve la última fila leída """
+        connection = sqlite3.connect(self.backend_path, timeout=5)
+        try:
+            with connection:
+                for query, params in statements:
+                    row = connection.execute(query, params).fetchone()
+            return row
+        finally:
+            connection.close()
+
+    @staticmethod
+    def key(activity, calendar, options):
+        """ Hash canónico del problema: estrategia, horas, fechas, opciones y los días del calendario que pueden intervenir """
+        end = activity["endOfActivity"]
+        start = activity["startOfActivity"] or end - timedelta(days=17)
+        # Los días se ordenan por fecha: el Organizador también los recorre por fecha, así que el orden de la entrada no cambia el plan
+        if isinstance(calendar, SchedulerController.CalendarIndex):
+            # Calendario en columnas: misma clave que la lista de días equivalente
+            days = sorted((calendarDate.isoformat(), dayType, busy, []) for calendarDate, dayType, busy in calendar.days(start, end + timedelta(days=3)))
+        else:
+            days = sorted((day["calendarDate"].isoformat(), day["dayType"], day["totalHoursBusy"], sorted(day.get("busySlots") or []))
+                          for day in calendar if start <= day["calendarDate"] <= end + timedelta(days=3))
+        problem = {
+            "strategy": activity["strategy"],
+            "estimatedHours": activity["estimatedHours"],
+            "startOfActivity": activity["startOfActivity"],
+            "endOfActivity": end,
+            "options": sorted(options.items()),
+            "calendar": days
+        }
+        return hashlib.sha256(json.dumps(problem, default=date_converter, sort_keys=True).encode()).hexdigest()
+
+    def get(self, key):
+        """ Devuelve el resultado guardado o None si no existe o ha caducado """
+        now = time.time()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry and entry[0] > now:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.entries.pop(key, None)
+        if self.backend_path:
+            row = self.__execute(("SELECT Expires, Value FROM schedule_cache WHERE CacheKey = ? AND Expires > ?;", (key, now)))
+            if row:
+                value = restore_dates(json.loads(row[1]))
+                with self.lock:
+                    self.hits += 1
+                    self.__store(key, row[0], value)
+                return value
+        with self.lock:
+            self.misses += 1
+        return None
+
+    def set(self, key, value):
+        expires = time.time() + self.ttl
+        with self.lock:
+            self.__store(key, expires, value)
+        if self.backend_path:
+            self.__execute(
+                ("INSERT OR REPLACE INTO schedule_cache (CacheKey, Expires, Value) VALUES (?, ?, ?);", (key, expires, json.dumps(value, default=date_converter))),
+                ("DELETE FROM schedule_cache WHERE Expires <= ?;", (time.time(),)))
+
+    def __store(self, key, expires, value):
+        self.entries[key] = (expires, value)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.hits = 0
+            self.misses = 0
+        if self.backend_path:
+            self.__execute(("DELETE FROM schedule_cache;", ()))
+
+    def stats(self):
+        with self.lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "size": len(self.entries),
+                "maxSize": self.max_size,
+                "ttl": self.ttl,
+                "sharedBackend": bool(self.backend_path)
+            }
@@ -1,15 +1,21 @@
 from ortools.sat.python import cp_model
-from datetime import timedelta
+from datetime import date, timedelta
+from bisect import bisect_left, bisect_right
+from array import array
+import time
+import os
 
 
 class MultipleSolutionsCollector(cp_model.CpSolverSolutionCallback):
     """ Clase relacionada con la librería ORTools para recoger múltiples soluciones con restricciones """
-    def __init__(self, variables, valid_days, estimated_hours, max_solutions=5):
+    def __init__(self, variables, valid_days, estimated_hours, max_solutions=5, on_solution=None):
         cp_model.CpSolverSolutionCallback.__init__(self)
         self.variables = variables
         self.valid_days = valid_days
         self.estimated_hours = estimated_hours
         self.max_solutions = max_solutions
+        # Función opcional que recibe cada solución en cuanto se encuentra; si devuelve False se detiene la búsqueda
+        self.on_solution = on_solution
         self.solutions = []
         self.solution_count = 0
     
@@ -28,202 +34,1090 @@ class MultipleSolutionsCollector(cp_model.CpSolverSolutionCallback):
         if totalHours == self.estimated_hours and solution:
             self.solutions.append(solution)
             self.solution_count += 1
+            if self.on_solution is not None and not self.on_solution(solution):
+                self.StopSearch()
         if self.solution_count >= self.max_solutions:
             self.StopSearch()
 
     def get_solutions(self):
         return self.solutions
-    
+
+class CalendarIndex():
+    """ Representación compacta del calendario ordenado por fecha: ordinales, códigos de tipo de día y horas ocupadas.
+        Se construye una vez por petición y permite extraer la ventana de una actividad en O(log n + k).
+        Los días se recorren siempre por fecha, de la más antigua a la más reciente: las heurísticas CHOOSE_FIRST dependen del orden
+        de las variables, así que el plan no depende del orden en el que llegan los días (BackendAPI no lo garantiza) """
+    DAY_TYPES = ("Normal", "Festivo")
+
+    def __init__(self, calendar):
+        ordinals = [day["calendarDate"].toordinal() for day in calendar]
+        # Timsort es lineal con calendarios ya ordenados, tanto ascendentes como descendentes
+        order = sorted(range(len(calendar)), key=ordinals.__getitem__)
+        self.ordinals = array("l", [ordinals[i] for i in order])
+        self.day_types = array("b", [calendar[i]["dayType"] != "Normal" for i in order])
+        self.busy = array("l", [calendar[i]["totalHoursBusy"] for i in order])
+        if len(set(ordinals)) < len(ordinals):
+            # Con fechas repetidas se usan las horas ocupadas de la última aparición, igual que al indexar por fecha en un diccionario
+            for k in range(len(order) - 2, -1, -1):
+                if self.ordinals[k] == self.ordinals[k + 1]:
+                    self.busy[k] = self.busy[k + 1]
+        self.__build_free_hours()
+
+    @classmethod
+    def from_columns(cls, dates, day_types, busy_hours):
+        """ Índice construido directamente desde un calendario en columnas ya validado (fechas ascendentes, contiguas y sin repetir),
+            sin diccionarios por día ni ordenación. Como con la lista, los días se recorren por fecha, así que ambos formatos dan el
+            mismo plan y comparten la clave de la caché """
+        index = cls.__new__(cls)
+        first = dates[0].toordinal() if dates else 0
+        index.ordinals = array("l", range(first, first + len(dates)))
+        index.day_types = array("b", [day_type != "Normal" for day_type in day_types])
+        index.busy = array("l", busy_hours)
+        index.__build_free_hours()
+        return index
+
+    def __build_free_hours(self):
+        """ Sumas prefijas de las horas libres para calcular la capacidad de cualquier ventana en O(log n) """
+        free_hours = [0]
+        total = 0
+        for day_type, busy in zip(self.day_types, self.busy):
+            free = (8 if day_type else 4) - busy
+            if free > 0:
+                total += free
+            free_hours.append(total)
+        self.free_hours = array("l", free_hours)
+
+    def __range(self, start, end):
+        return bisect_left(self.ordinals, start.toordinal()), bisect_right(self.ordinals, end.toordinal())
+
+    def with_busy(self, busy_hours):
+        """ Índice de una cohorte: copia del calendario con las horas ocupadas de su vector disperso [{calendarDate, hours}] sumadas a
+            las de todos, sin superar la capacidad del día. Sólo se tocan los días del vector, en O(k log n) más la copia de los arrays """
+        index = CalendarIndex.__new__(CalendarIndex)
+        index.ordinals = self.ordinals
+        index.day_types = self.day_types
+        index.busy = array("l", self.busy)
+        for row in busy_hours:
+            low, high = index.__range(row["calendarDate"], row["calendarDate"])
+            for k in range(low, high):
+                index.busy[k] = min(index.busy[k] + row["hours"], 8 if index.day_types[k] else 4)
+        index.__build_free_hours()
+        return index
+
+    def days(self, start, end):
+        """ Días del calendario entre start y end (ambos incluidos) como (fecha, tipo de día, horas ocupadas), por orden de fecha """
+        low, high = self.__range(start, end)
+        for k in range(low, high):
+            yield date.fromordinal(self.ordinals[k]), self.DAY_TYPES[self.day_types[k]], self.busy[k]
+
+    def busy_hours(self, calendarDate):
+        """ Horas ya ocupadas de un día, 0 si no está en el calendario """
+        low, high = self.__range(calendarDate, calendarDate)
+        return self.busy[low] if low < high else 0
+
+    def window_free_hours(self, start, end):
+        """ Suma de las horas libres entre start y end (ambos incluidos) """
+        low, high = self.__range(start, end)
+        return self.free_hours[high] - self.free_hours[low]
+
+class FastSolver():
+    """ Vía rápida del Organizador: resuelve en Python puro los casos de una actividad con capacidad por día, sin construir un CpModel """
+    def supports(self, strategy, engine):
+        """ Indica si el caso puede resolverse sin CP-SAT con exactamente el mismo resultado """
+        match engine:
+            case "Enumeracion":
+                # Las estrategias sin heurística de búsqueda (Completa) no tienen un orden de soluciones fijo, depende del solver
+                return STRATEGIES[strategy].value_selection is not None
+            case "Optimizacion":
+                return True
+        return False
+
+    def __limits(self, available_days):
+        return [min(day["timeAvailable"], 4 if day["dayType"] == "Normal" else 8) for day in available_days]
+
+    def __to_solution(self, values, available_days):
+        return [{
+            "calendarDate": day["calendarDate"],
+            "dayType": day["dayType"],
+            "assignedHours": hours
+        } for day, hours in zip(available_days, values) if hours > 0]
+
+    def enumerate_solutions(self, strategy, available_days, estimated_hours, max_solutions=5):
+        """ Enumera las soluciones en orden lexicográfico, el mismo que sigue FIXED_SEARCH con CHOOSE_FIRST
+            (descendente con SELECT_MAX_VALUE, como Agresiva, y ascendente con SELECT_MIN_VALUE, como Calmada) """
+        limits = self.__limits(available_days)
+        n = len(limits)
+        suffix = [0] * (n + 1)
+        for i in range(n - 1, -1, -1):
+            suffix[i] = suffix[i + 1] + limits[i]
+        if estimated_hours == 0 or suffix[0] < estimated_hours:
+            return []
+        descending = STRATEGIES[strategy].value_selection == cp_model.SELECT_MAX_VALUE
+        values = [0] * n
+        remaining = [0] * (n + 1)
+        remaining[0] = estimated_hours
+
+        def fill(start):
+            # Asigna a cada día el valor extremo permitido por las horas que quedan y la capacidad del resto de días
+            for i in range(start, n):
+                lower, upper = max(0, remaining[i] - suffix[i + 1]), min(limits[i], remaining[i])
+                values[i] = upper if descending else lower
+                remaining[i + 1] = remaining[i] - values[i]
+
+        fill(0)
+        solutions = []
+        while True:
+            solutions.append(self.__to_solution(values, available_days))
+            if len(solutions) >= max_solutions:
+                break
+            # Siguiente solución: se modifica en una unidad el último día que lo permite y se rellena el resto
+            for i in range(n - 1, -1, -1):
+                lower, upper = max(0, remaining[i] - suffix[i + 1]), min(limits[i], remaining[i])
+                if descending and values[i] > lower:
+                    values[i] -= 1
+                    break
+                if not descending and values[i] < upper:
+                    values[i] += 1
+                    break
+            else:
+                break
+            remaining[i + 1] = remaining[i] - values[i]
+            fill(i + 1)
+        return solutions
+
+    def optimize(self, strategy, available_days, estimated_hours, calendar_index):
+        """ Solución óptima de cada objetivo del motor de optimización en O(días) """
+        limits = self.__limits(available_days)
+        if estimated_hours == 0 or sum(limits) < estimated_hours:
+            return None
+        values = [0] * len(limits)
+        match STRATEGIES[strategy].objective:
+            case "PrimerosDias":
+                # Relleno voraz desde el primer día del rango
+                order = sorted(range(len(limits)), key=lambda i: available_days[i]["calendarDate"])
+            case "DiasUsados":
+                # Los días con más capacidad primero minimizan el número de días utilizados
+                order = sorted(range(len(limits)), key=lambda i: (-limits[i], available_days[i]["calendarDate"]))
+            case "CargaMaxima":
+                # Water-filling: se sube el nivel de carga diaria hasta cubrir las horas estimadas
+                busy = [calendar_index.busy_hours(day["calendarDate"]) for day in available_days]
+                level = max(busy)
+                while sum(min(limit, max(0, level - b)) for limit, b in zip(limits, busy)) < estimated_hours:
+                    level += 1
+                # Los días se llenan hasta level - 1 sólo si el nivel ha subido; si max(busy) ya cubre las horas,
+                # el relleno hasta level - 1 podría superar las horas estimadas y cualquier reparto por debajo de level es óptimo
+                if level > max(busy):
+                    values = [min(limit, max(0, level - 1 - b)) for limit, b in zip(limits, busy)]
+                order = sorted(range(len(limits)), key=lambda i: available_days[i]["calendarDate"])
+                limits = [min(limit, max(0, level - b)) for limit, b in zip(limits, busy)]
+        remaining = estimated_hours - sum(values)
+        for i in order:
+            if remaining == 0:
+                break
+            extra = min(limits[i] - values[i], remaining)
+            values[i] += extra
+            remaining -= extra
+        return self.__to_solution(values, available_days)
+
+class StrategySpec():
+    """ Declaración de una estrategia sobre el modelo común del Organizador: heurística de búsqueda, objetivo y días utilizables """
+    def __init__(self, value_selection=None, objective="DiasUsados", sort_solutions=False, weekdays=None, buffer_hours=0):
+        # Selección de valor de FIXED_SEARCH en el motor de enumeración; sin ella el orden de las soluciones depende del solver
+        self.value_selection = value_selection
+        # Objetivo del motor de optimización: PrimerosDias, CargaMaxima o DiasUsados
+        self.objective = objective
+        # Las soluciones se reordenan priorizando las horas de los primeros días
+        self.sort_solutions = sort_solutions
+        # Días de la semana utilizables (0 lunes ... 6 domingo), todos si es None
+        self.weekdays = weekdays
+        # Horas que se dejan libres en cada día como margen
+        self.buffer_hours = buffer_hours
+
+# Registro de estrategias: una estrategia nueva sólo necesita una entrada, el modelo y los motores son comunes
+STRATEGIES = {
+    # Prioriza siempre los primeros días del rango con todas las horas asignadas
+    "Agresiva": StrategySpec(cp_model.SELECT_MAX_VALUE, objective="PrimerosDias", sort_solutions=True),
+    # Distribuye equitativamente las horas asignadas entre todos los días del rango
+    "Calmada": StrategySpec(cp_model.SELECT_MIN_VALUE, objective="CargaMaxima"),
+    # Cualquier reparto; en optimización minimiza el número de días utilizados
+    "Completa": StrategySpec(objective="DiasUsados"),
+    # Como la agresiva, pero sólo con sábados y domingos
+    "FinesDeSemana": StrategySpec(cp_model.SELECT_MAX_VALUE, objective="PrimerosDias", sort_solutions=True, weekdays=(5, 6)),
+    # Como la calmada, dejando siempre una hora libre en cada día
+    "Holgada": StrategySpec(cp_model.SELECT_MIN_VALUE, objective="CargaMaxima", buffer_hours=1)
+}
+
 class Scheduler():
     """ Clase del Organizador con las implementaciones de las distintas lógicas de organización """
-    def __check_available_days(self, activity, calendar, busy_days):
-        """ Devuelve los días que se pueden utilizar para organizar y el tiempo disponible de cada día """
+    def __init__(self, max_time_in_seconds=None, num_workers=None, fast_solver=None):
+        # Presupuesto de tiempo y número de hilos del solver para el motor de optimización
+        self.max_time_in_seconds = max_time_in_seconds or float(os.getenv("SCHEDULER_TIME_LIMIT", "10"))
+        self.num_workers = num_workers or int(os.getenv("SCHEDULER_WORKERS", "8"))
+        # Vía rápida sin CP-SAT; se puede sustituir por otra implementación o desactivar con SCHEDULER_FAST_SOLVER=0
+        if fast_solver is None and os.getenv("SCHEDULER_FAST_SOLVER", "1") == "1":
+            fast_solver = FastSolver()
+        self.fast_solver = fast_solver
+        # Información adicional de la última petición que se devuelve junto a la respuesta
+        self.metadata = {}
+        # Entrega en streaming: función que recibe cada solución con el formato de la API y evento de cancelación del cliente
+        self.solution_listener = None
+        self.cancelled = None
+        self.streamed_solutions = 0
+        # Instante (time.perf_counter) en el que vence el presupuesto de tiempo de la petición, si lo hay
+        self.deadline = None
+        # Plan anterior de la actividad {calendarDate: horas}: pista para CP-SAT y, opcionalmente, desviación a minimizar
+        self.previous_schedule = None
+        self.minimize_deviation = False
+        # Motor de franjas horarias: horas seguidas máximas de la actividad y franjas ocupadas de cada día {calendarDate: [franja]}
+        self.max_consecutive_hours = 8
+        self.busy_slots = {}
+        # Telemetría de la petición: tiempos de construcción y resolución, estadísticas del solver y fechas candidatas probadas
+        self.diagnostics = {
+            "strategy": None,
+            "searchMode": None,
+            "engine": None,
+            "modelBuildSeconds": 0.0,
+            "solveSeconds": 0.0,
+            "totalSeconds": 0.0,
+            "branches": 0,
+            "conflicts": 0,
+            "solverCalls": 0,
+            "fastSolverCalls": 0,
+            "solutionsFound": 0,
+            "candidatesTried": 0
+        }
+
+    def __use_fast_solver(self, strategy, engine):
+        # La vía rápida no conoce el plan anterior: si hay que minimizar la desviación se usa siempre CP-SAT
+        if self.minimize_deviation and self.previous_schedule:
+            return False
+        return bool(self.fast_solver) and self.fast_solver.supports(strategy, engine)
+
+    def __is_cancelled(self):
+        return self.cancelled is not None and self.cancelled.is_set()
+
+    def __start_candidate(self):
+        """ Anota una nueva fecha de fin candidata. Devuelve False si el cliente ha cancelado la búsqueda o se ha agotado el presupuesto de tiempo """
+        if self.__is_cancelled():
+            return False
+        if self.deadline is not None and time.perf_counter() >= self.deadline:
+            self.metadata["partial"] = True
+            return False
+        self.diagnostics["candidatesTried"] += 1
+        return True
+
+    def __run_solver(self, solver, model, build_started, callback=None):
+        """ Resuelve el modelo (enumerando soluciones si hay callback) y acumula la telemetría de la llamada.
+            Con presupuesto de tiempo, el solver sólo dispone del tiempo restante y la respuesta se marca como parcial si se agota """
+        solve_started = time.perf_counter()
+        if self.deadline is not None:
+            remaining = self.deadline - solve_started
+            if remaining <= 0:
+                self.metadata["partial"] = True
+                return cp_model.UNKNOWN
+            if remaining < solver.parameters.max_time_in_seconds:
+                solver.parameters.max_time_in_seconds = remaining
+        if callback is None:
+            status = solver.Solve(model)
+        else:
+            status = solver.SearchForAllSolutions(model, callback)
+        if self.deadline is not None and status in (cp_model.UNKNOWN, cp_model.FEASIBLE) and time.perf_counter() >= self.deadline:
+            self.metadata["partial"] = True
+        self.diagnostics["modelBuildSeconds"] += solve_started - build_started
+        self.diagnostics["solveSeconds"] += time.perf_counter() - solve_started
+        self.diagnostics["branches"] += solver.NumBranches()
+        self.diagnostics["conflicts"] += solver.NumConflicts()
+        self.diagnostics["solverCalls"] += 1
+        return status
+
+    def __solution_listener(self, endDate):
+        """ Devuelve la función on_solution de los recolectores, o None si no hay entrega en streaming """
+        if self.solution_listener is None:
+            return None
+        return lambda solution: self.__stream_solution(solution, endDate() if callable(endDate) else endDate)
+
+    def __stream_solution(self, solution, endDate):
+        """ Entrega una solución al cliente en cuanto se encuentra. Devuelve False si el cliente ha cancelado """
+        if self.__is_cancelled():
+            return False
+        self.solution_listener(self.__format_solution(solution, endDate))
+        self.streamed_solutions += 1
+        return True
+
+    def __sort_aggresive_solutions(self, result):
+        return sorted(result, key=lambda sol: [
+        -sum(entry["assignedHours"] for entry in sol[:3]),
+        sol[0]["calendarDate"]])
+
+    def __check_available_days(self, activity, calendar_index):
+        """ Devuelve los días que se pueden utilizar para organizar y el tiempo disponible de cada día según la estrategia """
+        spec = STRATEGIES[activity["strategy"]]
         fecha_inicio = activity["startDate"]
         fecha_fin = activity["endDate"]
         if not fecha_inicio:
             fecha_inicio = fecha_fin - timedelta(days=14) 
         available_days = []
-        for day in calendar:
-            if not (fecha_inicio <= day["calendarDate"] <= fecha_fin):
+        for calendarDate, dayType, ya_ocupadas in calendar_index.days(fecha_inicio, fecha_fin):
+            if spec.weekdays is not None and calendarDate.weekday() not in spec.weekdays:
                 continue
-            max_total = 4 if day["dayType"] == "Normal" else 8
-            ya_ocupadas = busy_days.get(day["calendarDate"], 0)
-            disponible = max_total - ya_ocupadas
+            max_total = 4 if dayType == "Normal" else 8
+            disponible = max_total - ya_ocupadas - spec.buffer_hours
             if disponible > 0:
                 available_days.append({
-                    "calendarDate": day["calendarDate"],
-                    "dayType": day["dayType"],
+                    "calendarDate": calendarDate,
+                    "dayType": dayType,
                     "timeAvailable": disponible
                 })
         return available_days
 
-    def __aggresive_strategy(self, activity, calendar, busy_days):
-        model = cp_model.CpModel()
-        solver = cp_model.CpSolver()
-        solver.parameters.log_search_progress = False
-        available_days = self.__check_available_days(activity, calendar, busy_days)
-        total_hours = activity["estimatedHours"]
-
+    def __day_variables(self, model, available_days, estimated_hours, prefix="horas"):
+        """ Modelo común de todas las estrategias: una variable de horas por día disponible y la suma de las horas estimadas """
         # Restricción: la suma de todas las horas asignadas deben cubrir todas las horas estimadas
         day_availability = []
-        for i, day in enumerate(available_days):
+        for day in available_days:
             limit = min(day["timeAvailable"], 4 if day["dayType"] == "Normal" else 8)
-            var = model.NewIntVar(0, limit, f'horas_{day["calendarDate"]}')
-            day_availability.append(var)
-        model.Add(sum(day_availability) == total_hours)
-
-        # Estrategia agresiva: Prioriza siempre los primeros días del rango con todas las horas asignadas
-        solver.parameters.search_branching = cp_model.FIXED_SEARCH
-        model.AddDecisionStrategy(
-            day_availability,
-            cp_model.CHOOSE_FIRST,
-            cp_model.SELECT_MAX_VALUE
-        )
-
-        callback = MultipleSolutionsCollector(day_availability, available_days, activity["estimatedHours"] , max_solutions=5)
-        solver.SearchForAllSolutions(model, callback)
-        result = callback.get_solutions()
-        result = sorted(result, key=lambda sol: [
-        -sum(entry["assignedHours"] for entry in sol[:3]),
-        sol[0]["calendarDate"]])
-        if result:
-            return [result,activity["endDate"]]
-        else:
+            day_availability.append(model.NewIntVar(0, limit, f'{prefix}_{day["calendarDate"]}'))
+        model.Add(sum(day_availability) == estimated_hours)
+        return day_availability
+
+    def __search_strategy(self, spec, model, day_availability):
+        """ Añade la heurística de búsqueda de la estrategia. Devuelve True si el solver debe seguirla con FIXED_SEARCH """
+        if spec.value_selection is None:
+            return False
+        model.AddDecisionStrategy(day_availability, cp_model.CHOOSE_FIRST, spec.value_selection)
+        return True
+
+    def __enumerated_strategy(self, activity, calendar_index):
+        """ Motor de enumeración con la vía rápida: hasta 5 soluciones de la estrategia para una fecha de fin.
+            Con CP-SAT la búsqueda pasa por __incremental_search, que construye el modelo una sola vez """
+        spec = STRATEGIES[activity["strategy"]]
+        available_days = self.__check_available_days(activity, calendar_index)
+        self.diagnostics["fastSolverCalls"] += 1
+        result = self.fast_solver.enumerate_solutions(activity["strategy"], available_days, activity["estimatedHours"], max_solutions=5)
+        if spec.sort_solutions:
+            result = self.__sort_aggresive_solutions(result)
+        return [result,activity["endDate"]] if result else None
+
+    def __strategy_objective(self, model, activity, available_days, day_availability, calendar_index, in_window=None):
+        """ Devuelve la expresión a minimizar de cada estrategia y su valor máximo. Si el modelo cubre varias ventanas, in_window
+            tiene el literal de cada día que indica si pertenece a la ventana de la fecha de fin que se está resolviendo """
+        match STRATEGIES[activity["strategy"]].objective:
+            case "PrimerosDias":
+                # Maximiza las horas colocadas en los primeros días del rango. Con varias ventanas los días anteriores a la ventana
+                # sólo suman una constante (su número por las horas estimadas), así que el óptimo no cambia
+                order = sorted(range(len(available_days)), key=lambda i: available_days[i]["calendarDate"])
+                position = {i: p for p, i in enumerate(order)}
+                objective = sum(position[i] * var for i, var in enumerate(day_availability))
+                return objective, max(len(available_days) - 1, 0) * activity["estimatedHours"]
+            case "CargaMaxima":
+                # Minimiza la carga máxima diaria (horas ya ocupadas más las asignadas)
+                max_load = model.NewIntVar(0, 8, "carga_maxima")
+                for i, (day, var) in enumerate(zip(available_days, day_availability)):
+                    load = model.Add(max_load >= var + calendar_index.busy_hours(day["calendarDate"]))
+                    if in_window is not None:
+                        # Los días fuera de la ventana no cuentan aunque tengan horas ocupadas
+                        load.OnlyEnforceIf(in_window[i])
+                return max_load, 8
+            case "DiasUsados":
+                # Minimiza la fragmentación, es decir, el número de días utilizados
+                used_days = []
+                for day, var in zip(available_days, day_availability):
+                    used = model.NewBoolVar(f'usado_{day["calendarDate"]}')
+                    model.Add(var == 0).OnlyEnforceIf(used.Not())
+                    used_days.append(used)
+                return sum(used_days), len(used_days)
+
+    def __solution_from_solver(self, solver, day_availability, available_days):
+        """ Construye la solución con el mismo formato que MultipleSolutionsCollector """
+        solution = []
+        for i, var in enumerate(day_availability):
+            hours = solver.Value(var)
+            if hours > 0:
+                solution.append({
+                    "calendarDate": available_days[i]["calendarDate"],
+                    "dayType": available_days[i]["dayType"],
+                    "assignedHours": hours
+                })
+        return solution
+
+    def __previous_schedule_deviation(self, model, available_days, day_availability):
+        """ Añade el plan anterior como pista del solver. Con minimize_deviation devuelve la expresión de horas
+            que cambian respecto al plan anterior y su valor máximo; si no, (0, 0) """
+        if not self.previous_schedule:
+            return 0, 0
+        deviations = []
+        for day, var in zip(available_days, day_availability):
+            previous = self.previous_schedule.get(day["calendarDate"], 0)
+            limit = min(day["timeAvailable"], 4 if day["dayType"] == "Normal" else 8)
+            model.AddHint(var, min(previous, limit))
+            if self.minimize_deviation:
+                deviation = model.NewIntVar(0, max(previous, limit), f'desviacion_{day["calendarDate"]}')
+                model.Add(deviation >= var - previous)
+                model.Add(deviation >= previous - var)
+                deviations.append(deviation)
+        if not deviations:
+            return 0, 0
+        return sum(deviations), sum(8 + self.previous_schedule.get(day["calendarDate"], 0) for day in available_days)
+
+    def __configure_optimization(self, solver):
+        solver.parameters.max_time_in_seconds = self.max_time_in_seconds
+        solver.parameters.num_workers = self.num_workers
+
+    def __optimized_strategy(self, activity, calendar_index, available_days=None):
+        """ Motor de optimización con la vía rápida: el plan óptimo de la estrategia para una fecha de fin.
+            Con CP-SAT la búsqueda pasa por __optimized_search, que construye el modelo una sola vez """
+        if available_days is None:
+            available_days = self.__check_available_days(activity, calendar_index)
+        self.diagnostics["fastSolverCalls"] += 1
+        solution = self.fast_solver.optimize(activity["strategy"], available_days, activity["estimatedHours"], calendar_index)
+        return [[solution], activity["endDate"], "OPTIMAL"] if solution else None
+
+    def __optimized_search(self, activity, end_date_margin, calendar_index, slots=False):
+        """ Motor de optimización con CP-SAT: cada estrategia es un objetivo real resuelto con solver.Solve. Construye el modelo una sola vez
+            para la unión de las ventanas y, en cada fecha de fin candidata, sólo ajusta los dominios de los días y su literal en_ventana.
+            Con slots (motor Franjas) cada día sólo admite las horas que caben en sus franjas libres y el plan se coloca en franjas """
+        if not end_date_margin:
+            # Todas las fechas de fin candidatas se han descartado en la comprobación previa de capacidad
             return None
-        
-    def __calm_strategy(self, activity, calendar, busy_days):
+        windows, available_days = self.__candidate_windows(activity, end_date_margin, calendar_index)
+        if slots:
+            # Horizonte acotado: los días sin franjas libres suficientes para una hora no forman parte del modelo
+            available_days = [dict(day, timeAvailable=min(day["timeAvailable"], self.__slot_capacity(day, calendar_index))) for day in available_days]
+            available_days = [day for day in available_days if day["timeAvailable"] > 0]
+        build_started = time.perf_counter()
         model = cp_model.CpModel()
-        solver = cp_model.CpSolver()
-        solver.parameters.log_search_progress = False
-        available_days = self.__check_available_days(activity, calendar, busy_days)
         total_hours = activity["estimatedHours"]
 
-        # Restricción: la suma de todas las horas asignadas deben cubrir todas las horas estimadas
-        day_availability = []
-        for i, day in enumerate(available_days):
-            limit = min(day["timeAvailable"], 4 if day["dayType"] == "Normal" else 8)
-            var = model.NewIntVar(0, limit, f'horas_{day["calendarDate"]}')
-            day_availability.append(var)
-        model.Add(sum(day_availability) == total_hours)
-
-        # Estrategia calmada: Distribuye equitativamente las horas asignadas entre todos los días del rango
-        solver.parameters.search_branching = cp_model.FIXED_SEARCH
-        model.AddDecisionStrategy(
-            day_availability,
-            cp_model.CHOOSE_FIRST,
-            cp_model.SELECT_MIN_VALUE
-        )
-        callback = MultipleSolutionsCollector(day_availability, available_days, activity["estimatedHours"] , max_solutions=5)
-        solver.SearchForAllSolutions(model, callback)
-        result = callback.get_solutions()
-        if result:
-            return [result,activity["endDate"]]
-        else:
+        day_availability = self.__day_variables(model, available_days, total_hours)
+        limits = [min(day["timeAvailable"], 4 if day["dayType"] == "Normal" else 8) for day in available_days]
+        in_window = [model.NewBoolVar(f'en_ventana_{day["calendarDate"]}') for day in available_days]
+
+        # Con plan anterior y minimize_deviation, la desviación domina al objetivo de la estrategia
+        objective, bound = self.__strategy_objective(model, activity, available_days, day_availability, calendar_index, in_window)
+        deviation, _deviation_bound = self.__previous_schedule_deviation(model, available_days, day_availability)
+        model.Minimize((bound + 1) * deviation + objective)
+
+        for endDate, window in zip(end_date_margin, windows):
+            if not self.__start_candidate():
+                break
+            if slots and sum(limit for day, limit in zip(available_days, limits) if day["calendarDate"] in window) < total_hours:
+                continue
+            # Los días fuera de la ventana de la fecha de fin candidata quedan fijados a 0 horas
+            for day, var, limit, literal in zip(available_days, day_availability, limits, in_window):
+                inside = day["calendarDate"] in window
+                var.Proto().domain[:] = [0, limit if inside else 0]
+                literal.Proto().domain[:] = [int(inside), int(inside)]
+            solver = cp_model.CpSolver()
+            solver.parameters.log_search_progress = False
+            self.__configure_optimization(solver)
+            status = self.__run_solver(solver, model, build_started)
+            build_started = time.perf_counter()
+            if status in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+                solution = self.__solution_from_solver(solver, day_availability, available_days)
+                if solution and (not slots or self.__place_slots(solution, calendar_index)):
+                    return [[solution], endDate, solver.StatusName(status)]
+        return None
+
+    def __busy_slots(self, day, calendar_index):
+        """ Franjas ocupadas por clases de un día; si no se indican, las horas ocupadas son las primeras franjas del día """
+        return self.busy_slots.get(day["calendarDate"]) or range(calendar_index.busy_hours(day["calendarDate"]))
+
+    def __slot_capacity(self, day, calendar_index):
+        """ Horas que caben en las franjas libres de un día sin superar max_consecutive_hours seguidas:
+            en cada tramo libre de L franjas caben L - L // (max_consecutive_hours + 1) """
+        busy = set(self.__busy_slots(day, calendar_index))
+        max_total = 4 if day["dayType"] == "Normal" else 8
+        if self.max_consecutive_hours >= max_total:
+            # Ningún tramo libre supera el límite: caben todas las franjas libres
+            return max_total - len(busy)
+        capacity = 0
+        run = 0
+        for slot in range(max_total + 1):
+            if slot in busy or slot == max_total:
+                capacity += run - run // (self.max_consecutive_hours + 1)
+                run = 0
+            else:
+                run += 1
+        return capacity
+
+    def __place_slots(self, solution, calendar_index):
+        """ Coloca las horas de cada día de la solución en franjas de una hora (4 Normal / 8 Festivo), de la más temprana a la más tardía,
+            en bloques que no pisan las franjas ocupadas, duran como mucho max_consecutive_hours y dejan al menos una franja libre entre dos
+            bloques. En cada tramo libre la colocación voraz alcanza la capacidad de __slot_capacity, por lo que no hace falta un modelo:
+            sólo devuelve False si algún día tiene más horas de las que caben """
+        for day in solution:
+            busy = set(self.__busy_slots(day, calendar_index))
+            pending = day["assignedHours"]
+            slots = []
+            run = 0
+            for slot in range(4 if day["dayType"] == "Normal" else 8):
+                if pending == 0:
+                    break
+                if slot in busy or run == self.max_consecutive_hours:
+                    # Franja ocupada o descanso tras un bloque completo: el siguiente bloque empieza más tarde
+                    run = 0
+                    continue
+                if run == 0:
+                    slots.append([slot, slot + 1])
+                else:
+                    slots[-1][1] = slot + 1
+                run += 1
+                pending -= 1
+            if pending:
+                return False
+            day["slots"] = slots
+        return True
+
+    def __slot_strategy(self, activity, calendar_index):
+        """ Motor de franjas horarias con la vía rápida. Cualquier número de horas hasta la capacidad en franjas de un día se puede colocar en él,
+            por lo que primero se optimiza la estrategia con esa capacidad y después se colocan las horas de cada día en franjas.
+            Con CP-SAT la búsqueda pasa por __optimized_search """
+        # Horizonte acotado: cada día sólo admite las horas que caben en sus franjas libres
+        available_days = []
+        for day in self.__check_available_days(activity, calendar_index):
+            limit = min(day["timeAvailable"], self.__slot_capacity(day, calendar_index))
+            if limit > 0:
+                available_days.append(dict(day, timeAvailable=limit))
+        if sum(day["timeAvailable"] for day in available_days) < activity["estimatedHours"]:
             return None
+        result = self.__optimized_strategy(activity, calendar_index, available_days)
+        if result and self.__place_slots(result[0][0], calendar_index):
+            return result
+        return None
 
-    def __complete_strategy(self, activity, calendar, busy_days):
+    def __diverse_search(self, activity, end_date_margin, calendar_index, diverse_solutions):
+        """ Motor de soluciones diversas: cada plan nuevo debe mover un mínimo de horas respecto a todos los anteriores.
+            El primer plan es el primero de la estrategia y cada plan adicional cuesta una única llamada a solver.Solve.
+            Como __incremental_search, construye el modelo una sola vez para la unión de las ventanas y sólo ajusta los dominios en cada
+            fecha de fin candidata: una fecha sin solución no añade restricciones de diversidad, así que el modelo sirve para la siguiente """
+        if not end_date_margin:
+            # Todas las fechas de fin candidatas se han descartado en la comprobación previa de capacidad
+            return None
+        windows, available_days = self.__candidate_windows(activity, end_date_margin, calendar_index)
+        build_started = time.perf_counter()
         model = cp_model.CpModel()
-        solver = cp_model.CpSolver()
-        solver.parameters.log_search_progress = False
-        available_days = self.__check_available_days(activity, calendar, busy_days)
         total_hours = activity["estimatedHours"]
 
-        # Restricción: la suma de todas las horas asignadas deben cubrir todas las horas estimadas
-        day_availability = []
-        for i, day in enumerate(available_days):
-            limit = min(day["timeAvailable"], 4 if day["dayType"] == "Normal" else 8)
-            var = model.NewIntVar(0, limit, f'horas_{day["calendarDate"]}')
-            day_availability.append(var)
-        model.Add(sum(day_availability) == total_hours)
-
-        callback = MultipleSolutionsCollector(day_availability, available_days, activity["estimatedHours"] , max_solutions=5)
-        solver.SearchForAllSolutions(model, callback)
-        result = callback.get_solutions()
-        if result:
-            return [result,activity["endDate"]]
-        else:
+        day_availability = self.__day_variables(model, available_days, total_hours)
+        limits = [min(day["timeAvailable"], 4 if day["dayType"] == "Normal" else 8) for day in available_days]
+        fixed_search = self.__search_strategy(STRATEGIES[activity["strategy"]], model, day_availability)
+
+        # Horas que cada plan nuevo debe colocar en días distintos respecto a cada plan anterior: al menos una cuarta parte.
+        # Todas las restricciones de diversidad comparten la variable allowed_overlap para poder relajarlas sin reconstruir el modelo
+        allowed_overlap = model.NewIntVar(0, total_hours, "solapamiento_maximo")
+        for endDate, window in zip(end_date_margin, windows):
+            if not self.__start_candidate():
+                break
+            # Los días fuera de la ventana de la fecha de fin candidata quedan fijados a 0 horas
+            for day, var, limit in zip(available_days, day_availability, limits):
+                var.Proto().domain[:] = [0, limit if day["calendarDate"] in window else 0]
+            min_moved_hours = max(1, -(-total_hours // 4))
+            solutions = []
+            while len(solutions) < diverse_solutions and not self.__is_cancelled():
+                allowed_overlap.Proto().domain[:] = [0, total_hours - min_moved_hours]
+                solver = cp_model.CpSolver()
+                solver.parameters.log_search_progress = False
+                solver.parameters.num_workers = 1
+                solver.parameters.max_time_in_seconds = self.max_time_in_seconds / diverse_solutions
+                if fixed_search:
+                    solver.parameters.search_branching = cp_model.FIXED_SEARCH
+                status = self.__run_solver(solver, model, build_started)
+                build_started = time.perf_counter()
+                if status in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+                    solution = self.__solution_from_solver(solver, day_availability, available_days)
+                    if not solution:
+                        break
+                    solutions.append(solution)
+                    # No-good generalizado: las horas que coinciden con este plan no pueden superar allowed_overlap
+                    overlaps = []
+                    for var in day_availability:
+                        hours = solver.Value(var)
+                        if hours > 0:
+                            overlap = model.NewIntVar(0, hours, "")
+                            model.AddMinEquality(overlap, [var, hours])
+                            overlaps.append(overlap)
+                    model.Add(sum(overlaps) <= allowed_overlap)
+                elif status == cp_model.INFEASIBLE and solutions and min_moved_hours > 1:
+                    # No quedan planes tan distintos: se relaja la distancia mínima a la mitad
+                    min_moved_hours //= 2
+                else:
+                    break
+            if solutions:
+                return [solutions, endDate]
+        return None
+
+    def __candidate_windows(self, activity, end_date_margin, calendar_index):
+        """ Devuelve la ventana de días disponible para cada fecha de fin candidata y la unión de todas ellas """
+        windows = []
+        all_days = {}
+        for endDate in end_date_margin:
+            activity_to_schedule = {
+                "endDate": endDate,
+                "estimatedHours": activity["estimatedHours"],
+                "startDate": activity["startOfActivity"],
+                "strategy": activity["strategy"]
+            }
+            window = self.__check_available_days(activity_to_schedule, calendar_index)
+            all_days.update((day["calendarDate"], day) for day in window)
+            windows.append({day["calendarDate"] for day in window})
+        available_days = []
+        if end_date_margin:
+            start = activity["startOfActivity"] or min(end_date_margin) - timedelta(days=14)
+            for calendarDate, _dayType, _busy in calendar_index.days(start, max(end_date_margin)):
+                if calendarDate in all_days:
+                    available_days.append(all_days.pop(calendarDate))
+        return windows, available_days
+
+    def __incremental_search(self, activity, end_date_margin, calendar_index):
+        """ Construye el modelo una sola vez para la ventana más amplia y, en cada fecha de fin candidata, sólo ajusta los dominios """
+        if not end_date_margin:
+            # Todas las fechas de fin candidatas se han descartado en la comprobación previa de capacidad
             return None
+        windows, available_days = self.__candidate_windows(activity, end_date_margin, calendar_index)
+        build_started = time.perf_counter()
+        model = cp_model.CpModel()
 
+        spec = STRATEGIES[activity["strategy"]]
+        day_availability = self.__day_variables(model, available_days, activity["estimatedHours"])
+        limits = [min(day["timeAvailable"], 4 if day["dayType"] == "Normal" else 8) for day in available_days]
+        fixed_search = self.__search_strategy(spec, model, day_availability)
 
-    def search_day_to_assign(self, activity, calendar):
-        # Procesado de la entrada
-        schedulerOutput = None
+        for endDate, window in zip(end_date_margin, windows):
+            if not self.__start_candidate():
+                break
+            # Los días fuera de la ventana de la fecha de fin candidata quedan fijados a 0 horas
+            for day, var, limit in zip(available_days, day_availability, limits):
+                var.Proto().domain[:] = [0, limit if day["calendarDate"] in window else 0]
+            solver = cp_model.CpSolver()
+            solver.parameters.log_search_progress = False
+            if fixed_search:
+                solver.parameters.search_branching = cp_model.FIXED_SEARCH
+            callback = MultipleSolutionsCollector(day_availability, available_days, activity["estimatedHours"], max_solutions=5, on_solution=self.__solution_listener(endDate))
+            self.__run_solver(solver, model, build_started, callback)
+            build_started = time.perf_counter()
+            result = callback.get_solutions()
+            if spec.sort_solutions:
+                result = self.__sort_aggresive_solutions(result)
+            if result:
+                return [result, endDate]
+        return None
+
+    def __end_date_margin(self, activity):
+        """ Fechas de fin candidatas en orden de preferencia: la original, hasta 3 días después y hasta 3 días antes """
         end_date_margin = [activity["endOfActivity"]] + \
             [activity["endOfActivity"] + timedelta(days=i) for i in range(1,4)] + \
             [activity["endOfActivity"] - timedelta(days=i) for i in range(1,4)]
         if activity["startOfActivity"]:
             end_date_margin = [f for f in end_date_margin if activity["startOfActivity"] <= f <= activity["endOfActivity"] + timedelta(days=3)]
-        busy_days = {}
-        for day in calendar:
-            busy_days[day["calendarDate"]] = day["totalHoursBusy"]
+        return end_date_margin
+
+    def __capacity_precheck(self, activity, end_date_margin, calendar_index):
+        """ Descarta, antes de construir ningún modelo, las fechas de fin cuya capacidad libre no cubre las horas estimadas.
+            Con las sumas prefijas de CalendarIndex cada fecha candidata se comprueba en O(log n) """
+        accepted = []
+        for endDate in end_date_margin:
+            start = activity["startOfActivity"] or endDate - timedelta(days=14)
+            if 0 < activity["estimatedHours"] <= calendar_index.window_free_hours(start, endDate):
+                accepted.append(endDate)
+        # hits: fechas descartadas sin llamar al solver; misses: fechas que la comprobación no puede descartar
+        precheck = self.metadata.setdefault("precheck", {"hits": 0, "misses": 0})
+        precheck["hits"] += len(end_date_margin) - len(accepted)
+        precheck["misses"] += len(accepted)
+        return accepted
+
+    def __format_solution(self, solution, endDate):
+        """ Convierte una solución del solver al formato de la API: horas por día y estado del calendario """
+        newSchedule = []
+        newCalendar = []
+        for schedule in solution:
+            date = schedule["calendarDate"]
+            max_hours = 4 if schedule["dayType"] == "Normal" else 8
+            newSchedule.append({
+                "calendarDate": date,
+                "assignedHours": schedule["assignedHours"]
+            })
+            if "slots" in schedule:
+                # Franjas [inicio, fin) de cada bloque de horas del día en el motor de franjas horarias
+                newSchedule[-1]["slots"] = schedule["slots"]
+            newCalendar.append({
+                "calendarDate": date,
+                "dayType": schedule["dayType"],
+                "status": "Ocupado" if schedule["assignedHours"] == max_hours else "Libre"
+            })
+        return {
+            "newEndDate": endDate,
+            "schedule": newSchedule,
+            "modifiedCalendar": newCalendar
+        }
+
+    def __prepare_output(self, activity, schedulerOutput):
+        """ Construye el código de resultado y las soluciones en el formato de la API """
+        if schedulerOutput:
+            solutions = []
+            for solution in schedulerOutput[0]:
+                solutions.append(self.__format_solution(solution, schedulerOutput[1]))
+                if len(schedulerOutput) > 2:
+                    # Estado de optimalidad del solver (OPTIMAL o FEASIBLE) en el motor de optimización
+                    solutions[-1]["solverStatus"] = schedulerOutput[2]
+            if (schedulerOutput[1] == activity["endOfActivity"]):
+                # Asignado correctamente
+                return 200, solutions
+            else:
+                # Asignado correctamente con la fecha de fin cambiada
+                return 201, solutions   
+        else:
+            # No ha sido posible asignar la actividad
+            return 401, None
+
+    def search_days_to_assign_batch(self, activities, calendar, cohort_busy=None):
+        """ Organiza varias actividades con un único modelo de CP-SAT y capacidad diaria compartida (4 Normal / 8 Festivo).
+            Todas las actividades deben ser de la misma cohorte; cohort_busy es su vector disperso de horas ocupadas """
+        build_started = time.perf_counter()
+        self.diagnostics.update(strategy="Lote", searchMode="Unica", engine="Optimizacion")
+        model = cp_model.CpModel()
+        solver = cp_model.CpSolver()
+        solver.parameters.log_search_progress = False
+        self.__configure_optimization(solver)
+        calendar_index = calendar if isinstance(calendar, CalendarIndex) else CalendarIndex(calendar)
+        if cohort_busy:
+            calendar_index = calendar_index.with_busy(cohort_busy)
+
+        plans = []
+        day_loads = {}
+        for a, activity in enumerate(activities):
+            end_date_margin = self.__capacity_precheck(activity, self.__end_date_margin(activity), calendar_index)
+            windows, available_days = self.__candidate_windows(activity, end_date_margin, calendar_index)
+            self.diagnostics["candidatesTried"] += len(end_date_margin)
+
+            # Cada actividad elige como mucho una fecha de fin; si no elige ninguna queda sin asignar (401)
+            end_date_selectors = [model.NewBoolVar(f'fin_{a}_{endDate}') for endDate in end_date_margin]
+            model.AddAtMostOne(end_date_selectors)
+            assigned = sum(end_date_selectors)
+            if activity["estimatedHours"] == 0:
+                model.Add(assigned == 0)
+
+            day_availability = self.__day_variables(model, available_days, activity["estimatedHours"] * assigned, prefix=f'horas_{a}')
+            for day, var in zip(available_days, day_availability):
+                for selector, window in zip(end_date_selectors, windows):
+                    if day["calendarDate"] not in window:
+                        model.Add(var == 0).OnlyEnforceIf(selector)
+                # Capacidad libre real del día, sin el margen de la estrategia de la actividad
+                free = (4 if day["dayType"] == "Normal" else 8) - calendar_index.busy_hours(day["calendarDate"])
+                day_loads.setdefault(day["calendarDate"], (free, []))[1].append(var)
+
+            objective, bound = self.__strategy_objective(model, activity, available_days, day_availability, calendar_index)
+            penalty = (bound + 1) * sum(i * selector for i, selector in enumerate(end_date_selectors)) + objective
+            plans.append({
+                "endDateMargin": end_date_margin,
+                "selectors": end_date_selectors,
+                "variables": day_availability,
+                "availableDays": available_days,
+                "assigned": assigned,
+                "penalty": penalty,
+                "bound": (bound + 1) * len(end_date_margin)
+            })
+
+        # Restricción: la capacidad libre de cada día se comparte entre todas las actividades
+        for timeAvailable, variables in day_loads.values():
+            model.Add(sum(variables) <= timeAvailable)
+
+        # Objetivo: primero asignar el máximo de actividades, después preferir su fecha de fin original y por último su estrategia
+        unassigned_weight = sum(plan["bound"] for plan in plans) + 1
+        model.Minimize(sum(unassigned_weight * (1 - plan["assigned"]) + plan["penalty"] for plan in plans))
+        status = self.__run_solver(solver, model, build_started)
+
+        results = []
+        for activity, plan in zip(activities, plans):
+            schedulerOutput = None
+            if status in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+                chosen = [i for i, selector in enumerate(plan["selectors"]) if solver.Value(selector)]
+                if chosen:
+                    solution = self.__solution_from_solver(solver, plan["variables"], plan["availableDays"])
+                    schedulerOutput = [[solution], plan["endDateMargin"][chosen[0]], solver.StatusName(status)]
+            results.append(self.__prepare_output(activity, schedulerOutput))
+        self.diagnostics["solutionsFound"] = sum(len(solutions or []) for _code, solutions in results)
+        self.diagnostics["totalSeconds"] = time.perf_counter() - build_started
+        return results
+
+    @staticmethod
+    def cohort_key(cohort):
+        """ Clave de la cohorte (grado, curso) de una actividad; None para las actividades sin cohorte, que usan la capacidad de todos """
+        return (cohort["degree"], cohort["year"]) if cohort else None
+
+    @staticmethod
+    def cohort_busy_vectors(cohort_busy_hours):
+        """ Vector disperso de horas ocupadas de cada cohorte {(grado, curso): [{calendarDate, hours}]} a partir de las filas
+            {degree, year, calendarDate, hours}, que sólo incluyen los días con horas ocupadas de la cohorte """
+        vectors = {}
+        for row in cohort_busy_hours:
+            vectors.setdefault((row["degree"], row["year"]), []).append({"calendarDate": row["calendarDate"], "hours": row["hours"]})
+        return vectors
+
+    @staticmethod
+    def cohort_subproblems(activities, cohort_busy_hours):
+        """ Divide un lote en subproblemas, uno por cohorte: cada cohorte tiene su propia capacidad diaria, así que sus actividades nunca
+            comparten horas con las de otra. Devuelve (posiciones en el lote, actividades, vector disperso de la cohorte).
+            Las actividades sin cohorte usan la capacidad de todos: su subproblema, si lo hay, va el primero y con vector None,
+            porque hay que organizarlo antes y sumar sus horas al vector de cada cohorte (ver planned_busy_hours) """
+        vectors = Scheduler.cohort_busy_vectors(cohort_busy_hours)
+        groups = {None: ([], [])}
+        for i, activity in enumerate(activities):
+            positions, group = groups.setdefault(Scheduler.cohort_key(activity.get("cohort")), ([], []))
+            positions.append(i)
+            group.append(activity)
+        shared = groups.pop(None)
+        subproblems = [(positions, group, vectors.get(key, [])) for key, (positions, group) in groups.items()]
+        return ([(shared[0], shared[1], None)] if shared[1] else []) + subproblems
+
+    @staticmethod
+    def planned_busy_hours(results):
+        """ Horas que ocupa en cada día la primera solución de cada actividad organizada, como vector disperso [{calendarDate, hours}] """
+        return [{"calendarDate": day["calendarDate"], "hours": day["assignedHours"]}
+                for _code, solutions in results if solutions for day in solutions[0]["schedule"]]
+
+    @staticmethod
+    def schedule_diff(current_schedule, plan):
+        """ Filas de 'schedule' que cambian entre el plan actual y el nuevo: insert, update o delete """
+        current = {(row["activityId"], row["calendarDate"]): row["hours"] for row in current_schedule}
+        new = {(activityId, day["calendarDate"]): day["assignedHours"] for activityId, days in plan.items() for day in days}
+        diff = []
+        for key in sorted(current.keys() | new.keys()):
+            previous, hours = current.get(key), new.get(key)
+            if previous == hours:
+                continue
+            diff.append({
+                "action": "insert" if previous is None else "delete" if hours is None else "update",
+                "activityId": key[0],
+                "calendarDate": key[1],
+                "hours": hours,
+                "previousHours": previous
+            })
+        return diff
+
+    def __shared_capacity_plan(self, activities, calendar_index, current_schedule, stability):
+        """ Organiza varias actividades con su fecha de fin fija y capacidad diaria compartida en un único modelo.
+            Objetivo: primero el equilibrio de la carga diaria, después (con stability) las horas movidas respecto
+            a current_schedule y por último la estrategia de cada actividad. El plan actual se usa como pista del solver """
+        build_started = time.perf_counter()
+        model = cp_model.CpModel()
+        solver = cp_model.CpSolver()
+        solver.parameters.log_search_progress = False
+        self.__configure_optimization(solver)
+        hints = {(row["activityId"], row["calendarDate"]): row["hours"] for row in current_schedule or []}
+
+        plans = []
+        day_loads = {}
+        moved_hours = []
+        strategy_objectives = []
+        strategy_bound = 0
+        for activity in activities:
+            activity_to_schedule = {
+                "endDate": activity["endOfActivity"],
+                "startDate": activity["startOfActivity"],
+                "estimatedHours": activity["estimatedHours"],
+                "strategy": activity["strategy"]
+            }
+            available_days = self.__check_available_days(activity_to_schedule, calendar_index)
+            day_availability = self.__day_variables(model, available_days, activity["estimatedHours"], prefix=f'horas_{activity["activityId"]}')
+            for day, var in zip(available_days, day_availability):
+                limit = min(day["timeAvailable"], 4 if day["dayType"] == "Normal" else 8)
+                current = min(hints.get((activity["activityId"], day["calendarDate"]), 0), limit)
+                model.AddHint(var, current)
+                if stability and current > 0:
+                    # Horas que se quitan de un día del plan actual
+                    moved = model.NewIntVar(0, current, f'movidas_{activity["activityId"]}_{day["calendarDate"]}')
+                    model.Add(moved >= current - var)
+                    moved_hours.append(moved)
+                day_loads.setdefault(day["calendarDate"], (day, []))[1].append(var)
+            objective, bound = self.__strategy_objective(model, activity_to_schedule, available_days, day_availability, calendar_index)
+            strategy_objectives.append(objective)
+            strategy_bound += bound
+            plans.append((day_availability, available_days))
+        self.diagnostics["candidatesTried"] = len(activities)
+
+        # Restricción: la capacidad libre de cada día se comparte entre todas las actividades.
+        # Equilibrio: se penalizan las horas de cada día por encima de la mitad de su capacidad
+        overloads = []
+        for calendarDate, (day, variables) in day_loads.items():
+            # El margen de una estrategia sólo limita a su actividad, no a la capacidad compartida del día
+            max_total = 4 if day["dayType"] == "Normal" else 8
+            busy = calendar_index.busy_hours(calendarDate)
+            model.Add(sum(variables) <= max_total - busy)
+            overload = model.NewIntVar(0, max_total, f'sobrecarga_{calendarDate}')
+            model.Add(overload >= sum(variables) + busy - max_total // 2)
+            overloads.append(overload)
+
+        moved_weight = strategy_bound + 1
+        overload_weight = moved_weight * (sum(activity["estimatedHours"] for activity in activities) + 1) if stability else moved_weight
+        model.Minimize(overload_weight * sum(overloads) + moved_weight * sum(moved_hours) + sum(strategy_objectives))
+        status = self.__run_solver(solver, model, build_started)
+        self.diagnostics["totalSeconds"] = time.perf_counter() - build_started
+        if status not in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+            return 401, None
+        self.metadata["solverStatus"] = solver.StatusName(status)
+        result = {}
+        for activity, (day_availability, available_days) in zip(activities, plans):
+            result[activity["activityId"]] = self.__solution_from_solver(solver, day_availability, available_days)
+        self.diagnostics["solutionsFound"] = len(result)
+        return 200, result
+
+    def reoptimize_semester(self, activities, calendar, current_schedule=None):
+        """ Reorganiza a la vez todas las actividades ya organizadas de un curso manteniendo su fecha de fin.
+            Cada actividad es un diccionario con activityId, estimatedHours, strategy, startOfActivity y endOfActivity;
+            el calendario sólo contiene las horas ocupadas por actividades que no se reorganizan y current_schedule
+            las filas actuales {activityId, calendarDate, hours}, que se usan como pista del solver.
+            Devuelve el código de resultado y el plan de cada actividad {activityId: [{calendarDate, dayType, assignedHours}]} """
+        self.diagnostics.update(strategy="Curso", searchMode="Unica", engine="Optimizacion")
+        return self.__shared_capacity_plan(activities, CalendarIndex(calendar), current_schedule, stability=False)
+
+    def repair_schedule(self, activities, calendar, current_schedule, changed_days=()):
+        """ Reparación local tras actualizar o borrar una actividad: sólo se reorganizan las actividades afectadas.
+            El calendario cuenta todas las horas ocupadas, incluidas las de current_schedule. Están afectadas las actividades
+            sin todas sus horas organizadas y las que tienen algún día cambiado (changed_days o la ventana de una actividad
+            que hay que organizar) dentro de su ventana; el resto mantiene su plan sin cambios.
+            Devuelve el código de resultado y el nuevo plan de las actividades afectadas """
+        self.diagnostics.update(strategy="Reparacion", searchMode="Unica", engine="Optimizacion")
+        planned = {}
+        for row in current_schedule:
+            planned[row["activityId"]] = planned.get(row["activityId"], 0) + row["hours"]
+        activities_by_id = {activity["activityId"]: activity for activity in activities}
+        windows = {activity["activityId"]: (activity["startOfActivity"] or activity["endOfActivity"] - timedelta(days=14), activity["endOfActivity"])
+                   for activity in activities}
+        changed_days = set(changed_days)
+        pending = {activityId for activityId in windows if planned.get(activityId, 0) != activities_by_id[activityId]["estimatedHours"]}
+        for activityId in pending:
+            start, end = windows[activityId]
+            changed_days.update(start + timedelta(days=i) for i in range((end - start).days + 1))
+        affected = [activity for activity in activities if activity["activityId"] in pending
+                    or any(windows[activity["activityId"]][0] <= day <= windows[activity["activityId"]][1] for day in changed_days)]
+        self.metadata["affectedActivities"] = [activity["activityId"] for activity in affected]
+
+        # Las horas de las actividades afectadas dejan de estar ocupadas; las del resto se mantienen
+        affected_ids = set(self.metadata["affectedActivities"])
+        freed = {}
+        for row in current_schedule:
+            if row["activityId"] in affected_ids:
+                freed[row["calendarDate"]] = freed.get(row["calendarDate"], 0) + row["hours"]
+        calendar = [dict(day, totalHoursBusy=max(day["totalHoursBusy"] - freed.get(day["calendarDate"], 0), 0)) for day in calendar]
+        affected_schedule = [row for row in current_schedule if row["activityId"] in affected_ids]
+        return self.__shared_capacity_plan(affected, CalendarIndex(calendar), affected_schedule, stability=True)
+
+    def __diversity_scores(self, solutions, estimated_hours):
+        """ Puntuación de diversidad de cada solución: fracción mínima de horas colocadas en otros días respecto al resto de soluciones """
+        plans = [{day["calendarDate"]: day["assignedHours"] for day in solution["schedule"]} for solution in solutions]
+        scores = []
+        for i, plan in enumerate(plans):
+            moved = [estimated_hours - sum(min(hours, other.get(calendarDate, 0)) for calendarDate, hours in plan.items())
+                     for j, other in enumerate(plans) if j != i]
+            scores.append(round(min(moved) / estimated_hours, 4) if moved else 0.0)
+        return scores
+
+    def __deviation_hours(self, solution):
+        """ Horas que cambian entre una solución con el formato de la API y el plan anterior """
+        assigned = {day["calendarDate"]: day["assignedHours"] for day in solution["schedule"]}
+        return sum(abs(assigned.get(calendarDate, 0) - self.previous_schedule.get(calendarDate, 0))
+                   for calendarDate in assigned.keys() | self.previous_schedule.keys())
+
+    def search_day_to_assign(self, activity, calendar, search_mode="Iterativa", engine="Enumeracion", deadline_ms=None, diverse_solutions=5,
+                             previous_schedule=None, minimize_deviation=False, max_consecutive_hours=8, cohort_busy=None):
+        # Procesado de la entrada
+        started = time.perf_counter()
+        if previous_schedule:
+            # Plan anterior de la actividad, con el formato {calendarDate, hours} de las filas de 'schedule'
+            self.previous_schedule = {}
+            for day in previous_schedule:
+                self.previous_schedule[day["calendarDate"]] = self.previous_schedule.get(day["calendarDate"], 0) + day["hours"]
+            self.minimize_deviation = minimize_deviation
+            if minimize_deviation and engine == "Enumeracion":
+                # La enumeración sólo usa el plan anterior como pista: para minimizar la desviación hace falta el motor de optimización
+                engine = "Optimizacion"
+        if deadline_ms is not None:
+            # El presupuesto se reparte entre todas las fechas de fin candidatas: cada llamada al solver sólo usa el tiempo restante
+            self.deadline = started + deadline_ms / 1000
+            self.metadata["partial"] = False
+        if engine == "Franjas":
+            self.max_consecutive_hours = max_consecutive_hours
+            if not isinstance(calendar, CalendarIndex):
+                self.busy_slots = {day["calendarDate"]: day["busySlots"] for day in calendar if day.get("busySlots")}
+        self.diagnostics.update(strategy=activity["strategy"], searchMode=search_mode, engine=engine)
+        schedulerOutput = None
+        # El calendario puede llegar ya indexado desde la entrada en columnas
+        calendar_index = calendar if isinstance(calendar, CalendarIndex) else CalendarIndex(calendar)
+        if cohort_busy:
+            # Capacidad de la cohorte de la actividad: horas ocupadas de todos más las de su vector disperso
+            calendar_index = calendar_index.with_busy(cohort_busy)
+        end_date_margin = self.__capacity_precheck(activity, self.__end_date_margin(activity), calendar_index)
         
         # Procesado de la estrategia
         match activity["strategy"]:
-            case "Agresiva":
+            case strategy if strategy not in STRATEGIES:
+                return 505
+            case _ if engine == "Diversa":
+                schedulerOutput = self.__diverse_search(activity, end_date_margin, calendar_index, diverse_solutions)
+            case _ if engine == "Franjas" and not self.__use_fast_solver(activity["strategy"], "Optimizacion"):
+                schedulerOutput = self.__optimized_search(activity, end_date_margin, calendar_index, slots=True)
+            case _ if engine == "Franjas":
                 for endDate in end_date_margin:
+                    if not self.__start_candidate():
+                        break
                     activity_to_schedule = {
                         "endDate": endDate,
                         "estimatedHours": activity["estimatedHours"],
-                        "startDate": activity["startOfActivity"]
+                        "startDate": activity["startOfActivity"],
+                        "strategy": activity["strategy"]
                     }
-                    result = self.__aggresive_strategy(activity_to_schedule,calendar,busy_days)
+                    result = self.__slot_strategy(activity_to_schedule, calendar_index)
                     if result:
                         schedulerOutput = result
-                        break 
-            case "Calmada":
+                        break
+            case _ if engine == "Enumeracion" and not self.__use_fast_solver(activity["strategy"], engine):
+                # La búsqueda iterativa con CP-SAT construye el modelo una sola vez por petición ("Unica" e "Incremental" son alias de "Iterativa");
+                # sólo la vía rápida, que no construye modelos, recorre las fechas de fin una a una
+                schedulerOutput = self.__incremental_search(activity, end_date_margin, calendar_index)
+            case _ if engine == "Optimizacion" and not self.__use_fast_solver(activity["strategy"], engine):
+                # Con CP-SAT el modelo de optimización también se construye una sola vez por petición
+                schedulerOutput = self.__optimized_search(activity, end_date_margin, calendar_index)
+            case _ if engine == "Optimizacion":
                 for endDate in end_date_margin:
+                    if not self.__start_candidate():
+                        break
                     activity_to_schedule = {
                         "endDate": endDate,
                         "estimatedHours": activity["estimatedHours"],
-                        "startDate": activity["startOfActivity"]
+                        "startDate": activity["startOfActivity"],
+                        "strategy": activity["strategy"]
                     }
-                    result = self.__calm_strategy(activity_to_schedule,calendar,busy_days)
+                    result = self.__optimized_strategy(activity_to_schedule,calendar_index)
                     if result:
                         schedulerOutput = result
-                        break 
-            case "Completa":
+                        break
+            case _:
                 for endDate in end_date_margin:
+                    if not self.__start_candidate():
+                        break
                     activity_to_schedule = {
                         "endDate": endDate,
                         "estimatedHours": activity["estimatedHours"],
-                        "startDate": activity["startOfActivity"]
+                        "startDate": activity["startOfActivity"],
+                        "strategy": activity["strategy"]
                     }
-                    result = self.__complete_strategy(activity_to_schedule,calendar,busy_days)
+                    result = self.__enumerated_strategy(activity_to_schedule,calendar_index)
                     if result:
                         schedulerOutput = result
-                        break       
-            case _:
-                return 505
+                        break
         
         # Preparación de la salida
-        if schedulerOutput:
-            solutions = []
-            for solution in schedulerOutput[0]:
-                newSchedule = []
-                newCalendar = []
-                for schedule in solution:
-                    date = schedule["calendarDate"]
-                    max_hours = 4 if schedule["dayType"] == "Normal" else 8
-                    newSchedule.append({
-                        "calendarDate": date,
-                        "assignedHours": schedule["assignedHours"]
-                    })
-                    newCalendar.append({
-                        "calendarDate": date,
-                        "dayType": schedule["dayType"],
-                        "status": "Ocupado" if schedule["assignedHours"] == max_hours else "Libre"
-                    })
-                solutions.append({
-                    "newEndDate": schedulerOutput[1],
-                    "schedule": newSchedule,
-                    "modifiedCalendar": newCalendar
-                })
-            if (schedulerOutput[1] == activity["endOfActivity"]):
-                # Asignado correctamente
-                return 200, solutions
-            else:
-                # Asignado correctamente con la fecha de fin cambiada
-                return 201, solutions   
-        else:
-            # No ha sido posible asignar la actividad
-            return 401, None
\ No newline at end of file
+        code, solutions = self.__prepare_output(activity, schedulerOutput)
+        if engine == "Diversa" and solutions:
+            for solution, score in zip(solutions, self.__diversity_scores(solutions, activity["estimatedHours"])):
+                solution["diversityScore"] = score
+        if self.previous_schedule and solutions:
+            for solution in solutions:
+                solution["deviationHours"] = self.__deviation_hours(solution)
+        self.diagnostics["solutionsFound"] = len(solutions or [])
+        self.diagnostics["totalSeconds"] = time.perf_counter() - started
+        if self.solution_listener is not None and solutions and not self.streamed_solutions:
+            # La vía rápida y el motor de optimización no usan recolectores: sus soluciones se entregan al terminar
+            for solution in solutions:
+                self.solution_listener(solution)
+        return code, solutions
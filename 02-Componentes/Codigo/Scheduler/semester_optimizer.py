@@ -0,0 +1,137 @@
+import argparse
+import json
+import os
+import sys
+from datetime import date, timedelta
+from schedule_cache import date_converter
+import scheduler as SchedulerController
+
+""" Reorganización offline de todas las actividades de un curso académico. Se ejecuta desde la carpeta del Scheduler con:
+    python semester_optimizer.py 2024 [--apply] [--workers 16] [--seconds 300]
+    La conexión a la base de datos usa las mismas variables de entorno que la BackendAPI (DATABASE_HOST, DATABASE_USER, ...)
+"""
+
+REOPTIMIZED_STATUSES = ("Asignado", "Confirmar")
+
+
+def academic_year_range(year):
+    """ Un curso académico empieza el 1 de septiembre de 'year' y termina el 31 de agosto del año siguiente """
+    return date(year, 9, 1), date(year + 1, 8, 31)
+
+
+def build_inputs(activity_rows, calendar_rows, schedule_rows):
+    """ Convierte las filas de la base de datos en la entrada de Scheduler.reoptimize_semester.
+        Las horas ocupadas del calendario son sólo las de actividades que no se reorganizan """
+    activities = []
+    for row in activity_rows:
+        # Las actividades pendientes de confirmar ya están organizadas con su nueva fecha de fin
+        endOfActivity = row["NewEndOfActivity"] if row["Status"] == "Confirmar" and row["NewEndOfActivity"] else row["EndOfActivity"]
+        activities.append({
+            "activityId": row["IdActivity"],
+            "estimatedHours": row["EstimatedHours"],
+            "strategy": row["Strategy"] or "Completa",
+            "startOfActivity": row["StartOfActivity"],
+            "endOfActivity": endOfActivity
+        })
+    reoptimized = {activity["activityId"] for activity in activities}
+    busy = {}
+    current_schedule = []
+    for row in schedule_rows:
+        if row["IdActivity"] in reoptimized:
+            current_schedule.append({"activityId": row["IdActivity"], "calendarDate": row["CalendarDate"], "hours": row["Hours"]})
+        else:
+            busy[row["CalendarDate"]] = busy.get(row["CalendarDate"], 0) + row["Hours"]
+    calendar = [{
+        "calendarDate": row["CalendarDate"],
+        "dayType": row["DayType"],
+        "totalHoursBusy": busy.get(row["CalendarDate"], 0)
+    } for row in calendar_rows]
+    return activities, calendar, current_schedule
+
+
+def reoptimize_academic_year(activity_rows, calendar_rows, schedule_rows, max_time_in_seconds=None, num_workers=None):
+    """ Reorganiza el curso completo y devuelve el código de resultado, el diff de 'schedule' y la telemetría """
+    activities, calendar, current_schedule = build_inputs(activity_rows, calendar_rows, schedule_rows)
+    scheduler = SchedulerController.Scheduler(max_time_in_seconds=max_time_in_seconds, num_workers=num_workers, fast_solver=False)
+    result, plan = scheduler.reoptimize_semester(activities, calendar, current_schedule)
+    diff = SchedulerController.Scheduler.schedule_diff(current_schedule, plan) if plan is not None else []
+    return result, diff, dict(scheduler.metadata, diagnostics=scheduler.diagnostics)
+
+
+""" Acceso a la base de datos: mysql.connector sólo es necesario para ejecutar el proceso contra la base de datos """
+
+def connect():
+    import mysql.connector
+    return mysql.connector.connect(
+        host=os.getenv("DATABASE_HOST"),
+        user=os.getenv("DATABASE_USER"),
+        password=os.getenv("DATABASE_PASSWORD"),
+        database=os.getenv("DATABASE_NAME"))
+
+
+def load_academic_year(connection, year):
+    """ Lee las actividades organizadas del curso, su calendario y las filas de 'schedule' de esos días """
+    start, end = academic_year_range(year)
+    cursor = connection.cursor(dictionary=True)
+    try:
+        placeholders = ",".join(["%s"] * len(REOPTIMIZED_STATUSES))
+        cursor.execute(
+            f"SELECT IdActivity, EstimatedHours, Strategy, Status, StartOfActivity, EndOfActivity, NewEndOfActivity FROM activity "
+            f"WHERE Status IN ({placeholders}) AND COALESCE(NewEndOfActivity, EndOfActivity) BETWEEN %s AND %s;",
+            (*REOPTIMIZED_STATUSES, start, end))
+        activity_rows = cursor.fetchall()
+        if not activity_rows:
+            return [], [], []
+        # Días que puede utilizar alguna de las actividades: sin fecha de inicio se usan los 14 días anteriores a su fin
+        first_day = min(row["StartOfActivity"] or row["EndOfActivity"] - timedelta(days=14) for row in activity_rows)
+        last_day = max(row["NewEndOfActivity"] or row["EndOfActivity"] for row in activity_rows)
+        cursor.execute("SELECT CalendarDate, DayType FROM calendar WHERE CalendarDate BETWEEN %s AND %s;", (first_day, last_day))
+        calendar_rows = cursor.fetchall()
+        cursor.execute("SELECT CalendarDate, Hours, IdActivity FROM schedule WHERE CalendarDate BETWEEN %s AND %s;", (first_day, last_day))
+        schedule_rows = cursor.fetchall()
+    finally:
+        cursor.close()
+    return activity_rows, calendar_rows, schedule_rows
+
+
+def apply_diff(connection, diff):
+    """ Aplica todos los cambios de 'schedule' en una única transacción """
+    deletes = [(row["calendarDate"], row["activityId"]) for row in diff if row["action"] == "delete"]
+    upserts = [(row["calendarDate"], row["hours"], row["activityId"]) for row in diff if row["action"] != "delete"]
+    cursor = connection.cursor()
+    try:
+        connection.start_transaction()
+        if deletes:
+            cursor.executemany("DELETE FROM schedule WHERE CalendarDate = %s AND IdActivity = %s;", deletes)
+        if upserts:
+            cursor.executemany("INSERT INTO schedule (CalendarDate, Hours, IdActivity) VALUES (%s, %s, %s) ON DUPLICATE KEY UPDATE Hours = VALUES(Hours);", upserts)
+        connection.commit()
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description="Reorganización de todas las actividades organizadas de un curso académico")
+    parser.add_argument("year", type=int, help="Año de inicio del curso académico (2024 para 2024-2025)")
+    parser.add_argument("--apply", action="store_true", help="Aplica el diff en la base de datos; por defecto sólo se muestra")
+    parser.add_argument("--workers", type=int, default=None, help="Hilos de CP-SAT (por defecto SCHEDULER_WORKERS)")
+    parser.add_argument("--seconds", type=float, default=float(os.getenv("SCHEDULER_REOPTIMIZE_TIME_LIMIT", "300")), help="Tiempo máximo de resolución")
+    arguments = parser.parse_args(arguments)
+
+    connection = connect()
+    try:
+        result, diff, metadata = reoptimize_academic_year(*load_academic_year(connection, arguments.year), max_time_in_seconds=arguments.seconds, num_workers=arguments.workers)
+        if result == 200 and arguments.apply:
+            apply_diff(connection, diff)
+    finally:
+        connection.close()
+    json.dump({"result": result, "applied": result == 200 and arguments.apply, "metadata": metadata, "diff": diff},
+              sys.stdout, default=date_converter, indent=2)
+    return 0 if result == 200 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
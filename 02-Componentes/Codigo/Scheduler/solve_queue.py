@@ -0,0 +1,131 @@
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from starlette.concurrency import run_in_threadpool
+from datetime import date
+import multiprocessing
+import threading
+import asyncio
+import os
+import scheduler as SchedulerController
+
+
+def warm_up_worker():
+    """ Inicializador de cada proceso: con ortools ya importado, realiza una resolución mínima con CP-SAT """
+    SchedulerController.Scheduler(fast_solver=False).search_day_to_assign(
+        activity={"estimatedHours": 1, "strategy": "Completa", "startOfActivity": None, "endOfActivity": date(2025, 1, 1)},
+        calendar=[{"calendarDate": date(2025, 1, 1), "dayType": "Normal", "totalHoursBusy": 0}])
+
+
+def run_search(activity, calendar, options, solution_listener=None, cancelled=None):
+    """ Tarea que se ejecuta en los procesos de la cola: organiza una actividad y devuelve también los metadatos de la búsqueda.
+        Con solution_listener cada solución se entrega en cuanto se encuentra (sólo en el propio proceso) """
+    scheduler = SchedulerController.Scheduler()
+    scheduler.solution_listener = solution_listener
+    scheduler.cancelled = cancelled
+    result, solutions = scheduler.search_day_to_assign(activity, calendar, **options)
+    return result, solutions, dict(scheduler.metadata, diagnostics=scheduler.diagnostics)
+
+
+def run_batch_search(activities, calendar, cohort_busy=None):
+    """ Tarea que se ejecuta en los procesos de la cola: organiza varias actividades de una cohorte con capacidad compartida y devuelve la telemetría """
+    scheduler = SchedulerController.Scheduler()
+    return scheduler.search_days_to_assign_batch(activities, calendar, cohort_busy), scheduler.diagnostics
+
+
+def run_cohort_batch_search(subproblems, calendar, max_parallel=None):
+    """ Tarea que se ejecuta en los procesos de la cola: organiza todos los subproblemas por cohorte [(actividades, horas de la cohorte)]
+        de un lote ocupando un único hueco de la cola. Como mucho max_parallel cohortes se resuelven a la vez en hilos (CP-SAT libera el GIL).
+        Si una cohorte falla, las que aún no han empezado se cancelan y se espera a las que están en curso antes de propagar el error.
+        El subproblema sin cohorte (horas None, el primero) se organiza antes que el resto y sus horas ocupan la capacidad de todas las cohortes """
+    max_parallel = max_parallel or int(os.getenv("SCHEDULER_BATCH_PARALLELISM", "4"))
+    outputs = []
+    if subproblems and subproblems[0][1] is None:
+        outputs.append(run_batch_search(subproblems[0][0], calendar))
+        shared_busy = SchedulerController.Scheduler.planned_busy_hours(outputs[0][0])
+        subproblems = [(activities, cohort_busy + shared_busy) for activities, cohort_busy in subproblems[1:]]
+    if not subproblems:
+        return outputs
+    failed = threading.Event()
+
+    def solve(activities, cohort_busy):
+        # Tras un fallo, las cohortes que quedan en cola no llegan a resolverse
+        if failed.is_set():
+            return None
+        try:
+            return run_batch_search(activities, calendar, cohort_busy)
+        except Exception:
+            failed.set()
+            raise
+
+    executor = ThreadPoolExecutor(max_workers=max(1, min(max_parallel, len(subproblems))))
+    try:
+        futures = [executor.submit(solve, activities, cohort_busy) for activities, cohort_busy in subproblems]
+        return outputs + [future.result() for future in futures]
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+def run_repair(activities, calendar, current_schedule, changed_days):
+    """ Tarea que se ejecuta en los procesos de la cola: repara el plan de las actividades afectadas y devuelve las filas que cambian """
+    # Los modelos de reparación son pequeños: un único hilo evita el coste de arrancar los workers de CP-SAT
+    scheduler = SchedulerController.Scheduler(max_time_in_seconds=float(os.getenv("SCHEDULER_REPAIR_TIME_LIMIT", "1")), num_workers=1)
+    result, plan = scheduler.repair_schedule(activities, calendar, current_schedule, changed_days)
+    diff = []
+    if plan is not None:
+        diff = scheduler.schedule_diff([row for row in current_schedule if row["activityId"] in plan], plan)
+    return result, diff, dict(scheduler.metadata, diagnostics=scheduler.diagnostics)
+
+
+class SolveQueueSaturated(Exception):
+    """ La cola de resolución tiene el máximo de peticiones pendientes """
+    pass
+
+
+class SolveQueue():
+    """ Cola de resoluciones respaldada por un ProcessPoolExecutor para que CP-SAT no compita con el event loop """
+    def __init__(self, size=None, max_backlog=None, retry_after=None):
+        # Con tamaño 0 las resoluciones se ejecutan en el threadpool del propio proceso
+        self.size = size if size is not None else int(os.getenv("SCHEDULER_POOL_SIZE", "0"))
+        self.max_backlog = max_backlog if max_backlog is not None else int(os.getenv("SCHEDULER_MAX_BACKLOG", "32"))
+        self.retry_after = retry_after if retry_after is not None else int(os.getenv("SCHEDULER_RETRY_AFTER", "2"))
+        self.pending = 0
+        self.executor = None
+        self.warm_up_futures = []
+
+    def start(self):
+        """ Crea los procesos y los precalienta para que la primera petición no pague la importación de ortools """
+        if self.size <= 0 or self.executor is not None:
+            return
+        self.executor = ProcessPoolExecutor(
+            max_workers=self.size,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=warm_up_worker)
+        self.warm_up_futures = [self.executor.submit(os.getpid) for _ in range(self.size)]
+
+    async def warm_up(self):
+        """ Resolución sintética en el propio proceso y espera a que los procesos de la cola estén precalentados """
+        await run_in_threadpool(warm_up_worker)
+        self.start()
+        if self.warm_up_futures:
+            await asyncio.gather(*(asyncio.wrap_future(future) for future in self.warm_up_futures))
+
+    def shutdown(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=True, cancel_futures=True)
+            self.executor = None
+
+    def saturated(self):
+        return self.pending >= self.max_backlog
+
+    async def submit(self, function, *args, local=False):
+        """ Encola una resolución. Lanza SolveQueueSaturated si ya hay max_backlog peticiones pendientes.
+            Con local=True se ejecuta en el threadpool del propio proceso, necesario si la tarea recibe callbacks """
+        if self.saturated():
+            raise SolveQueueSaturated()
+        self.pending += 1
+        try:
+            if self.size <= 0 or local:
+                return await run_in_threadpool(function, *args)
+            self.start()
+            return await asyncio.get_running_loop().run_in_executor(self.executor, function, *args)
+        finally:
+            self.pending -= 1
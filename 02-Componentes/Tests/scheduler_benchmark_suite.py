@@ -0,0 +1,173 @@
+import sys
+import os
+import json
+import time
+import random
+import argparse
+import tracemalloc
+from datetime import date, timedelta
+
+sys.path.append(os.path.abspath("Codigo/Scheduler/"))
+import scheduler as SchedulerController
+
+""" Suite de rendimiento del Scheduler con cargas sintéticas y baseline en JSON. Se ejecuta desde la carpeta 02-Componentes con:
+    python -m Tests.scheduler_benchmark_suite                  (compara con el baseline y falla si hay regresiones)
+    python -m Tests.scheduler_benchmark_suite --save-baseline  (guarda el resultado como nuevo baseline)
+    Los tiempos dependen de la máquina: el baseline se debe regenerar en la máquina donde se compara
+"""
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "Benchmarks", "scheduler_baseline.json")
+CASES = 120
+REPETITIONS = 10
+# Una métrica empeora si supera el baseline en más de THRESHOLD y en más del mínimo absoluto (ruido de las medidas pequeñas)
+THRESHOLD = 0.25
+MINIMUM_DELTA = {"p50Ms": 1.0, "p95Ms": 2.0, "p99Ms": 2.0, "peakMemoryKb": 64.0}
+
+
+def generate_workload(cases=CASES, seed=0):
+    """ Genera casos reproducibles: ventanas de 21 a 400 días con distinta densidad de festivos, horas ocupadas,
+        carga (horas estimadas respecto a la capacidad libre, por encima de 1 no caben), estrategia y motor """
+    generator = random.Random(seed)
+    workload = []
+    for i in range(cases):
+        days = generator.randint(21, 400)
+        holiday_density = generator.choice([0.0, 0.15, 0.3, 0.5])
+        max_busy = generator.choice([0, 2, 4])
+        load = generator.choice([0.1, 0.5, 0.9, 1.2])
+        end = date(2025, 6, 30)
+        start = end - timedelta(days=days - 1)
+        calendar = []
+        free_hours = 0
+        # El calendario cubre la ventana y los 3 días de margen tras la fecha de fin, en orden descendente (el Scheduler admite cualquier orden)
+        for d in range(days + 2, -1, -1):
+            dayType = "Festivo" if generator.random() < holiday_density else "Normal"
+            capacity = 4 if dayType == "Normal" else 8
+            busy = generator.randint(0, min(max_busy, capacity))
+            calendar.append({"calendarDate": start + timedelta(days=d), "dayType": dayType, "totalHoursBusy": busy})
+            if d < days:
+                free_hours += capacity - busy
+        workload.append({
+            "id": f"{i:03d}",
+            "days": days,
+            "holidayDensity": holiday_density,
+            "load": load,
+            "engine": generator.choice(["Enumeracion", "Optimizacion"]),
+            "activity": {
+                "estimatedHours": max(int(free_hours * load), 1),
+                "strategy": generator.choice(["Agresiva", "Calmada", "Completa"]),
+                "startOfActivity": start,
+                "endOfActivity": end
+            },
+            "calendar": calendar
+        })
+    return workload
+
+
+def percentile(values, p):
+    """ Percentil por rango más cercano """
+    ordered = sorted(values)
+    return ordered[max(int(-(-p * len(ordered) // 100)) - 1, 0)]
+
+
+def run_case(case, repetitions=REPETITIONS):
+    """ Tiempos (ms) de varias ejecuciones de un caso, código, soluciones encontradas y memoria máxima de Python (KB) """
+    times = []
+    for _ in range(repetitions):
+        started = time.perf_counter()
+        result, solutions = SchedulerController.Scheduler().search_day_to_assign(dict(case["activity"]), case["calendar"], engine=case["engine"])
+        times.append((time.perf_counter() - started) * 1000)
+    # La memoria se mide en una ejecución aparte porque tracemalloc ralentiza las asignaciones
+    tracemalloc.start()
+    SchedulerController.Scheduler().search_day_to_assign(dict(case["activity"]), case["calendar"], engine=case["engine"])
+    _current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"times": times, "result": result, "solutionsFound": len(solutions or []), "peakMemoryKb": peak / 1024}
+
+
+def summarize(runs):
+    """ Métricas agregadas de un grupo de casos """
+    times = [t for run in runs for t in run["times"]]
+    return {
+        "cases": len(runs),
+        "p50Ms": round(percentile(times, 50), 3),
+        "p95Ms": round(percentile(times, 95), 3),
+        "p99Ms": round(percentile(times, 99), 3),
+        "solutionsFound": sum(run["solutionsFound"] for run in runs),
+        "results": {str(code): sum(run["result"] == code for run in runs) for code in sorted({run["result"] for run in runs})},
+        "peakMemoryKb": round(max(run["peakMemoryKb"] for run in runs), 1)
+    }
+
+
+def run_suite(cases=CASES, seed=0, repetitions=REPETITIONS):
+    """ Ejecuta toda la carga y agrupa las métricas por estrategia y motor, más el total """
+    groups = {}
+    for case in generate_workload(cases, seed):
+        run = run_case(case, repetitions)
+        groups.setdefault(f'{case["activity"]["strategy"]}/{case["engine"]}', []).append(run)
+        groups.setdefault("Total", []).append(run)
+    return {
+        "cases": cases,
+        "seed": seed,
+        "repetitions": repetitions,
+        "groups": {name: summarize(runs) for name, runs in sorted(groups.items())}
+    }
+
+
+def compare(results, baseline, threshold=THRESHOLD):
+    """ Devuelve la lista de regresiones respecto al baseline: métricas más lentas o con más memoria y cambios en las soluciones """
+    regressions = []
+    if (results["cases"], results["seed"]) != (baseline["cases"], baseline["seed"]):
+        return [f'The baseline was generated with {baseline["cases"]} cases and seed {baseline["seed"]}']
+    for name, group in results["groups"].items():
+        previous = baseline["groups"].get(name)
+        if previous is None:
+            continue
+        for metric, minimum_delta in MINIMUM_DELTA.items():
+            if group[metric] > previous[metric] * (1 + threshold) and group[metric] - previous[metric] > minimum_delta:
+                regressions.append(f"{name} {metric}: {previous[metric]} -> {group[metric]}")
+        if (group["solutionsFound"], group["results"]) != (previous["solutionsFound"], previous["results"]):
+            regressions.append(f'{name} solutions: {previous["solutionsFound"]} {previous["results"]} -> {group["solutionsFound"]} {group["results"]}')
+    return regressions
+
+
+def print_results(results, baseline=None):
+    print(f"{'Grupo':>22} {'Casos':>6} {'p50 (ms)':>10} {'p95 (ms)':>10} {'p99 (ms)':>10} {'Soluciones':>11} {'Memoria (KB)':>13} {'p95 baseline':>13}")
+    for name, group in results["groups"].items():
+        previous = (baseline or {}).get("groups", {}).get(name, {}).get("p95Ms", "-")
+        print(f"{name:>22} {group['cases']:>6} {group['p50Ms']:>10.2f} {group['p95Ms']:>10.2f} {group['p99Ms']:>10.2f} "
+              f"{group['solutionsFound']:>11} {group['peakMemoryKb']:>13.1f} {previous:>13}")
+
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description="Suite de rendimiento del Scheduler")
+    parser.add_argument("--cases", type=int, default=CASES)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repetitions", type=int, default=REPETITIONS)
+    parser.add_argument("--threshold", type=float, default=THRESHOLD, help="Empeoramiento relativo permitido (0.25 = 25%%)")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true", help="Guarda el resultado como baseline en lugar de comparar")
+    arguments = parser.parse_args(arguments)
+
+    results = run_suite(arguments.cases, arguments.seed, arguments.repetitions)
+    if arguments.save_baseline:
+        os.makedirs(os.path.dirname(arguments.baseline), exist_ok=True)
+        with open(arguments.baseline, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print_results(results)
+        return 0
+    baseline = None
+    if os.path.exists(arguments.baseline):
+        with open(arguments.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+    print_results(results, baseline)
+    if baseline is None:
+        print(f"No baseline found at {arguments.baseline}. Run with --save-baseline to create it.")
+        return 0
+    regressions = compare(results, baseline, arguments.threshold)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
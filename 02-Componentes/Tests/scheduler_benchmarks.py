@@ -0,0 +1,394 @@
+import sys
+import os
+import time
+import random
+import statistics
+import json
+import orjson
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+
+sys.path.append(os.path.abspath("Codigo/Scheduler/"))
+import scheduler as SchedulerController
+import semester_optimizer as SemesterOptimizerController
+import capacity_simulation as CapacitySimulationController
+import solve_queue as SolveQueueController
+import load_analytics as LoadAnalyticsController
+from fastapi.encoders import jsonable_encoder
+from Codigo.Scheduler.api_controller import compact_solution
+from Tests.scheduler_tests import load_scheduler_input
+
+""" Benchmarks del Scheduler. Se ejecutan desde la carpeta 02-Componentes con:
+    python -m Tests.scheduler_benchmarks
+"""
+
+REPETITIONS = 20
+
+
+def time_search(activity, calendar, repetitions=REPETITIONS, fast_solver=True, **kwargs):
+    """ Devuelve la mediana (en ms) de varias ejecuciones de search_day_to_assign y el código obtenido """
+    times = []
+    result = None
+    for _ in range(repetitions):
+        scheduler = SchedulerController.Scheduler()
+        if not fast_solver:
+            scheduler.fast_solver = None
+        start = time.perf_counter()
+        result, _solutions = scheduler.search_day_to_assign(dict(activity), calendar, **kwargs)
+        times.append((time.perf_counter() - start) * 1000)
+    return statistics.median(times), result
+
+
+def benchmark_fast_solver():
+    """ Compara la vía rápida en Python puro con CP-SAT en todos los TestInputs """
+    print(f"{'Test':>5} {'Estrategia':>10} {'Motor':>13} {'CP-SAT (ms)':>12} {'Rápida (ms)':>12} {'Mejora':>7}")
+    for testId in range(1, 22):
+        activity, calendar = load_scheduler_input(testId)
+        for engine in ("Enumeracion", "Optimizacion"):
+            if not SchedulerController.FastSolver().supports(activity["strategy"], engine):
+                continue
+            fast_time, _result = time_search(activity, calendar, engine=engine)
+            cp_sat_time, _result = time_search(activity, calendar, fast_solver=False, engine=engine)
+            print(f"{testId:>5} {activity['strategy']:>10} {engine:>13} {cp_sat_time:>12.2f} {fast_time:>12.2f} {cp_sat_time / fast_time:>6.1f}x")
+
+
+def synthetic_window(days, estimated_hours, strategy, seed=0):
+    """ Actividad con startDate y calendario de 'days' días (más los 3 de margen) con horas ocupadas aleatorias """
+    generator = random.Random(seed)
+    end = date(2025, 5, 7)
+    start = end - timedelta(days=days - 1)
+    calendar = []
+    for i in range(days + 3):
+        dayType = generator.choice(["Normal"] * 5 + ["Festivo"] * 2)
+        calendar.append({
+            "calendarDate": start + timedelta(days=i),
+            "dayType": dayType,
+            "totalHoursBusy": generator.randint(0, 4 if dayType == "Normal" else 8)
+        })
+    activity = {"estimatedHours": estimated_hours, "strategy": strategy, "startOfActivity": start, "endOfActivity": end}
+    return activity, calendar
+
+
+def model_build_times(activity, calendar, repetitions=REPETITIONS):
+    """ Mediana (en ms) del tiempo de construcción del modelo de enumeración para las fechas de fin que la búsqueda llega a probar:
+        un modelo nuevo por fecha candidata (búsqueda anterior) frente a un único modelo con dominios ajustados por fecha (actual).
+        No incluye el tiempo del solver. Devuelve también el código y el número de fechas probadas """
+    scheduler = SchedulerController.Scheduler()
+    scheduler.fast_solver = None
+    result, _solutions = scheduler.search_day_to_assign(dict(activity), calendar)
+    tried = scheduler.diagnostics["candidatesTried"]
+    index = SchedulerController.CalendarIndex(calendar)
+    end_date_margin = scheduler._Scheduler__capacity_precheck(activity, scheduler._Scheduler__end_date_margin(activity), index)[:tried]
+    spec = SchedulerController.STRATEGIES[activity["strategy"]]
+    rebuild_times, reuse_times = [], []
+    for _ in range(repetitions):
+        start = time.perf_counter()
+        for endDate in end_date_margin:
+            _windows, available_days = scheduler._Scheduler__candidate_windows(activity, [endDate], index)
+            model = SchedulerController.cp_model.CpModel()
+            day_availability = scheduler._Scheduler__day_variables(model, available_days, activity["estimatedHours"])
+            scheduler._Scheduler__search_strategy(spec, model, day_availability)
+        rebuild_times.append((time.perf_counter() - start) * 1000)
+        start = time.perf_counter()
+        windows, available_days = scheduler._Scheduler__candidate_windows(activity, end_date_margin, index)
+        model = SchedulerController.cp_model.CpModel()
+        day_availability = scheduler._Scheduler__day_variables(model, available_days, activity["estimatedHours"])
+        scheduler._Scheduler__search_strategy(spec, model, day_availability)
+        limits = [min(day["timeAvailable"], 4 if day["dayType"] == "Normal" else 8) for day in available_days]
+        for window in windows:
+            for day, var, limit in zip(available_days, day_availability, limits):
+                var.Proto().domain[:] = [0, limit if day["calendarDate"] in window else 0]
+        reuse_times.append((time.perf_counter() - start) * 1000)
+    return statistics.median(rebuild_times), statistics.median(reuse_times), result, tried
+
+
+def benchmark_incremental_model():
+    """ Tiempo de construcción del modelo con CP-SAT, sin el del solver: reconstrucción por fecha de fin candidata frente a un único
+        modelo reutilizado, en ventanas largas donde la búsqueda prueba más de una fecha de fin tras la comprobación previa de capacidad.
+        La búsqueda "Incremental" es hoy un alias de "Iterativa", que ya reutiliza el modelo """
+    print(f"{'Días':>5} {'Estrategia':>10} {'Horas':>6} {'Código':>7} {'Fechas':>7} {'Reconstrucción (ms)':>20} {'Reutilización (ms)':>19} {'Mejora':>7}")
+    # Sólo FinesDeSemana y Holgada fallan en fechas que superan la comprobación de capacidad; en el resto la primera fecha probada es la buena
+    for days in (60, 200):
+        for strategy in ("FinesDeSemana", "Holgada"):
+            pending = {201, 401}
+            for estimated_hours in range(days // 3, 3 * days, days // 3):
+                for seed in range(5 if pending else 0):
+                    activity, calendar = synthetic_window(days, estimated_hours, strategy, seed)
+                    rebuild_time, reuse_time, result, tried = model_build_times(activity, calendar)
+                    if tried > 1 and result in pending:
+                        pending.discard(result)
+                        print(f"{days:>5} {strategy:>10} {estimated_hours:>6} {result:>7} {tried:>7} {rebuild_time:>20.2f} {reuse_time:>19.2f} {rebuild_time / reuse_time:>6.1f}x")
+
+
+def perturbed_input(activity, calendar, solution, seed=0):
+    """ Edición de una actividad ya organizada: cambia una hora la estimación y ocupa una hora más de uno de sus días """
+    generator = random.Random(seed)
+    activity = dict(activity, estimatedHours=max(activity["estimatedHours"] + generator.choice([-1, 1]), 1))
+    busy_day = generator.choice(solution["schedule"])["calendarDate"]
+    calendar = [dict(day, totalHoursBusy=day["totalHoursBusy"] + 1) if day["calendarDate"] == busy_day else day for day in calendar]
+    previous_schedule = [{"calendarDate": day["calendarDate"], "hours": day["assignedHours"]} for day in solution["schedule"]]
+    return activity, calendar, previous_schedule
+
+
+def benchmark_previous_schedule():
+    """ Reorganización de TestInputs editados con CP-SAT: sin plan anterior, con el plan como pista y minimizando la desviación """
+    print(f"{'Test':>5} {'Estrategia':>10} {'Sin plan (ms)':>14} {'Pista (ms)':>11} {'Desviación mínima (ms)':>23} {'Horas movidas':>14}")
+    for testId in range(1, 22):
+        activity, calendar = load_scheduler_input(testId)
+        scheduler = SchedulerController.Scheduler(fast_solver=False)
+        result, solutions = scheduler.search_day_to_assign(dict(activity), calendar, engine="Optimizacion")
+        if result not in (200, 201):
+            continue
+        activity, calendar, previous_schedule = perturbed_input(activity, calendar, solutions[0], seed=testId)
+        cold_time, _result = time_search(activity, calendar, fast_solver=False, engine="Optimizacion")
+        hint_time, _result = time_search(activity, calendar, fast_solver=False, engine="Optimizacion", previous_schedule=previous_schedule)
+        stable_time, _result = time_search(activity, calendar, fast_solver=False, engine="Optimizacion", previous_schedule=previous_schedule, minimize_deviation=True)
+        moved = []
+        for minimize_deviation in (False, True):
+            _result, solutions = SchedulerController.Scheduler(fast_solver=False).search_day_to_assign(
+                dict(activity), calendar, engine="Optimizacion", previous_schedule=previous_schedule, minimize_deviation=minimize_deviation)
+            moved.append(str(solutions[0]["deviationHours"]) if solutions else "-")
+        print(f"{testId:>5} {activity['strategy']:>10} {cold_time:>14.2f} {hint_time:>11.2f} {stable_time:>23.2f} {' -> '.join(moved):>14}")
+
+
+def benchmark_compact_response():
+    """ Tamaño y tiempo de serialización de las soluciones de ventanas largas: formato completo con json frente a compacto con orjson """
+    print(f"{'Días':>5} {'Completo (KB)':>14} {'Compacto (KB)':>14} {'json (ms)':>10} {'orjson (ms)':>12}")
+    for days in (60, 365):
+        activity, calendar = synthetic_window(days, days * 2, "Calmada")
+        _result, solutions = SchedulerController.Scheduler().search_day_to_assign(activity, calendar)
+        full = {"solutions": solutions}
+        compact = {"solutions": [compact_solution(solution) for solution in solutions]}
+        times = {}
+        for name, encode in (("json", lambda: json.dumps(jsonable_encoder(full)).encode()), ("orjson", lambda: orjson.dumps(compact))):
+            started = time.perf_counter()
+            for _ in range(REPETITIONS):
+                payload = encode()
+            times[name] = ((time.perf_counter() - started) * 1000 / REPETITIONS, len(payload) / 1024)
+        print(f"{days:>5} {times['json'][1]:>14.1f} {times['orjson'][1]:>14.1f} {times['json'][0]:>10.2f} {times['orjson'][0]:>12.2f}")
+
+
+def synthetic_semester(activities, seed=0):
+    """ Filas de base de datos con 'activities' actividades organizadas de forma voraz al final de su ventana de 15 días.
+        Un calendario de 300 días sólo admite unas 440 actividades, así que el calendario crece con el número de actividades
+        (un día por actividad, con 300 como mínimo) para que se generen todas las pedidas con una ocupación parecida """
+    generator = random.Random(seed)
+    start = date(2024, 9, 1)
+    days = max(300, activities)
+    calendar_rows = [{"CalendarDate": start + timedelta(days=i), "DayType": "Festivo" if i % 7 >= 5 else "Normal"} for i in range(days)]
+    free = {row["CalendarDate"]: 4 if row["DayType"] == "Normal" else 8 for row in calendar_rows}
+    activity_rows = []
+    schedule_rows = []
+    attempts = 0
+    while len(activity_rows) < activities and attempts < 10 * activities:
+        attempts += 1
+        activityId = attempts - 1
+        end = start + timedelta(days=generator.randint(20, days - 1))
+        estimated_hours = generator.randint(1, 6)
+        rows = []
+        for i in range(15):
+            hours = min(estimated_hours - sum(row["Hours"] for row in rows), free[end - timedelta(days=i)])
+            if hours > 0:
+                rows.append({"CalendarDate": end - timedelta(days=i), "Hours": hours, "IdActivity": activityId})
+        if sum(row["Hours"] for row in rows) < estimated_hours:
+            continue
+        for row in rows:
+            free[row["CalendarDate"]] -= row["Hours"]
+        schedule_rows += rows
+        activity_rows.append({
+            "IdActivity": activityId, "EstimatedHours": estimated_hours, "Strategy": generator.choice(["Agresiva", "Calmada", "Completa"]),
+            "Status": "Asignado", "StartOfActivity": end - timedelta(days=14), "EndOfActivity": end, "NewEndOfActivity": None
+        })
+    return activity_rows, calendar_rows, schedule_rows
+
+
+def benchmark_semester_reoptimization():
+    """ Tiempo de la reorganización del curso completo con un límite de 30 segundos """
+    print(f"{'Actividades':>12} {'Días':>5} {'Código':>7} {'Estado':>9} {'Cambios':>8} {'Modelo (s)':>11} {'Total (s)':>10}")
+    for activities in (100, 500, 3000):
+        activity_rows, calendar_rows, schedule_rows = synthetic_semester(activities)
+        result, diff, metadata = SemesterOptimizerController.reoptimize_academic_year(activity_rows, calendar_rows, schedule_rows, max_time_in_seconds=30)
+        diagnostics = metadata["diagnostics"]
+        print(f"{len(activity_rows):>12} {len(calendar_rows):>5} {result:>7} {metadata.get('solverStatus', '-'):>9} {len(diff):>8} {diagnostics['modelBuildSeconds']:>11.2f} {diagnostics['totalSeconds']:>10.2f}")
+
+
+def benchmark_capacity_simulation():
+    """ Simulación vectorizada de actividades hipotéticas frente a organizar cada una con el Organizador en un calendario de un año.
+        La última columna envía la simulación a un proceso de la cola de resoluciones: enviar el calendario y las actividades al proceso
+        cuesta más que la propia pasada de NumPy, por lo que el endpoint simula en su proceso """
+    print(f"{'Actividades':>12} {'Organizador (ms)':>17} {'Simulación (ms)':>16} {'Cola (ms)':>10} {'Viables':>8}")
+    _activity, calendar = synthetic_window(365, 1, "Completa")
+    end = calendar[-4]["calendarDate"]
+    queue = SolveQueueController.SolveQueue(size=1, max_backlog=32)
+    queue.start()
+    asyncio.run(queue.warm_up())
+
+    try:
+        for count in (100, 500, 10000):
+            generator = random.Random(count)
+            activities = []
+            for _ in range(count):
+                endOfActivity = end - timedelta(days=generator.randint(0, 330))
+                activities.append({"estimatedHours": generator.randint(1, 40), "strategy": generator.choice(list(SchedulerController.STRATEGIES)),
+                                   "startOfActivity": endOfActivity - timedelta(days=generator.randint(0, 30)), "endOfActivity": endOfActivity})
+            started = time.perf_counter()
+            for activity in activities:
+                SchedulerController.Scheduler().search_day_to_assign(dict(activity), calendar)
+            scheduler_ms = (time.perf_counter() - started) * 1000
+            started = time.perf_counter()
+            for _ in range(REPETITIONS):
+                simulation = CapacitySimulationController.simulate(activities, calendar)
+            simulation_ms = (time.perf_counter() - started) * 1000 / REPETITIONS
+            started = time.perf_counter()
+            for _ in range(REPETITIONS):
+                queued = asyncio.run(queue.submit(CapacitySimulationController.simulate, activities, calendar))
+            queue_ms = (time.perf_counter() - started) * 1000 / REPETITIONS
+            assert queued["activities"] == simulation["activities"]
+            feasible = sum(result["feasible"] for result in simulation["activities"])
+            print(f"{count:>12} {scheduler_ms:>17.1f} {simulation_ms:>16.2f} {queue_ms:>10.2f} {feasible:>8}")
+    finally:
+        queue.shutdown()
+
+
+def benchmark_load_analytics():
+    """ Analítica de carga de un calendario sintético de 5 años: bucle en Python sobre las filas de vActivitiesPerDay frente a NumPy """
+    generator = random.Random(0)
+    start = date(2020, 9, 1)
+    calendar = [{"calendarDate": start + timedelta(days=i), "dayType": "Festivo" if i % 7 >= 5 else "Normal"} for i in range(5 * 365)]
+    schedule = [{"calendarDate": start + timedelta(days=generator.randrange(len(calendar))), "hours": generator.randint(1, 4),
+                 "activityId": generator.randint(1, 3000), "subjectId": generator.randint(1, 200)} for _ in range(20000)]
+    # Filas como las de vActivitiesPerDay: las actividades de cada día en una cadena JSON
+    per_day = {}
+    for row in schedule:
+        per_day.setdefault(row["calendarDate"], []).append({"Activity": row["activityId"], "Hours": row["hours"], "Subject": row["subjectId"]})
+    view_rows = [dict(day, Activities=json.dumps(per_day.get(day["calendarDate"], []))) for day in calendar]
+
+    def python_loop():
+        load, subjects = [], {}
+        for day in view_rows:
+            hours = 0
+            for activity in json.loads(day["Activities"]):
+                hours += activity["Hours"]
+                subjects[activity["Subject"]] = subjects.get(activity["Subject"], 0) + activity["Hours"]
+            load.append(hours)
+        rolling = [sum(load[max(i - 6, 0):i + 1]) for i in range(len(load))]
+        return load, subjects, rolling
+
+    print(f"{'Días':>6} {'Filas':>7} {'Python (ms)':>12} {'NumPy (ms)':>11} {'JSON (KB)':>10}")
+    times = {}
+    for name, function in (("python", python_loop), ("numpy", lambda: LoadAnalyticsController.analyze(calendar, schedule))):
+        started = time.perf_counter()
+        for _ in range(REPETITIONS):
+            result = function()
+        times[name] = (time.perf_counter() - started) * 1000 / REPETITIONS
+    payload = orjson.dumps(result)
+    print(f"{len(calendar):>6} {len(schedule):>7} {times['python']:>12.2f} {times['numpy']:>11.2f} {len(payload) / 1024:>10.1f}")
+
+
+def benchmark_slot_engine():
+    """ Coste del motor Franjas (colocación voraz en franjas horarias) frente al motor por defecto en los TestInputs que ambos resuelven,
+        con el maxConsecutiveHours por defecto. Las dos comparaciones usan la misma configuración de vía rápida en los dos motores
+        (activada, la de producción, y desactivada, sólo CP-SAT) """
+    print(f"{'Test':>5} {'Estrategia':>10} {'Código':>7} {'Actual (ms)':>12} {'Franjas (ms)':>13} {'Ratio':>7} {'Actual CP-SAT (ms)':>19} {'Franjas CP-SAT (ms)':>20} {'Ratio':>7}")
+    ratios = {"fast": [], "cp_sat": []}
+    for testId in range(1, 22):
+        activity, calendar = load_scheduler_input(testId)
+        current_time, result = time_search(activity, calendar)
+        if result not in (200, 201):
+            continue
+        slot_time, slot_result = time_search(activity, calendar, engine="Franjas")
+        current_cp_sat_time, _result = time_search(activity, calendar, fast_solver=False)
+        slot_cp_sat_time, _result = time_search(activity, calendar, fast_solver=False, engine="Franjas")
+        assert slot_result == result
+        ratios["fast"].append(slot_time / current_time)
+        ratios["cp_sat"].append(slot_cp_sat_time / current_cp_sat_time)
+        print(f"{testId:>5} {activity['strategy']:>10} {result:>7} {current_time:>12.3f} {slot_time:>13.3f} {ratios['fast'][-1]:>6.1f}x"
+              f" {current_cp_sat_time:>19.2f} {slot_cp_sat_time:>20.2f} {ratios['cp_sat'][-1]:>6.1f}x")
+    print(f"Ratio Franjas / actual: mediana {statistics.median(ratios['fast']):.1f}x y máximo {max(ratios['fast']):.1f}x con vía rápida,"
+          f" mediana {statistics.median(ratios['cp_sat']):.1f}x y máximo {max(ratios['cp_sat']):.1f}x sólo con CP-SAT ({len(ratios['fast'])} casos)")
+
+
+def synthetic_cohorts(cohorts, activities_per_cohort, seed=0):
+    """ Lote de actividades de varias cohortes sobre un calendario de 120 días, con las clases de cada cohorte como vector disperso """
+    generator = random.Random(seed)
+    end = date(2025, 5, 31)
+    calendar = [{"calendarDate": end + timedelta(days=3 - i), "dayType": "Festivo" if i % 7 < 2 else "Normal", "totalHoursBusy": 0} for i in range(123)]
+    activities = []
+    cohort_busy_hours = []
+    for c in range(cohorts):
+        cohort = {"degree": f"Grado {c // 4}", "year": c % 4 + 1}
+        for day in calendar:
+            if day["dayType"] == "Normal" and generator.random() < 0.6:
+                cohort_busy_hours.append(dict(cohort, calendarDate=day["calendarDate"], hours=generator.randint(1, 3)))
+        for _ in range(activities_per_cohort):
+            activity_end = end - timedelta(days=generator.randint(0, 100))
+            activities.append({"estimatedHours": generator.randint(2, 10), "strategy": generator.choice(["Agresiva", "Calmada", "Completa"]),
+                               "startOfActivity": activity_end - timedelta(days=14), "endOfActivity": activity_end, "cohort": cohort})
+    return activities, calendar, cohort_busy_hours
+
+
+def benchmark_cohort_batch():
+    """ Lote con varias cohortes dividido en un subproblema por cohorte: resolución secuencial frente a paralela (CP-SAT libera el GIL),
+        y el mismo lote como un único modelo sin cohortes, con toda la capacidad compartida, como referencia del tamaño del modelo """
+    print(f"{'Cohortes':>9} {'Actividades':>12} {'Modelo único (ms)':>18} {'Secuencial (ms)':>16} {'Paralelo (ms)':>14} {'Asignadas':>10}")
+    for cohorts in (4, 8, 16):
+        activities, calendar, cohort_busy_hours = synthetic_cohorts(cohorts, 10)
+        subproblems = SchedulerController.Scheduler.cohort_subproblems(activities, cohort_busy_hours)
+        solve = lambda subproblem: SchedulerController.Scheduler(num_workers=1).search_days_to_assign_batch(subproblem[1], calendar, subproblem[2])
+        started = time.perf_counter()
+        SchedulerController.Scheduler(num_workers=1).search_days_to_assign_batch(activities, calendar)
+        joint_time = (time.perf_counter() - started) * 1000
+        started = time.perf_counter()
+        sequential = [solve(subproblem) for subproblem in subproblems]
+        sequential_time = (time.perf_counter() - started) * 1000
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+            parallel = list(executor.map(solve, subproblems))
+        parallel_time = (time.perf_counter() - started) * 1000
+        assigned = sum(result in (200, 201) for results in parallel for result, _solutions in results)
+        assert parallel == sequential
+        print(f"{cohorts:>9} {len(activities):>12} {joint_time:>18.2f} {sequential_time:>16.2f} {parallel_time:>14.2f} {assigned:>10}")
+
+
+def benchmark_columnar_calendar():
+    """ Validación de la petición y construcción del índice del calendario: lista de objetos Calendar frente a columnas """
+    from Codigo.Scheduler.api_controller import ScheduleActivity, ScheduleActivityColumnar
+    print(f"{'Días':>6} {'Lista (ms)':>11} {'Columnas (ms)':>14} {'Mejora':>7} {'Lista (KB)':>11} {'Columnas (KB)':>14}")
+    for days in (30, 400, 1500):
+        activity, calendar = synthetic_window(days, 10, "Completa")
+        list_body = json.dumps({"activity": activity, "calendar": calendar}, default=str).encode()
+        columnar_body = json.dumps({"activity": activity, "calendar": {
+            "dates": [day["calendarDate"] for day in calendar],
+            "dayTypes": [day["dayType"] for day in calendar],
+            "busyHours": [day["totalHoursBusy"] for day in calendar]}}, default=str).encode()
+
+        def list_request():
+            information = ScheduleActivity.model_validate_json(list_body)
+            return SchedulerController.CalendarIndex([day.dict() for day in information.calendar])
+
+        def columnar_request():
+            columns = ScheduleActivityColumnar.model_validate_json(columnar_body).calendar
+            return SchedulerController.CalendarIndex.from_columns(columns.dates, columns.dayTypes, columns.busyHours)
+
+        times = {}
+        for name, function in (("list", list_request), ("columnar", columnar_request)):
+            started = time.perf_counter()
+            for _ in range(REPETITIONS):
+                function()
+            times[name] = (time.perf_counter() - started) * 1000 / REPETITIONS
+        print(f"{days:>6} {times['list']:>11.2f} {times['columnar']:>14.2f} {times['list'] / times['columnar']:>6.1f}x "
+              f"{len(list_body) / 1024:>11.1f} {len(columnar_body) / 1024:>14.1f}")
+
+
+if __name__ == "__main__":
+    benchmark_fast_solver()
+    benchmark_incremental_model()
+    benchmark_previous_schedule()
+    benchmark_compact_response()
+    benchmark_semester_reoptimization()
+    benchmark_capacity_simulation()
+    benchmark_load_analytics()
+    benchmark_slot_engine()
+    benchmark_cohort_batch()
+    benchmark_columnar_calendar()
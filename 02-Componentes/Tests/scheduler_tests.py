@@ -2,12 +2,24 @@ import unittest
 import sys
 import os
 import json
+import random
 from unittest.mock import patch
 from fastapi.testclient import TestClient
-from datetime import date
+from datetime import date, timedelta
 
 sys.path.append(os.path.abspath("Codigo/Scheduler/"))
-from Codigo.Scheduler.api_controller import app
+from Codigo.Scheduler.api_controller import app, Activity, Calendar, ScheduleActivityColumnar, solve_queue, schedule_cache
+import scheduler as SchedulerController
+import solve_queue as SolveQueueController
+import schedule_cache as ScheduleCacheController
+import semester_optimizer as SemesterOptimizerController
+import capacity_simulation as CapacitySimulationController
+import load_analytics as LoadAnalyticsController
+from Tests import scheduler_benchmark_suite as BenchmarkSuite
+import asyncio
+import tempfile
+import threading
+import time
 
 client = TestClient(app)
 
@@ -167,6 +179,13 @@ def load_json_input(testId: int):
     with open(path, "r", encoding="utf-8") as f:
         return json.load(f)
 
+def load_scheduler_input(testId: int):
+    """ Función para precargar un input en el formato interno que recibe el Scheduler """
+    input = load_json_input(testId)
+    activity = Activity.model_validate(input["activity"]).model_dump()
+    calendar = [Calendar.model_validate(day).model_dump() for day in input["calendar"]]
+    return activity, calendar
+
 class TestAggresiveScheduler(unittest.TestCase):
     
     def run_scheduler_test(self):
@@ -415,6 +434,1220 @@ class TestResultCodeAPI(unittest.TestCase):
         """23 Test: Codigo 505 en la respuesta"""
         self.run_scheduler_test(mock_search_day_to_assign)
 
+class TestSingleModelScheduler(unittest.TestCase):
+
+    def test_single_model_same_result(self):
+        """24 Test: La búsqueda "Unica" es un alias de "Iterativa" con todos los motores, con y sin vía rápida"""
+        for testId in range(1, 22):
+            with self.subTest(testId=testId):
+                activity, calendar = load_scheduler_input(testId)
+                for engine in ("Enumeracion", "Optimizacion"):
+                    # fast_solver=None usa la vía rápida y False resuelve siempre con CP-SAT
+                    for fast_solver in (None, False):
+                        expected = SchedulerController.Scheduler(num_workers=1, fast_solver=fast_solver).search_day_to_assign(dict(activity), calendar, engine=engine)
+                        result = SchedulerController.Scheduler(num_workers=1, fast_solver=fast_solver).search_day_to_assign(dict(activity), calendar, search_mode="Unica", engine=engine)
+                        self.assertEqual(result, expected)
+
+    def test_incremental_model_same_result(self):
+        """42 Test: La búsqueda "Incremental" es un alias de "Iterativa", con y sin vía rápida, y comparte con ella la caché de la API"""
+        for testId in range(1, 22):
+            with self.subTest(testId=testId):
+                activity, calendar = load_scheduler_input(testId)
+                for scheduler in (SchedulerController.Scheduler, cp_sat_scheduler):
+                    expected = scheduler().search_day_to_assign(dict(activity), calendar)
+                    self.assertEqual(scheduler().search_day_to_assign(dict(activity), calendar, search_mode="Incremental"), expected)
+        schedule_cache.clear()
+        input = load_json_input(12)
+        expected = client.post("/scheduler/logic/activity/", json=input)
+        response = client.post("/scheduler/logic/activity/", json=dict(input, searchMode="Incremental"))
+        self.assertTrue(response.json()["metadata"]["cached"])
+        self.assertEqual(response.json()["solutions"], expected.json()["solutions"])
+
+    def test_single_model_api(self):
+        """25 Test: Petición con searchMode Unica, con startDate, resultCode 201: responde lo mismo que Iterativa y comparte su caché"""
+        schedule_cache.clear()
+        input = load_json_input(6)
+        expected = client.post("/scheduler/logic/activity/", json=input)
+        response = client.post("/scheduler/logic/activity/", json=dict(input, searchMode="Unica"))
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(response.json()["metadata"]["cached"])
+        self.assertEqual(response.json()["solutions"], expected.json()["solutions"])
+        self.assertGreater(date.fromisoformat(response.json()["solutions"][0]["newEndDate"]), date.fromisoformat(input["activity"]["endOfActivity"]))
+
+class TestOptimizationScheduler(unittest.TestCase):
+
+    def test_optimization_same_result_code(self):
+        """26 Test: El motor de optimización devuelve el mismo código y fecha de fin que la enumeración"""
+        for testId in range(1, 22):
+            with self.subTest(testId=testId):
+                activity, calendar = load_scheduler_input(testId)
+                expected_code, expected_solutions = SchedulerController.Scheduler().search_day_to_assign(dict(activity), calendar)
+                result_code, solutions = SchedulerController.Scheduler(max_time_in_seconds=5).search_day_to_assign(dict(activity), calendar, engine="Optimizacion")
+                self.assertEqual(result_code, expected_code)
+                if expected_solutions:
+                    self.assertEqual(len(solutions), 1)
+                    self.assertEqual(solutions[0]["newEndDate"], expected_solutions[0]["newEndDate"])
+                    self.assertEqual(solutions[0]["solverStatus"], "OPTIMAL")
+                    self.assertEqual(sum(day["assignedHours"] for day in solutions[0]["schedule"]), activity["estimatedHours"])
+
+    def test_optimization_objectives(self):
+        """27 Test: Cada estrategia optimiza su objetivo (agresiva, calmada y completa)"""
+        activity, calendar = load_scheduler_input(9)
+        busy = {day["calendarDate"]: day["totalHoursBusy"] for day in calendar}
+        loads = {}
+        for strategy in ("Agresiva", "Calmada", "Completa"):
+            activity["strategy"] = strategy
+            _result, solutions = SchedulerController.Scheduler().search_day_to_assign(dict(activity), calendar, engine="Optimizacion")
+            loads[strategy] = {day["calendarDate"]: day["assignedHours"] for day in solutions[0]["schedule"]}
+        # Agresiva: ninguna otra estrategia coloca las horas antes
+        self.assertLessEqual(min(loads["Agresiva"]), min(loads["Calmada"]))
+        # Calmada: la carga máxima diaria es la menor
+        max_load = lambda plan: max(hours + busy[day] for day, hours in plan.items())
+        self.assertLessEqual(max_load(loads["Calmada"]), max_load(loads["Agresiva"]))
+        self.assertLessEqual(max_load(loads["Calmada"]), max_load(loads["Completa"]))
+        # Completa: utiliza el menor número de días
+        self.assertLessEqual(len(loads["Completa"]), len(loads["Calmada"]))
+
+    def test_optimization_api(self):
+        """28 Test: Petición con engine Optimizacion, con startDate, resultCode 200"""
+        input = load_json_input(12)
+        input["engine"] = "Optimizacion"
+        response = client.post("/scheduler/logic/activity/", json=input)
+        self.assertEqual(response.status_code, 200)
+        solutions = response.json().get("solutions")
+        self.assertEqual(len(solutions), 1)
+        self.assertIn(solutions[0]["solverStatus"], ("OPTIMAL", "FEASIBLE"))
+
+    def test_optimization_builds_model_once(self):
+        """91 Test: Con CP-SAT los motores de optimización, diversidad y franjas construyen un único modelo para todas las fechas de fin
+            candidatas, y los días ocupados fuera de la ventana de la fecha elegida no cuentan en la carga máxima"""
+        start = date(2025, 5, 1)
+        end = start + timedelta(days=9)
+        # Holgada deja 3 horas libres en cada día Normal: la fecha de fin original pasa la comprobación previa (40 horas) pero sólo admite 30
+        calendar = [{"calendarDate": start + timedelta(days=i), "dayType": "Normal", "totalHoursBusy": 0} for i in range(10)]
+        calendar += [{"calendarDate": end + timedelta(days=1), "dayType": "Festivo", "totalHoursBusy": 0},
+                     {"calendarDate": end + timedelta(days=2), "dayType": "Festivo", "totalHoursBusy": 6},
+                     {"calendarDate": end + timedelta(days=3), "dayType": "Normal", "totalHoursBusy": 0}]
+        busy = {day["calendarDate"]: day["totalHoursBusy"] for day in calendar}
+        activity = {"estimatedHours": 31, "strategy": "Holgada", "startOfActivity": start, "endOfActivity": end}
+        for engine in ("Optimizacion", "Diversa", "Franjas"):
+            with self.subTest(engine=engine):
+                scheduler = SchedulerController.Scheduler(num_workers=1, fast_solver=False)
+                with patch("scheduler.cp_model.CpModel", wraps=SchedulerController.cp_model.CpModel) as model:
+                    code, solutions = scheduler.search_day_to_assign(dict(activity), calendar, engine=engine)
+                self.assertEqual(model.call_count, 1)
+                self.assertEqual(scheduler.diagnostics["candidatesTried"], 2)
+                self.assertEqual((code, solutions[0]["newEndDate"]), (201, end + timedelta(days=1)))
+                if engine != "Diversa":
+                    # El festivo con 6 horas ocupadas queda fuera de ambas ventanas: la menor carga máxima posible es 3 con 31 horas y 1 con 5
+                    self.assertEqual(max(busy[day["calendarDate"]] + day["assignedHours"] for day in solutions[0]["schedule"]), 3)
+                    _code, solutions = SchedulerController.Scheduler(num_workers=1, fast_solver=False).search_day_to_assign(dict(activity, estimatedHours=5), calendar, engine=engine)
+                    self.assertEqual(max(busy[day["calendarDate"]] + day["assignedHours"] for day in solutions[0]["schedule"]), 1)
+
+def cp_sat_scheduler():
+    """ Scheduler sin vía rápida, resolviendo siempre con CP-SAT """
+    scheduler = SchedulerController.Scheduler()
+    scheduler.fast_solver = None
+    return scheduler
+
+def optimization_objective(activity, calendar, solution):
+    """ Valor del objetivo de cada estrategia del motor de optimización para comparar soluciones """
+    plan = {day["calendarDate"]: day["assignedHours"] for day in solution["schedule"]}
+    match activity["strategy"]:
+        case "Agresiva":
+            return sorted(plan.items())
+        case "Calmada":
+            end = solution["newEndDate"]
+            start = activity["startOfActivity"] or end - timedelta(days=14)
+            window = [day for day in calendar if start <= day["calendarDate"] <= end and day["totalHoursBusy"] < (4 if day["dayType"] == "Normal" else 8)]
+            return max(day["totalHoursBusy"] + plan.get(day["calendarDate"], 0) for day in window)
+        case "Completa":
+            return len(plan)
+
+class TestFastSolverParity(unittest.TestCase):
+
+    def test_fast_solver_enumeration_parity(self):
+        """29 Test: La vía rápida devuelve exactamente la misma salida que CP-SAT en todos los TestInputs"""
+        for testId in range(1, 22):
+            with self.subTest(testId=testId):
+                activity, calendar = load_scheduler_input(testId)
+                expected = cp_sat_scheduler().search_day_to_assign(dict(activity), calendar)
+                result = SchedulerController.Scheduler().search_day_to_assign(dict(activity), calendar)
+                self.assertEqual(result, expected)
+
+    def test_fast_solver_optimization_parity(self):
+        """30 Test: La vía rápida alcanza el mismo óptimo que CP-SAT en el motor de optimización y asigna exactamente las horas estimadas.
+            El TestInput 24 es una actividad Calmada de 3 horas cuyo nivel inicial de carga ya cubre las horas"""
+        for testId in list(range(1, 22)) + [24]:
+            with self.subTest(testId=testId):
+                activity, calendar = load_scheduler_input(testId)
+                expected_code, expected_solutions = cp_sat_scheduler().search_day_to_assign(dict(activity), calendar, engine="Optimizacion")
+                result_code, solutions = SchedulerController.Scheduler().search_day_to_assign(dict(activity), calendar, engine="Optimizacion")
+                self.assertEqual(result_code, expected_code)
+                if expected_solutions:
+                    self.assertEqual(solutions[0]["newEndDate"], expected_solutions[0]["newEndDate"])
+                    self.assertEqual(sum(day["assignedHours"] for day in solutions[0]["schedule"]), activity["estimatedHours"])
+                    self.assertEqual(optimization_objective(activity, calendar, solutions[0]), optimization_objective(activity, calendar, expected_solutions[0]))
+
+    def test_fast_solver_random_parity(self):
+        """31 Test: La vía rápida coincide con CP-SAT en calendarios aleatorios (semilla fija)"""
+        generator = random.Random(2025)
+        end = date(2025, 5, 7)
+        for case in range(60):
+            calendar = []
+            for i in range(25):
+                dayType = generator.choice(["Normal", "Normal", "Festivo"])
+                calendar.append({
+                    "calendarDate": end + timedelta(days=3 - i),
+                    "dayType": dayType,
+                    "totalHoursBusy": generator.randint(0, 4 if dayType == "Normal" else 8)
+                })
+            activity = {
+                "estimatedHours": generator.randint(1, 40),
+                "strategy": generator.choice(["Agresiva", "Calmada", "Completa"]),
+                "startOfActivity": None,
+                "endOfActivity": end
+            }
+            with self.subTest(case=case):
+                self.assertEqual(SchedulerController.Scheduler().search_day_to_assign(dict(activity), calendar), cp_sat_scheduler().search_day_to_assign(dict(activity), calendar))
+                expected_code, expected_solutions = cp_sat_scheduler().search_day_to_assign(dict(activity), calendar, engine="Optimizacion")
+                result_code, solutions = SchedulerController.Scheduler().search_day_to_assign(dict(activity), calendar, engine="Optimizacion")
+                self.assertEqual(result_code, expected_code)
+                if expected_solutions:
+                    self.assertEqual(sum(day["assignedHours"] for day in solutions[0]["schedule"]), activity["estimatedHours"])
+                    self.assertEqual(optimization_objective(activity, calendar, solutions[0]), optimization_objective(activity, calendar, expected_solutions[0]))
+
+class TestSolveQueue(unittest.TestCase):
+
+    def setUp(self):
+        schedule_cache.clear()
+
+    def test_saturated_queue(self):
+        """32 Test: Con la cola llena la respuesta es 503 con Retry-After"""
+        with patch.object(solve_queue, "max_backlog", 0):
+            response = client.post("/scheduler/logic/activity/", json=load_json_input(5))
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.headers["Retry-After"], str(solve_queue.retry_after))
+        self.assertEqual(response.json()["detail"], "Scheduler is saturated. Try again later.")
+
+    def test_process_pool_same_result(self):
+        """33 Test: La resolución en el pool de procesos devuelve lo mismo que en el propio proceso"""
+        activity, calendar = load_scheduler_input(6)
+        expected = SchedulerController.Scheduler().search_day_to_assign(dict(activity), calendar)
+        queue = SolveQueueController.SolveQueue(size=1, max_backlog=4)
+        try:
+            result = asyncio.run(queue.submit(SolveQueueController.run_search, activity, calendar, {}))
+        finally:
+            queue.shutdown()
+        self.assertEqual(result[:2], expected)
+        self.assertIn("precheck", result[2])
+        self.assertEqual(queue.pending, 0)
+
+    def test_pool_split_across_http_workers(self):
+        """83 Test: gunicorn reparte SCHEDULER_POOL_SIZE y SCHEDULER_MAX_BACKLOG entre los workers HTTP"""
+        import runpy
+        for environment, workers, pool_size, max_backlog in (
+                ({"SCHEDULER_HTTP_WORKERS": "2", "SCHEDULER_POOL_SIZE": "4", "SCHEDULER_MAX_BACKLOG": "32"}, 2, "2", "16"),
+                ({"SCHEDULER_HTTP_WORKERS": "4", "SCHEDULER_POOL_SIZE": "2", "SCHEDULER_MAX_BACKLOG": "32"}, 2, "1", "16"),
+                ({"SCHEDULER_HTTP_WORKERS": "2", "SCHEDULER_POOL_SIZE": "0", "SCHEDULER_MAX_BACKLOG": "32"}, 2, "0", "16")):
+            with self.subTest(environment=environment), patch.dict(os.environ, environment):
+                config = runpy.run_path("Codigo/Scheduler/gunicorn.conf.py")
+                self.assertEqual(config["workers"], workers)
+                self.assertEqual(os.environ["SCHEDULER_POOL_SIZE"], pool_size)
+                self.assertEqual(os.environ["SCHEDULER_MAX_BACKLOG"], max_backlog)
+                queue = SolveQueueController.SolveQueue()
+                self.assertEqual((queue.size, queue.max_backlog), (int(pool_size), int(max_backlog)))
+
+class TestScheduleCache(unittest.TestCase):
+
+    def setUp(self):
+        schedule_cache.clear()
+
+    def test_cache_hit_skips_scheduler(self):
+        """34 Test: Un problema repetido se responde desde la caché sin volver a organizar"""
+        input = load_json_input(6)
+        first = client.post("/scheduler/logic/activity/", json=input)
+        with patch("scheduler.Scheduler.search_day_to_assign") as mock_search_day_to_assign:
+            mock_search_day_to_assign.return_value = 505, None
+            second = client.post("/scheduler/logic/activity/", json=input)
+            mock_search_day_to_assign.assert_not_called()
+        self.assertEqual(second.status_code, 201)
+        first, second = first.json(), second.json()
+        self.assertEqual((first["metadata"].pop("cached"), second["metadata"].pop("cached")), (False, True))
+        self.assertEqual(second, first)
+        stats = client.get("/scheduler/cache/").json()["cache"]
+        self.assertEqual((stats["hits"], stats["misses"]), (1, 1))
+
+    def test_canonical_key(self):
+        """35 Test: La clave no depende del orden del calendario ni de los días fuera de la ventana, igual que el plan del Organizador"""
+        activity, calendar = load_scheduler_input(6)
+        key = ScheduleCacheController.ScheduleCache.key(activity, calendar, {"engine": "Enumeracion"})
+        outside = {"calendarDate": date(2024, 1, 1), "dayType": "Normal", "totalHoursBusy": 3}
+        self.assertEqual(key, ScheduleCacheController.ScheduleCache.key(activity, list(reversed(calendar)) + [outside], {"engine": "Enumeracion"}))
+        generator = random.Random(35)
+        for testId in range(1, 25):
+            for engine in ("Enumeracion", "Optimizacion", "Diversa"):
+                with self.subTest(testId=testId, engine=engine):
+                    activity, calendar = load_scheduler_input(testId)
+                    shuffled = list(calendar)
+                    generator.shuffle(shuffled)
+                    expected = SchedulerController.Scheduler(num_workers=1, fast_solver=False).search_day_to_assign(dict(activity), calendar, engine=engine)
+                    self.assertEqual(SchedulerController.Scheduler(num_workers=1, fast_solver=False).search_day_to_assign(dict(activity), list(reversed(calendar)), engine=engine), expected)
+                    self.assertEqual(SchedulerController.Scheduler(num_workers=1, fast_solver=False).search_day_to_assign(dict(activity), shuffled, engine=engine), expected)
+        # Con la caché vacía, la petición con el calendario invertido recibe su propio plan, que es el mismo que el de la caché
+        input = load_json_input(5)
+        schedule_cache.clear()
+        reversed_plan = client.post("/scheduler/logic/activity/", json=dict(input, calendar=input["calendar"][::-1])).json()
+        schedule_cache.clear()
+        plan = client.post("/scheduler/logic/activity/", json=input).json()
+        cached = client.post("/scheduler/logic/activity/", json=dict(input, calendar=input["calendar"][::-1])).json()
+        self.assertTrue(cached["metadata"]["cached"])
+        self.assertEqual(reversed_plan["solutions"], plan["solutions"])
+        self.assertEqual(cached["solutions"], plan["solutions"])
+        self.assertNotEqual(key, ScheduleCacheController.ScheduleCache.key(dict(activity, strategy="Calmada"), calendar, {"engine": "Enumeracion"}))
+        self.assertNotEqual(key, ScheduleCacheController.ScheduleCache.key(activity, calendar, {"engine": "Optimizacion"}))
+
+    def test_lru_and_ttl_eviction(self):
+        """36 Test: Expulsión LRU por tamaño y caducidad por TTL"""
+        cache = ScheduleCacheController.ScheduleCache(max_size=2, ttl=60, backend_path="")
+        cache.set("a", (200, None))
+        cache.set("b", (200, None))
+        cache.get("a")
+        cache.set("c", (200, None))
+        self.assertIsNone(cache.get("b"))
+        self.assertIsNotNone(cache.get("a"))
+        with patch("schedule_cache.time.time", return_value=ScheduleCacheController.time.time() + 61):
+            self.assertIsNone(cache.get("c"))
+        self.assertEqual((cache.stats()["hits"], cache.stats()["misses"]), (2, 2))
+
+    def test_shared_backend(self):
+        """37 Test: Dos cachés con la misma base de datos SQLite comparten resultados"""
+        activity, calendar = load_scheduler_input(6)
+        value = SchedulerController.Scheduler().search_day_to_assign(dict(activity), calendar)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "cache.sqlite")
+            writer = ScheduleCacheController.ScheduleCache(backend_path=path)
+            reader = ScheduleCacheController.ScheduleCache(backend_path=path)
+            key = writer.key(activity, calendar, {})
+            writer.set(key, value)
+            self.assertEqual(reader.get(key), value)
+
+class TestBatchScheduler(unittest.TestCase):
+
+    def batch_input(self, *testIds):
+        """ Petición de lote con las actividades de varios TestInputs sobre el calendario del primero """
+        inputs = [load_json_input(testId) for testId in testIds]
+        return {"activities": [input["activity"] for input in inputs], "calendar": inputs[0]["calendar"]}
+
+    def test_batch_shared_capacity(self):
+        """38 Test: Dos actividades compiten por la misma capacidad y nunca se supera el máximo diario"""
+        input = self.batch_input(5, 12)
+        response = client.post("/scheduler/logic/activities/batch", json=input)
+        self.assertEqual(response.status_code, 200)
+        results = response.json()["activities"]
+        self.assertEqual(sorted(result["result"] for result in results), [200, 401])
+        busy = {day["calendarDate"]: day for day in input["calendar"]}
+        load = {}
+        for result in results:
+            for solution in result["solutions"] or []:
+                for day in solution["schedule"]:
+                    load[day["calendarDate"]] = load.get(day["calendarDate"], 0) + day["assignedHours"]
+        for calendarDate, hours in load.items():
+            self.assertLessEqual(hours + busy[calendarDate]["totalHoursBusy"], 4 if busy[calendarDate]["dayType"] == "Normal" else 8)
+
+    def test_batch_order_independent(self):
+        """39 Test: El resultado del lote no depende del orden de las actividades"""
+        input = self.batch_input(5, 12, 19)
+        results = client.post("/scheduler/logic/activities/batch", json=input).json()["activities"]
+        input["activities"].reverse()
+        reversed_results = client.post("/scheduler/logic/activities/batch", json=input).json()["activities"]
+        self.assertEqual(sorted(result["result"] for result in results), sorted(result["result"] for result in reversed_results))
+
+    def test_batch_mirrors_single_activity(self):
+        """40 Test: Un lote de una actividad devuelve el mismo código que el endpoint individual"""
+        for testId in (5, 6, 7):
+            with self.subTest(testId=testId):
+                single = client.post("/scheduler/logic/activity/", json=load_json_input(testId))
+                batch = client.post("/scheduler/logic/activities/batch", json=self.batch_input(testId)).json()["activities"][0]
+                self.assertEqual(batch["result"], single.status_code)
+                if batch["solutions"]:
+                    self.assertEqual(batch["solutions"][0]["newEndDate"], single.json()["solutions"][0]["newEndDate"])
+
+    def test_batch_calendar_coverage(self):
+        """41 Test: El lote rechaza calendarios que no cubren la ventana de alguna actividad"""
+        input = self.batch_input(5)
+        input["calendar"] = [day for day in input["calendar"] if day["calendarDate"] != "2025-05-03"]
+        response = client.post("/scheduler/logic/activities/batch", json=input)
+        self.assertEqual(response.status_code, 422)
+
+
+class TestCapacityPrecheck(unittest.TestCase):
+
+    def test_precheck_skips_model(self):
+        """43 Test: Sin capacidad suficiente en ninguna ventana se responde 401 sin construir ningún modelo"""
+        activity, calendar = load_scheduler_input(6)
+        activity["estimatedHours"] = 999
+        for search_mode in ("Iterativa", "Unica", "Incremental"):
+            with self.subTest(search_mode=search_mode):
+                scheduler = cp_sat_scheduler()
+                with patch("scheduler.cp_model.CpModel") as mock_model:
+                    self.assertEqual(scheduler.search_day_to_assign(dict(activity), calendar, search_mode=search_mode), (401, None))
+                    mock_model.assert_not_called()
+                self.assertEqual(scheduler.metadata["precheck"], {"hits": 7, "misses": 0})
+
+    def test_precheck_is_exact(self):
+        """44 Test: Las fechas de fin que pasan la comprobación previa son exactamente las que tienen solución: con y sin ella
+            se obtienen el mismo código, la misma fecha de fin y las mismas soluciones"""
+        generator = random.Random(7)
+        for case in range(100):
+            end = date(2025, 5, 7)
+            calendar = [{"calendarDate": end + timedelta(days=d), "dayType": generator.choice(["Normal", "Festivo"]), "totalHoursBusy": generator.randint(0, 8)} for d in range(-20, 4)]
+            activity = {"estimatedHours": generator.randint(0, 40), "strategy": generator.choice(["Agresiva", "Calmada", "Completa"]), "startOfActivity": None, "endOfActivity": end}
+            engine = generator.choice(["Enumeracion", "Optimizacion"])
+            with self.subTest(case=case):
+                # CP-SAT con un único worker para que las soluciones sean deterministas
+                scheduler = SchedulerController.Scheduler(num_workers=1, fast_solver=False)
+                result = scheduler.search_day_to_assign(dict(activity), calendar, engine=engine)
+                # Sin comprobación previa se prueban con el solver todas las fechas de fin candidatas
+                with patch.object(SchedulerController.Scheduler, "_Scheduler__capacity_precheck", lambda self, activity, end_date_margin, calendar_index: end_date_margin):
+                    unchecked = SchedulerController.Scheduler(num_workers=1, fast_solver=False)
+                    expected = unchecked.search_day_to_assign(dict(activity), calendar, engine=engine)
+                self.assertEqual(result, expected)
+                self.assertLessEqual(scheduler.diagnostics["candidatesTried"], unchecked.diagnostics["candidatesTried"])
+                if result[0] == 401:
+                    self.assertEqual(scheduler.metadata["precheck"]["misses"], 0)
+
+    def test_precheck_metadata_api(self):
+        """45 Test: La respuesta 401 mantiene el detalle e incluye los aciertos de la comprobación previa"""
+        schedule_cache.clear()
+        input = load_json_input(6)
+        input["activity"]["estimatedHours"] = 999
+        response = client.post("/scheduler/logic/activity/", json=input)
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.json()["detail"], "Could not assign the activity to the scheduler successfully.")
+        self.assertEqual(response.json()["metadata"], {"precheck": {"hits": 7, "misses": 0}, "cached": False})
+
+class TestCalendarIndex(unittest.TestCase):
+
+    def test_calendar_index_windows(self):
+        """46 Test: Las ventanas del índice van por orden de fecha, sea cual sea el de la entrada, con las horas ocupadas y la capacidad libre del calendario"""
+        _activity, calendar = load_scheduler_input(6)
+        calendar = calendar + [dict(calendar[3], totalHoursBusy=1)]
+        index = SchedulerController.CalendarIndex(calendar)
+        busy_days = {day["calendarDate"]: day["totalHoursBusy"] for day in calendar}
+        start, end = calendar[12]["calendarDate"], calendar[2]["calendarDate"]
+        expected = sorted((day["calendarDate"], day["dayType"], busy_days[day["calendarDate"]]) for day in calendar if start <= day["calendarDate"] <= end)
+        self.assertEqual(list(index.days(start, end)), expected)
+        self.assertEqual(index.window_free_hours(start, end), sum(max(0, (4 if dayType == "Normal" else 8) - busy) for _date, dayType, busy in expected))
+        self.assertEqual(index.busy_hours(calendar[3]["calendarDate"]), 1)
+        self.assertEqual(index.busy_hours(date(2000, 1, 1)), 0)
+        self.assertEqual(list(index.days(date(2000, 1, 1), date(2000, 2, 1))), [])
+
+class TestStreamingScheduler(unittest.TestCase):
+
+    def setUp(self):
+        schedule_cache.clear()
+
+    def test_stream_solutions_as_found(self):
+        """47 Test: Cada solución se entrega al encontrarse y la cancelación del cliente detiene la búsqueda"""
+        activity, calendar = load_scheduler_input(9)
+        scheduler = cp_sat_scheduler()
+        streamed = []
+        scheduler.solution_listener = streamed.append
+        _result, solutions = scheduler.search_day_to_assign(dict(activity), calendar)
+        self.assertEqual(len(streamed), 5)
+        self.assertEqual(streamed, solutions)
+
+        scheduler = cp_sat_scheduler()
+        scheduler.cancelled = threading.Event()
+        scheduler.solution_listener = lambda solution: scheduler.cancelled.set()
+        _result, solutions = scheduler.search_day_to_assign(dict(activity), calendar)
+        # StopSearch es asíncrono: el solver puede notificar alguna solución más, pero ya no se entrega
+        self.assertEqual(scheduler.streamed_solutions, 1)
+        self.assertLess(len(solutions), 5)
+
+    def test_stream_ndjson(self):
+        """48 Test: La variante en streaming devuelve NDJSON con las soluciones y un último evento con el resultado"""
+        input = load_json_input(13)
+        with client.stream("POST", "/scheduler/logic/activity/stream", json=input) as response:
+            self.assertEqual(response.headers["content-type"], "application/x-ndjson")
+            events = [json.loads(line) for line in response.iter_lines() if line]
+        expected = client.post("/scheduler/logic/activity/", json=input).json()
+        self.assertEqual([event["solution"] for event in events[:-1]], expected["solutions"])
+        self.assertEqual(events[-1]["event"], "result")
+        self.assertEqual(events[-1]["result"], 201)
+        self.assertFalse(events[-1]["metadata"]["cached"])
+
+    def test_stream_sse(self):
+        """49 Test: Con Accept text/event-stream la respuesta usa Server-Sent Events"""
+        with client.stream("POST", "/scheduler/logic/activity/stream", json=load_json_input(12), headers={"Accept": "text/event-stream"}) as response:
+            self.assertTrue(response.headers["content-type"].startswith("text/event-stream"))
+            body = response.read().decode()
+        blocks = body.strip().split("\n\n")
+        self.assertTrue(blocks[0].startswith("event: solution\ndata: "))
+        self.assertTrue(blocks[-1].startswith("event: result\ndata: "))
+        self.assertEqual(json.loads(blocks[-1].split("data: ", 1)[1])["result"], 200)
+
+class TestSchedulerTelemetry(unittest.TestCase):
+
+    def setUp(self):
+        schedule_cache.clear()
+
+    def test_scheduler_diagnostics(self):
+        """50 Test: La telemetría del Scheduler recoge las llamadas al solver y las fechas de fin candidatas probadas"""
+        activity, calendar = load_scheduler_input(13)
+        scheduler = cp_sat_scheduler()
+        _result, solutions = scheduler.search_day_to_assign(dict(activity), calendar)
+        diagnostics = scheduler.diagnostics
+        self.assertEqual((diagnostics["strategy"], diagnostics["searchMode"], diagnostics["engine"]), ("Calmada", "Iterativa", "Enumeracion"))
+        self.assertEqual(diagnostics["solverCalls"], diagnostics["candidatesTried"])
+        # Las fechas de fin sin capacidad suficiente se descartan antes de probarlas y la primera que queda ya tiene solución
+        self.assertGreater(scheduler.metadata["precheck"]["hits"], 0)
+        self.assertEqual(diagnostics["candidatesTried"], 1)
+        self.assertEqual(diagnostics["solutionsFound"], len(solutions))
+        self.assertGreater(diagnostics["solveSeconds"], 0)
+        self.assertGreaterEqual(diagnostics["totalSeconds"], diagnostics["modelBuildSeconds"] + diagnostics["solveSeconds"])
+
+    def test_diagnostics_debug_header(self):
+        """51 Test: El bloque diagnostics sólo se devuelve con la cabecera X-Scheduler-Debug"""
+        input = load_json_input(12)
+        self.assertNotIn("diagnostics", client.post("/scheduler/logic/activity/", json=input).json())
+        response = client.post("/scheduler/logic/activity/", json=input, headers={"X-Scheduler-Debug": "1"})
+        diagnostics = response.json()["diagnostics"]
+        self.assertEqual(diagnostics["strategy"], "Calmada")
+        self.assertEqual(diagnostics["solutionsFound"], 1)
+        self.assertNotIn("diagnostics", response.json()["metadata"])
+
+    def test_metrics_endpoint(self):
+        """52 Test: /metrics expone en formato Prometheus el contador de peticiones y los histogramas de la telemetría"""
+        series = 'scheduler_request_seconds_count{engine="Enumeracion",strategy="Agresiva"}'
+        def count():
+            lines = client.get("/metrics").text.splitlines()
+            return next((int(line.split()[-1]) for line in lines if line.startswith(series + " ")), 0)
+        before = count()
+        client.post("/scheduler/logic/activity/", json=load_json_input(6))
+        client.post("/scheduler/logic/activity/", json=load_json_input(6))
+        body = client.get("/metrics").text
+        self.assertEqual(count(), before + 1)
+        self.assertIn("# TYPE scheduler_solve_seconds histogram", body)
+        self.assertIn('scheduler_candidates_tried_bucket{engine="Enumeracion",strategy="Agresiva",le="+Inf"}', body)
+        self.assertIn('scheduler_requests_total{engine="Enumeracion",result="201",strategy="Agresiva"}', body)
+
+def long_window_input(days=400, estimated_hours=800, strategy="Completa", seed=0):
+    """ Petición JSON con startOfActivity y un calendario de 'days' días con horas ocupadas aleatorias """
+    generator = random.Random(seed)
+    end = date(2025, 5, 7)
+    start = end - timedelta(days=days - 1)
+    calendar = []
+    for i in range(days + 3):
+        dayType = generator.choice(["Normal"] * 5 + ["Festivo"] * 2)
+        calendar.append({
+            "calendarDate": (start + timedelta(days=i)).isoformat(),
+            "dayType": dayType,
+            "totalHoursBusy": generator.randint(0, 4 if dayType == "Normal" else 8)
+        })
+    activity = {"estimatedHours": estimated_hours, "strategy": strategy, "startOfActivity": start.isoformat(), "endOfActivity": end.isoformat()}
+    return {"activity": activity, "calendar": calendar}
+
+class TestDeadlineScheduler(unittest.TestCase):
+
+    def setUp(self):
+        schedule_cache.clear()
+
+    def test_deadline_partial_result(self):
+        """53 Test: Con el presupuesto agotado la búsqueda termina antes y marca la respuesta como parcial"""
+        input = long_window_input()
+        activity = Activity.model_validate(input["activity"]).model_dump()
+        calendar = [Calendar.model_validate(day).model_dump() for day in input["calendar"]]
+        scheduler = cp_sat_scheduler()
+        started = time.perf_counter()
+        scheduler.search_day_to_assign(dict(activity), calendar, engine="Optimizacion", deadline_ms=20)
+        self.assertLess(time.perf_counter() - started, 1)
+        self.assertTrue(scheduler.metadata["partial"])
+        self.assertLessEqual(scheduler.diagnostics["candidatesTried"], 1)
+
+    def test_deadline_not_reached(self):
+        """54 Test: Si el presupuesto no se agota el resultado es el mismo que sin presupuesto"""
+        activity, calendar = load_scheduler_input(9)
+        scheduler = cp_sat_scheduler()
+        result = scheduler.search_day_to_assign(dict(activity), calendar, deadline_ms=60000)
+        self.assertFalse(scheduler.metadata["partial"])
+        self.assertEqual(result, cp_sat_scheduler().search_day_to_assign(dict(activity), calendar))
+        self.assertNotIn("partial", cp_sat_scheduler().metadata)
+
+    def test_deadline_api(self):
+        """55 Test: Petición con deadlineMs: metadata.partial en la respuesta y los resultados parciales no se guardan en la caché"""
+        input = long_window_input()
+        input["engine"] = "Optimizacion"
+        input["deadlineMs"] = 1
+        with patch.dict(os.environ, {"SCHEDULER_FAST_SOLVER": "0"}):
+            response = client.post("/scheduler/logic/activity/", json=input)
+        self.assertTrue(response.json()["metadata"]["partial"])
+        self.assertEqual(schedule_cache.stats()["size"], 0)
+        input["deadlineMs"] = 0
+        self.assertEqual(client.post("/scheduler/logic/activity/", json=input).status_code, 422)
+
+class TestDiverseScheduler(unittest.TestCase):
+
+    def setUp(self):
+        schedule_cache.clear()
+
+    def test_diverse_solutions(self):
+        """56 Test: El motor Diversa devuelve planes distintos que recolocan horas respecto a todos los demás"""
+        activity, calendar = load_scheduler_input(9)
+        result, solutions = cp_sat_scheduler().search_day_to_assign(dict(activity), calendar, engine="Diversa", diverse_solutions=4)
+        self.assertEqual(result, 200)
+        self.assertEqual(len(solutions), 4)
+        plans = [{day["calendarDate"]: day["assignedHours"] for day in solution["schedule"]} for solution in solutions]
+        for i, plan in enumerate(plans):
+            self.assertEqual(sum(plan.values()), activity["estimatedHours"])
+            self.assertGreater(solutions[i]["diversityScore"], 0)
+            for other in plans[i + 1:]:
+                self.assertNotEqual(plan, other)
+
+    def test_diverse_single_solution(self):
+        """57 Test: Si sólo existe un plan el motor Diversa lo devuelve con puntuación 0"""
+        activity, calendar = load_scheduler_input(13)
+        expected = cp_sat_scheduler().search_day_to_assign(dict(activity), calendar)
+        result, solutions = cp_sat_scheduler().search_day_to_assign(dict(activity), calendar, engine="Diversa")
+        self.assertEqual(result, expected[0])
+        self.assertEqual([solution["schedule"] for solution in solutions], [solution["schedule"] for solution in expected[1]])
+        self.assertEqual(solutions[0]["diversityScore"], 0.0)
+
+    def test_diverse_api(self):
+        """58 Test: Petición con engine Diversa y diverseSolutions"""
+        input = long_window_input(days=20, estimated_hours=30, strategy="Calmada")
+        input["engine"] = "Diversa"
+        input["diverseSolutions"] = 3
+        response = client.post("/scheduler/logic/activity/", json=input)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()["solutions"]), 3)
+        self.assertTrue(all("diversityScore" in solution for solution in response.json()["solutions"]))
+        input["diverseSolutions"] = 11
+        self.assertEqual(client.post("/scheduler/logic/activity/", json=input).status_code, 422)
+
+class TestSemesterOptimizer(unittest.TestCase):
+
+    def semester_rows(self):
+        """ Tres actividades Agresivas con la misma ventana organizadas todas en los mismos dos días, más otra actividad que no se reorganiza """
+        start = date(2024, 10, 1)
+        calendar_rows = [{"CalendarDate": start + timedelta(days=i), "DayType": "Normal"} for i in range(10)]
+        activity_rows = [{
+            "IdActivity": activityId, "EstimatedHours": 2, "Strategy": "Agresiva", "Status": "Asignado",
+            "StartOfActivity": start, "EndOfActivity": start + timedelta(days=9), "NewEndOfActivity": None
+        } for activityId in (1, 2, 3)]
+        activity_rows[2].update(Status="Confirmar", EndOfActivity=start + timedelta(days=5), NewEndOfActivity=start + timedelta(days=9))
+        schedule_rows = [
+            {"CalendarDate": start, "Hours": 1, "IdActivity": 1}, {"CalendarDate": start + timedelta(days=1), "Hours": 1, "IdActivity": 1},
+            {"CalendarDate": start, "Hours": 1, "IdActivity": 2}, {"CalendarDate": start + timedelta(days=1), "Hours": 1, "IdActivity": 2},
+            {"CalendarDate": start, "Hours": 1, "IdActivity": 3}, {"CalendarDate": start + timedelta(days=1), "Hours": 1, "IdActivity": 3},
+            {"CalendarDate": start + timedelta(days=2), "Hours": 3, "IdActivity": 99}
+        ]
+        return activity_rows, calendar_rows, schedule_rows
+
+    def test_semester_inputs(self):
+        """59 Test: Entrada de la reorganización del curso: nueva fecha de fin de las actividades por confirmar y horas ocupadas del resto"""
+        activities, calendar, current_schedule = SemesterOptimizerController.build_inputs(*self.semester_rows())
+        self.assertEqual([activity["endOfActivity"] for activity in activities], [date(2024, 10, 10)] * 3)
+        self.assertEqual(len(current_schedule), 6)
+        self.assertEqual([day["totalHoursBusy"] for day in calendar][:4], [0, 0, 3, 0])
+
+    def test_semester_reoptimization(self):
+        """60 Test: La reorganización del curso reparte la carga, respeta la capacidad compartida y el diff reproduce el nuevo plan"""
+        activity_rows, calendar_rows, schedule_rows = self.semester_rows()
+        result, diff, metadata = SemesterOptimizerController.reoptimize_academic_year(activity_rows, calendar_rows, schedule_rows, num_workers=1)
+        self.assertEqual(result, 200)
+        self.assertIn(metadata["solverStatus"], ("OPTIMAL", "FEASIBLE"))
+        self.assertTrue({"insert", "update", "delete"} & {row["action"] for row in diff})
+
+        plan = {(row["IdActivity"], row["CalendarDate"]): row["Hours"] for row in schedule_rows if row["IdActivity"] != 99}
+        for row in diff:
+            self.assertEqual(plan.get((row["activityId"], row["calendarDate"])), row["previousHours"])
+            if row["hours"] is None:
+                del plan[(row["activityId"], row["calendarDate"])]
+            else:
+                plan[(row["activityId"], row["calendarDate"])] = row["hours"]
+        loads = {}
+        for (activityId, calendarDate), hours in plan.items():
+            loads[calendarDate] = loads.get(calendarDate, 0) + hours
+        for activityId in (1, 2, 3):
+            self.assertEqual(sum(hours for (a, _), hours in plan.items() if a == activityId), 2)
+        self.assertLessEqual(loads.get(date(2024, 10, 3), 0), 1)
+        # Ningún día supera la mitad de su capacidad: antes había dos días con 3 horas
+        self.assertLessEqual(max(loads.values()), 2)
+
+class TestRepairScheduler(unittest.TestCase):
+
+    def repair_input(self, activities):
+        """ Días 3 y 4 ocupados por otras actividades, A organizada en los días 0 y 1 y B en el día 7 """
+        start = date(2024, 10, 1)
+        busy = {0: 3, 1: 3, 3: 4, 4: 4, 7: 2}
+        calendar = [{"calendarDate": (start + timedelta(days=i)).isoformat(), "dayType": "Normal", "totalHoursBusy": busy.get(i, 0)} for i in range(10)]
+        repair_activities = [{
+            "activityId": 1, "estimatedHours": 6, "strategy": "Completa", "startOfActivity": start.isoformat(), "endOfActivity": (start + timedelta(days=4)).isoformat(),
+            "schedule": [{"calendarDate": start.isoformat(), "hours": 3}, {"calendarDate": (start + timedelta(days=1)).isoformat(), "hours": 3}]
+        }, {
+            "activityId": 2, "estimatedHours": 2, "strategy": "Completa", "startOfActivity": (start + timedelta(days=6)).isoformat(), "endOfActivity": (start + timedelta(days=9)).isoformat(),
+            "schedule": [{"calendarDate": (start + timedelta(days=7)).isoformat(), "hours": 2}]
+        }]
+        return {"activities": repair_activities + activities, "calendar": calendar}
+
+    def test_repair_after_delete(self):
+        """61 Test: Al borrar una actividad del día 2 las actividades vecinas recuperan su capacidad y el resto no cambia"""
+        input = self.repair_input([])
+        input["changedDays"] = ["2024-10-03"]
+        response = client.post("/scheduler/logic/activities/repair", json=input)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["metadata"]["affectedActivities"], [1])
+        changes = response.json()["changes"]
+        self.assertTrue(changes)
+        self.assertTrue(all(change["activityId"] == 1 for change in changes))
+        self.assertIn("2024-10-03", [change["calendarDate"] for change in changes])
+
+    def test_repair_after_update(self):
+        """62 Test: Una actividad actualizada sin plan se organiza moviendo sólo las horas necesarias de sus vecinas"""
+        start = date(2024, 10, 1)
+        activities, current_schedule = [], []
+        input = self.repair_input([{
+            "activityId": 3, "estimatedHours": 6, "strategy": "Completa", "startOfActivity": start.isoformat(), "endOfActivity": (start + timedelta(days=1)).isoformat()
+        }])
+        for activity in input["activities"]:
+            activity = dict(activity, startOfActivity=date.fromisoformat(activity["startOfActivity"]), endOfActivity=date.fromisoformat(activity["endOfActivity"]))
+            current_schedule += [{"activityId": activity["activityId"], "calendarDate": date.fromisoformat(day["calendarDate"]), "hours": day["hours"]} for day in activity.pop("schedule", [])]
+            activities.append(activity)
+        calendar = [dict(day, calendarDate=date.fromisoformat(day["calendarDate"])) for day in input["calendar"]]
+        scheduler = SchedulerController.Scheduler(num_workers=1)
+        result, plan = scheduler.repair_schedule(activities, calendar, current_schedule)
+        self.assertEqual(result, 200)
+        self.assertEqual(sorted(plan), [1, 3])
+        loads = {}
+        for activityId, days in plan.items():
+            self.assertEqual(sum(day["assignedHours"] for day in days), 6)
+            for day in days:
+                loads[day["calendarDate"]] = loads.get(day["calendarDate"], 0) + day["assignedHours"]
+        self.assertLessEqual(max(loads.values()), 4)
+        self.assertNotIn(start + timedelta(days=3), loads)
+
+class TestPreviousScheduleScheduler(unittest.TestCase):
+
+    def setUp(self):
+        schedule_cache.clear()
+
+    def test_minimize_deviation(self):
+        """63 Test: Al editar una actividad minimizando la desviación sólo se mueven las horas imprescindibles del plan anterior"""
+        activity, calendar = load_scheduler_input(16)
+        previous_schedule = [{"calendarDate": date(2025, 5, 4), "hours": 8}, {"calendarDate": date(2025, 5, 3), "hours": 8}]
+        # Una hora más de estimación y una hora menos libre el 3 de mayo: como mínimo cambian 3 horas
+        activity["estimatedHours"] += 1
+        calendar = [dict(day, totalHoursBusy=day["totalHoursBusy"] + 1) if day["calendarDate"] == date(2025, 5, 3) else day for day in calendar]
+        _result, hinted = cp_sat_scheduler().search_day_to_assign(dict(activity), calendar, engine="Optimizacion", previous_schedule=previous_schedule)
+        _result, stable = cp_sat_scheduler().search_day_to_assign(dict(activity), calendar, engine="Optimizacion", previous_schedule=previous_schedule, minimize_deviation=True)
+        self.assertEqual(sum(day["assignedHours"] for day in stable[0]["schedule"]), activity["estimatedHours"])
+        self.assertEqual(stable[0]["deviationHours"], 3)
+        self.assertGreaterEqual(hinted[0]["deviationHours"], 3)
+        self.assertEqual(stable[0]["solverStatus"], "OPTIMAL")
+
+    def test_previous_schedule_api(self):
+        """64 Test: Petición con previousSchedule y minimizeDeviation; sin cambios en la actividad el plan anterior se mantiene"""
+        input = load_json_input(19)
+        input["engine"] = "Optimizacion"
+        solution = client.post("/scheduler/logic/activity/", json=input).json()["solutions"][0]
+        input["previousSchedule"] = [{"calendarDate": day["calendarDate"], "hours": day["assignedHours"]} for day in solution["schedule"]]
+        input["minimizeDeviation"] = True
+        response = client.post("/scheduler/logic/activity/", json=input)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["solutions"][0]["deviationHours"], 0)
+        self.assertEqual(response.json()["solutions"][0]["schedule"], solution["schedule"])
+
+    def test_minimize_deviation_default_engine(self):
+        """90 Test: Con el motor por defecto y minimizeDeviation la primera solución es la de menor desviación; con "Diversa" la petición se rechaza"""
+        for testId in (2, 9, 16, 24):
+            with self.subTest(testId=testId):
+                activity, calendar = load_scheduler_input(testId)
+                _code, enumerated = SchedulerController.Scheduler(num_workers=1, fast_solver=False).search_day_to_assign(activity, calendar)
+                # El último plan enumerado sigue siendo válido: el plan de menor desviación no cambia ninguna hora
+                input = load_json_input(testId)
+                end = date.fromisoformat(input["activity"]["endOfActivity"])
+                input["calendar"] = [day for day in input["calendar"] if end - timedelta(days=17) <= date.fromisoformat(day["calendarDate"]) <= end + timedelta(days=3)]
+                input["previousSchedule"] = [{"calendarDate": day["calendarDate"].isoformat(), "hours": day["assignedHours"]} for day in enumerated[-1]["schedule"]]
+                input["minimizeDeviation"] = True
+                response = client.post("/scheduler/logic/activity/", json=input)
+                self.assertEqual(response.status_code, 200)
+                deviations = [solution["deviationHours"] for solution in response.json()["solutions"]]
+                self.assertEqual(deviations[0], min(deviations))
+                self.assertEqual(deviations[0], 0)
+                self.assertEqual(client.post("/scheduler/logic/activity/", json=dict(input, engine="Diversa")).status_code, 422)
+
+class TestCompactResponse(unittest.TestCase):
+
+    def setUp(self):
+        schedule_cache.clear()
+
+    def expand(self, solution):
+        """ Reconstruye schedule y modifiedCalendar a partir del formato compacto """
+        start = date.fromisoformat(solution["startDate"])
+        schedule, calendar = [], []
+        for i, (offset, hours) in enumerate(zip(solution["offsets"], solution["hours"])):
+            calendarDate = (start + timedelta(days=offset)).isoformat()
+            dayType = "Festivo" if i in solution["holidays"] else "Normal"
+            schedule.append({"calendarDate": calendarDate, "assignedHours": hours})
+            calendar.append({"calendarDate": calendarDate, "dayType": dayType, "status": "Ocupado" if hours == (4 if dayType == "Normal" else 8) else "Libre"})
+        return schedule, calendar
+
+    def test_compact_activity(self):
+        """65 Test: El formato compacto (Accept o ?format=compact) contiene la misma información que el formato completo"""
+        input = load_json_input(12)
+        expected = client.post("/scheduler/logic/activity/", json=input).json()
+        for response in (client.post("/scheduler/logic/activity/", json=input, headers={"Accept": "application/vnd.uc3m.scheduler.compact+json"}),
+                         client.post("/scheduler/logic/activity/?format=compact", json=input)):
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.headers["content-type"], "application/vnd.uc3m.scheduler.compact+json")
+            solutions = response.json()["solutions"]
+            self.assertEqual(len(solutions), len(expected["solutions"]))
+            for compact, full in zip(solutions, expected["solutions"]):
+                self.assertNotIn("schedule", compact)
+                self.assertEqual(compact["newEndDate"], full["newEndDate"])
+                self.assertEqual(self.expand(compact), (full["schedule"], full["modifiedCalendar"]))
+
+    def test_compact_batch(self):
+        """66 Test: Lote en formato compacto, incluidas las actividades sin asignar"""
+        single = load_json_input(12)
+        input = {"activities": [single["activity"], dict(single["activity"], estimatedHours=1000)], "calendar": single["calendar"]}
+        response = client.post("/scheduler/logic/activities/batch?format=compact", json=input)
+        self.assertEqual(response.status_code, 200)
+        activities = response.json()["activities"]
+        self.assertEqual([activity["result"] for activity in activities], [200, 401])
+        self.assertEqual(sum(activities[0]["solutions"][0]["hours"]), single["activity"]["estimatedHours"])
+        self.assertIsNone(activities[1]["solutions"])
+
+class TestBenchmarkSuite(unittest.TestCase):
+
+    def test_workload_generator(self):
+        """67 Test: La carga sintética es reproducible y cubre ventanas de 21 a 400 días con sus 3 días de margen"""
+        workload = BenchmarkSuite.generate_workload(20, seed=3)
+        self.assertEqual(workload, BenchmarkSuite.generate_workload(20, seed=3))
+        for case in workload:
+            self.assertTrue(21 <= case["days"] <= 400)
+            self.assertEqual(len(case["calendar"]), case["days"] + 3)
+            self.assertEqual(case["calendar"][-1]["calendarDate"], case["activity"]["startOfActivity"])
+
+    def test_baseline_regressions(self):
+        """68 Test: La comparación con el baseline detecta tiempos peores que el umbral y cambios en las soluciones, ignorando el ruido"""
+        def results(**metrics):
+            group = dict({"cases": 3, "p50Ms": 1.0, "p95Ms": 10.0, "p99Ms": 12.0, "solutionsFound": 7, "results": {"200": 3}, "peakMemoryKb": 500.0}, **metrics)
+            return {"cases": 3, "seed": 1, "repetitions": 2, "groups": {"Total": group}}
+        baseline = results()
+        self.assertEqual(BenchmarkSuite.compare(results(p95Ms=12.4, p50Ms=1.9), baseline), [])
+        self.assertEqual(BenchmarkSuite.compare(results(p95Ms=13.0), baseline), ["Total p95Ms: 10.0 -> 13.0"])
+        self.assertIn("solutions", BenchmarkSuite.compare(results(solutionsFound=8), baseline)[0])
+        self.assertTrue(BenchmarkSuite.compare(dict(results(), seed=2), baseline))
+
+class TestReadiness(unittest.TestCase):
+
+    def test_readiness_after_warm_up(self):
+        """69 Test: /scheduler/ready devuelve 503 hasta terminar la resolución de calentamiento del arranque y 200 después"""
+        self.assertEqual(client.get("/scheduler/ready").status_code, 503)
+        with TestClient(app) as started_client:
+            response = started_client.get("/scheduler/ready")
+            self.assertEqual(response.status_code, 200)
+            self.assertTrue(response.json()["ready"])
+            self.assertGreater(response.json()["warmUpSeconds"], 0)
+        self.assertEqual(client.get("/scheduler/ready").status_code, 503)
+
+def random_calendar(generator, end, days=35):
+    """ Calendario aleatorio en orden descendente (el Scheduler admite cualquier orden) con los 3 días de margen tras la fecha de fin """
+    calendar = []
+    for i in range(days):
+        dayType = generator.choice(["Normal", "Normal", "Festivo"])
+        calendar.append({
+            "calendarDate": end + timedelta(days=3 - i),
+            "dayType": dayType,
+            "totalHoursBusy": generator.randint(0, 4 if dayType == "Normal" else 8)
+        })
+    return calendar
+
+class TestStrategyRegistry(unittest.TestCase):
+    MODES = [("Iterativa", "Enumeracion"), ("Iterativa", "Optimizacion"), ("Iterativa", "Diversa")]
+
+    def check_all_modes(self, strategy, valid_day):
+        """ Comprueba valid_day(día del calendario, horas asignadas) en cada solución de todos los motores y modos de búsqueda """
+        generator = random.Random(20)
+        end = date(2025, 5, 7)
+        for case in range(20):
+            calendar = random_calendar(generator, end)
+            days = {day["calendarDate"]: day for day in calendar}
+            activity = {"estimatedHours": generator.randint(1, 24), "strategy": strategy, "startOfActivity": end - timedelta(days=27), "endOfActivity": end}
+            for search_mode, engine in self.MODES:
+                with self.subTest(case=case, searchMode=search_mode, engine=engine):
+                    result, solutions = cp_sat_scheduler().search_day_to_assign(dict(activity), calendar, search_mode=search_mode, engine=engine)
+                    self.assertIn(result, (200, 201, 401))
+                    for solution in solutions or []:
+                        self.assertEqual(sum(day["assignedHours"] for day in solution["schedule"]), activity["estimatedHours"])
+                        for day in solution["schedule"]:
+                            self.assertTrue(valid_day(days[day["calendarDate"]], day["assignedHours"]))
+            with self.subTest(case=case, fastSolver=True):
+                self.assertEqual(SchedulerController.Scheduler().search_day_to_assign(dict(activity), calendar),
+                                 cp_sat_scheduler().search_day_to_assign(dict(activity), calendar))
+
+    def test_weekends_only_strategy(self):
+        """70 Test: La estrategia FinesDeSemana sólo utiliza sábados y domingos en todos los motores y coincide con la vía rápida"""
+        self.check_all_modes("FinesDeSemana", lambda day, hours: day["calendarDate"].weekday() in (5, 6))
+
+    def test_buffer_strategy(self):
+        """71 Test: La estrategia Holgada deja al menos una hora libre en cada día que utiliza"""
+        self.check_all_modes("Holgada", lambda day, hours: day["totalHoursBusy"] + hours <= (4 if day["dayType"] == "Normal" else 8) - 1)
+
+    def test_registry_strategies_api(self):
+        """72 Test: La API acepta las estrategias del registro y el Scheduler devuelve 505 con una estrategia desconocida"""
+        for strategy in SchedulerController.STRATEGIES:
+            response = client.post("/scheduler/logic/activity/", json=long_window_input(days=30, estimated_hours=12, strategy=strategy))
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(sum(day["assignedHours"] for day in response.json()["solutions"][0]["schedule"]), 12)
+        activity, calendar = load_scheduler_input(12)
+        self.assertEqual(SchedulerController.Scheduler().search_day_to_assign(dict(activity, strategy="Desconocida"), calendar), 505)
+
+class TestCapacitySimulation(unittest.TestCase):
+
+    def test_simulation_matches_scheduler(self):
+        """73 Test: La simulación coincide con el Organizador en la viabilidad y con una búsqueda lineal en la fecha de fin más temprana"""
+        generator = random.Random(7)
+        end = date(2025, 5, 7)
+        calendar = random_calendar(generator, end, days=60)
+        activities = []
+        for _ in range(40):
+            endOfActivity = end - timedelta(days=generator.randint(0, 30))
+            startOfActivity = generator.choice([None, endOfActivity - timedelta(days=generator.randint(0, 20))])
+            activities.append({"estimatedHours": generator.randint(0, 60), "strategy": generator.choice(list(SchedulerController.STRATEGIES)),
+                               "startOfActivity": startOfActivity, "endOfActivity": endOfActivity})
+        simulation = CapacitySimulationController.simulate(activities, calendar)
+        days = sorted(day["calendarDate"] for day in calendar)
+        for activity, result in zip(activities, simulation["activities"]):
+            with self.subTest(activity=activity):
+                self.assertEqual(result["feasible"], cp_sat_scheduler().search_day_to_assign(dict(activity), calendar, engine="Optimizacion")[0] == 200)
+                expected = None
+                for day in days:
+                    window_start = activity["startOfActivity"] or day - timedelta(days=14)
+                    if day >= window_start and CapacitySimulationController.simulate([dict(activity, startOfActivity=window_start, endOfActivity=day)], calendar)["activities"][0]["feasible"]:
+                        expected = day
+                        break
+                self.assertEqual(result["earliestEndDate"], expected)
+        load = simulation["load"]
+        self.assertEqual(len(load["simulatedHours"]), len(days))
+        self.assertAlmostEqual(sum(load["simulatedHours"]), sum(a["estimatedHours"] for a, r in zip(activities, simulation["activities"]) if r["freeHours"]), places=1)
+
+    def test_simulation_endpoint(self):
+        """74 Test: El endpoint de simulación evalúa cientos de actividades en una llamada, en el propio proceso y sin ocupar la cola,
+            y overloadedDays son exactamente los días cuyas horas ocupadas más las simuladas superan la capacidad"""
+        input = long_window_input(days=120, estimated_hours=10)
+        generator = random.Random(3)
+        activities = []
+        for _ in range(300):
+            endOfActivity = date(2025, 5, 7) - timedelta(days=generator.randint(0, 90))
+            activities.append({"estimatedHours": generator.randint(1, 40), "strategy": generator.choice(list(SchedulerController.STRATEGIES)),
+                               "startOfActivity": (endOfActivity - timedelta(days=generator.randint(0, 25))).isoformat(), "endOfActivity": endOfActivity.isoformat()})
+        with patch.object(solve_queue, "max_backlog", 0), patch.object(solve_queue, "submit") as submit:
+            response = client.post("/scheduler/logic/activities/simulate", json={"activities": activities, "calendar": input["calendar"]})
+        self.assertEqual(response.status_code, 200)
+        submit.assert_not_called()
+        content = response.json()
+        self.assertEqual(len(content["activities"]), 300)
+        load = content["load"]
+        self.assertEqual(load["overloadedDays"], [i for i, (capacity, busy, hours) in enumerate(zip(load["capacity"], load["busyHours"], load["simulatedHours"]))
+                                                  if busy + hours > capacity])
+        self.assertTrue(load["overloadedDays"])
+
+def random_load(generator, start, days, subjects=5, rows=300):
+    """ Calendario de 'days' días desde start y filas de 'schedule' aleatorias, algunas fuera del calendario """
+    calendar = [{"calendarDate": start + timedelta(days=i), "dayType": generator.choice(["Normal", "Normal", "Festivo"])} for i in range(days)]
+    schedule = [{"calendarDate": start + timedelta(days=generator.randint(-5, days + 5)), "hours": generator.randint(1, 4),
+                 "activityId": generator.randint(1, 30), "subjectId": 1000 + generator.randint(0, subjects - 1)} for _ in range(rows)]
+    return calendar, schedule
+
+class TestLoadAnalytics(unittest.TestCase):
+
+    def test_analytics_matches_python_loop(self):
+        """75 Test: La analítica vectorizada coincide con el cálculo día a día en Python"""
+        start = date(2024, 9, 1)
+        calendar, schedule = random_load(random.Random(4), start, 120)
+        analytics = LoadAnalyticsController.analyze(calendar, schedule)
+        load = {}
+        subjects = {}
+        for row in schedule:
+            if start <= row["calendarDate"] < start + timedelta(days=120):
+                load[row["calendarDate"]] = load.get(row["calendarDate"], 0) + row["hours"]
+                days = subjects.setdefault(row["subjectId"], {})
+                days[row["calendarDate"]] = days.get(row["calendarDate"], 0) + row["hours"]
+        hours = [load.get(day["calendarDate"], 0) for day in calendar]
+        capacity = [4 if day["dayType"] == "Normal" else 8 for day in calendar]
+        rolling = [sum(hours[max(i - 6, 0):i + 1]) for i in range(len(hours))]
+        self.assertEqual(analytics["startDate"], start)
+        self.assertEqual(analytics["hours"], hours)
+        self.assertEqual(analytics["capacity"], capacity)
+        self.assertEqual(analytics["utilisation"], [round(h / c, 3) for h, c in zip(hours, capacity)])
+        self.assertEqual(analytics["rollingHours"], rolling)
+        self.assertEqual(analytics["peakWeek"], {"endDate": start + timedelta(days=rolling.index(max(rolling))), "hours": max(rolling)})
+        self.assertEqual(analytics["aboveBalanceDays"], [i for i, (h, c) in enumerate(zip(hours, capacity)) if h > c / 2])
+        for i, subjectId in enumerate(analytics["subjects"]["subjectIds"]):
+            days = subjects.get(subjectId, {})
+            self.assertEqual(analytics["subjects"]["hours"][i], sum(days.values()))
+            self.assertEqual(analytics["subjects"]["activeDays"][i], len(days))
+            self.assertEqual(analytics["subjects"]["peakDayHours"][i], max(days.values(), default=0))
+
+    def test_analytics_endpoint(self):
+        """76 Test: El endpoint de analítica devuelve las series en columnas y acepta un calendario sin horas organizadas"""
+        calendar, schedule = random_load(random.Random(5), date(2024, 9, 1), 365)
+        response = client.post("/scheduler/analytics/load", json=json.loads(json.dumps({"calendar": calendar, "schedule": schedule}, default=ScheduleCacheController.date_converter)))
+        self.assertEqual(response.status_code, 200)
+        content = response.json()
+        self.assertEqual(content["startDate"], "2024-09-01")
+        self.assertEqual(len(content["hours"]), 365)
+        self.assertEqual(sum(content["subjects"]["hours"]), sum(content["hours"]))
+        response = client.post("/scheduler/analytics/load", json=json.loads(json.dumps({"calendar": calendar}, default=ScheduleCacheController.date_converter)))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["aboveBalanceDays"], [])
+        self.assertEqual(response.json()["subjects"]["subjectIds"], [])
+
+def slot_calendar(generator, end, days=35):
+    """ Calendario aleatorio con las franjas ocupadas de cada día, tantas como sus horas ocupadas """
+    calendar = random_calendar(generator, end, days)
+    for day in calendar:
+        day["busySlots"] = sorted(generator.sample(range(4 if day["dayType"] == "Normal" else 8), day["totalHoursBusy"]))
+    return calendar
+
+class TestSlotScheduler(unittest.TestCase):
+
+    def setUp(self):
+        schedule_cache.clear()
+
+    def test_slots_respect_classes_and_breaks(self):
+        """77 Test: Con el motor Franjas los bloques no se solapan con las clases, no superan las horas seguidas máximas y no son consecutivos"""
+        generator = random.Random(23)
+        end = date(2025, 5, 7)
+        feasible = 0
+        for case in range(30):
+            calendar = slot_calendar(generator, end)
+            days = {day["calendarDate"]: day for day in calendar}
+            max_consecutive_hours = generator.randint(1, 3)
+            strategy = generator.choice(list(SchedulerController.STRATEGIES))
+            activity = {"estimatedHours": generator.randint(1, 30), "strategy": strategy, "startOfActivity": end - timedelta(days=27), "endOfActivity": end}
+            with self.subTest(case=case):
+                result, solutions = SchedulerController.Scheduler().search_day_to_assign(
+                    dict(activity), calendar, engine="Franjas", max_consecutive_hours=max_consecutive_hours)
+                self.assertIn(result, (200, 201, 401))
+                for solution in solutions or []:
+                    feasible += 1
+                    self.assertEqual(sum(day["assignedHours"] for day in solution["schedule"]), activity["estimatedHours"])
+                    for day in solution["schedule"]:
+                        slots = sorted(day["slots"])
+                        self.assertEqual(sum(slot_end - slot_start for slot_start, slot_end in slots), day["assignedHours"])
+                        for slot_start, slot_end in slots:
+                            self.assertLessEqual(slot_end - slot_start, max_consecutive_hours)
+                            self.assertLessEqual(slot_end, 4 if days[day["calendarDate"]]["dayType"] == "Normal" else 8)
+                            self.assertFalse(set(range(slot_start, slot_end)) & set(days[day["calendarDate"]]["busySlots"]))
+                        for previous, following in zip(slots, slots[1:]):
+                            self.assertGreater(following[0], previous[1])
+        self.assertGreater(feasible, 0)
+
+    def test_slots_default_accepts_day_engine_cases(self):
+        """89 Test: Con maxConsecutiveHours por defecto Franjas da el mismo código y las mismas horas por día que el motor de optimización"""
+        for testId in range(1, 25):
+            with self.subTest(testId=testId):
+                activity, calendar = load_scheduler_input(testId)
+                expected_code, expected = SchedulerController.Scheduler().search_day_to_assign(dict(activity), calendar, engine="Optimizacion")
+                result_code, solutions = SchedulerController.Scheduler().search_day_to_assign(dict(activity), calendar, engine="Franjas")
+                self.assertEqual(result_code, expected_code)
+                for solution, expected_solution in zip(solutions or [], expected or []):
+                    self.assertEqual([(day["calendarDate"], day["assignedHours"]) for day in solution["schedule"]],
+                                     [(day["calendarDate"], day["assignedHours"]) for day in expected_solution["schedule"]])
+
+    def test_slots_api(self):
+        """78 Test: Petición con engine Franjas, busySlots y maxConsecutiveHours, que forma parte de la clave de la caché"""
+        input = long_window_input(days=20, estimated_hours=12, strategy="Calmada")
+        for day in input["calendar"]:
+            day["busySlots"] = list(range(day["totalHoursBusy"]))
+        input["engine"] = "Franjas"
+        input["maxConsecutiveHours"] = 1
+        response = client.post("/scheduler/logic/activity/", json=input)
+        self.assertEqual(response.status_code, 200)
+        schedule = response.json()["solutions"][0]["schedule"]
+        self.assertTrue(all(slot[1] - slot[0] == 1 for day in schedule for slot in day["slots"]))
+        input["maxConsecutiveHours"] = 2
+        response = client.post("/scheduler/logic/activity/", json=input)
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.json()["metadata"]["cached"])
+        input["maxConsecutiveHours"] = 9
+        self.assertEqual(client.post("/scheduler/logic/activity/", json=input).status_code, 422)
+
+class TestCohortScheduler(unittest.TestCase):
+
+    def setUp(self):
+        schedule_cache.clear()
+
+    def test_cohort_capacity(self):
+        """79 Test: Cada cohorte tiene su propia capacidad, calculada con su vector disperso de horas ocupadas"""
+        inputs = [load_json_input(5), load_json_input(12)]
+        input = {"activities": [input["activity"] for input in inputs], "calendar": inputs[0]["calendar"]}
+        shared = client.post("/scheduler/logic/activities/batch", json=input).json()["activities"]
+        self.assertEqual(sorted(result["result"] for result in shared), [200, 401])
+        input["activities"][0]["cohort"] = {"degree": "Informática", "year": 1}
+        input["activities"][1]["cohort"] = {"degree": "Informática", "year": 2}
+        with patch.object(solve_queue, "submit", side_effect=lambda function, *args: function(*args)) as submit:
+            response = client.post("/scheduler/logic/activities/batch", json=input)
+        self.assertEqual(submit.call_count, 1)
+        self.assertEqual([result["result"] for result in response.json()["activities"]], [200, 200])
+        # Con todos los días ocupados para su cohorte, la primera actividad deja de caber y la otra no cambia
+        input["cohortBusyHours"] = [{"degree": "Informática", "year": 1, "calendarDate": day["calendarDate"], "hours": 8} for day in input["calendar"]]
+        results = client.post("/scheduler/logic/activities/batch", json=input).json()["activities"]
+        self.assertEqual([result["result"] for result in results], [401, 200])
+        self.assertEqual(results[1], response.json()["activities"][1])
+
+    def test_activities_without_cohort_use_every_cohort_capacity(self):
+        """88 Test: Las horas de una actividad sin cohorte ocupan la capacidad de todas las cohortes del lote"""
+        end = date(2025, 5, 7)
+        calendar = [{"calendarDate": (end + timedelta(days=3 - i)).isoformat(), "dayType": "Normal", "totalHoursBusy": 0 if i == 5 else 4} for i in range(12)]
+        activity = {"estimatedHours": 4, "strategy": "Completa", "startOfActivity": (end - timedelta(days=5)).isoformat(), "endOfActivity": end.isoformat()}
+        input = {"activities": [dict(activity, cohort={"degree": "Informática", "year": 1}), dict(activity),
+                                dict(activity, cohort={"degree": "Informática", "year": 2})], "calendar": calendar}
+        response = client.post("/scheduler/logic/activities/batch", json=input)
+        self.assertEqual(response.status_code, 200)
+        results = response.json()["activities"]
+        self.assertEqual([result["result"] for result in results], [401, 200, 401])
+        self.assertEqual(results[1]["solutions"][0]["schedule"], [{"calendarDate": calendar[5]["calendarDate"], "assignedHours": 4}])
+
+    def test_cohort_single_activity(self):
+        """80 Test: Una actividad con cohorte sólo utiliza los días con horas libres para su cohorte y la cohorte forma parte de la caché"""
+        input = long_window_input(days=30, estimated_hours=12)
+        input["activity"]["cohort"] = {"degree": "Informática", "year": 3}
+        busy_days = [day["calendarDate"] for day in input["calendar"][::2]]
+        input["cohortBusyHours"] = [{"degree": "Informática", "year": 3, "calendarDate": calendarDate, "hours": 8} for calendarDate in busy_days]
+        input["cohortBusyHours"].append({"degree": "Informática", "year": 4, "calendarDate": input["calendar"][1]["calendarDate"], "hours": 8})
+        response = client.post("/scheduler/logic/activity/", json=input)
+        self.assertEqual(response.status_code, 200)
+        schedule = response.json()["solutions"][0]["schedule"]
+        self.assertFalse({day["calendarDate"] for day in schedule} & set(busy_days))
+        input["activity"]["cohort"]["year"] = 4
+        response = client.post("/scheduler/logic/activity/", json=input)
+        self.assertFalse(response.json()["metadata"]["cached"])
+        self.assertNotIn(input["calendar"][1]["calendarDate"], {day["calendarDate"] for day in response.json()["solutions"][0]["schedule"]})
+
+    def test_cohorts_share_one_queue_slot(self):
+        """84 Test: Un lote con más cohortes que huecos tiene la cola ocupa un único hueco y responde 200"""
+        input = long_window_input(days=30, estimated_hours=3)
+        cohorts = solve_queue.max_backlog + 8
+        input = {"activities": [dict(input["activity"], cohort={"degree": f"Grado {c // 4}", "year": c % 4 + 1}) for c in range(cohorts)],
+                 "calendar": input["calendar"]}
+        submitted = []
+        original_submit = solve_queue.submit
+        async def submit(function, *args, **kwargs):
+            submitted.append(solve_queue.pending)
+            return await original_submit(function, *args, **kwargs)
+        with patch.object(solve_queue, "submit", side_effect=submit):
+            response = client.post("/scheduler/logic/activities/batch", json=input)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(submitted, [0])
+        self.assertEqual([result["result"] for result in response.json()["activities"]], [200] * cohorts)
+        self.assertEqual(solve_queue.pending, 0)
+
+    def test_cohort_failure_cancels_siblings(self):
+        """85 Test: Si una cohorte falla, las que no han empezado se cancelan y el error se propaga al terminar las que están en curso"""
+        started = []
+        def run_batch_search(activities, calendar, cohort_busy=None):
+            started.append(activities)
+            if activities == "falla":
+                time.sleep(0.01)
+                raise RuntimeError("falla")
+            time.sleep(0.1)
+            return [], {}
+        subproblems = [("falla", [])] + [(f"cohorte {c}", []) for c in range(10)]
+        with patch.object(SolveQueueController, "run_batch_search", side_effect=run_batch_search):
+            with self.assertRaises(RuntimeError):
+                SolveQueueController.run_cohort_batch_search(subproblems, [], max_parallel=2)
+        self.assertEqual(started, ["falla", "cohorte 0"])
+
+def columnar_input(input):
+    """ Petición JSON con el calendario de 'input' en columnas y en orden ascendente """
+    calendar = sorted(input["calendar"], key=lambda day: day["calendarDate"])
+    columns = {"dates": [day["calendarDate"] for day in calendar], "dayTypes": [day["dayType"] for day in calendar], "busyHours": [day["totalHoursBusy"] for day in calendar]}
+    return dict(input, calendar=columns)
+
+class TestColumnarCalendar(unittest.TestCase):
+
+    def setUp(self):
+        schedule_cache.clear()
+
+    def test_columnar_validation(self):
+        """81 Test: El calendario en columnas se rechaza si las fechas no son ascendentes, contiguas y sin repetir o no cubren la ventana"""
+        input = columnar_input(long_window_input(days=30, estimated_hours=12))
+        self.assertEqual(client.post("/scheduler/logic/activity/columnar", json=input).status_code, 200)
+        dates = input["calendar"]["dates"]
+        for name, calendar in (
+                ("unsorted", dict(input["calendar"], dates=[dates[1], dates[0]] + dates[2:])),
+                ("repeated", dict(input["calendar"], dates=[dates[0]] + dates[:-1])),
+                ("gap", dict(input["calendar"], dates=dates[:5] + [(date.fromisoformat(day) + timedelta(days=1)).isoformat() for day in dates[5:]])),
+                ("lengths", dict(input["calendar"], busyHours=input["calendar"]["busyHours"][:-1])),
+                ("coverage", {key: values[1:] for key, values in input["calendar"].items()})):
+            with self.subTest(case=name):
+                self.assertEqual(client.post("/scheduler/logic/activity/columnar", json=dict(input, calendar=calendar)).status_code, 422)
+
+    def test_columnar_matches_list(self):
+        """82 Test: El calendario en columnas da el mismo índice, el mismo resultado y la misma clave de caché que la lista de días"""
+        for strategy in SchedulerController.STRATEGIES:
+            with self.subTest(strategy=strategy):
+                input = long_window_input(days=60, estimated_hours=40, strategy=strategy)
+                # BackendAPI no garantiza el orden de la lista de días
+                random.Random(82).shuffle(input["calendar"])
+                calendar = [Calendar.model_validate(day).model_dump() for day in input["calendar"]]
+                columns = ScheduleActivityColumnar.model_validate(columnar_input(input)).calendar
+                index = SchedulerController.CalendarIndex.from_columns(columns.dates, columns.dayTypes, columns.busyHours)
+                expected = SchedulerController.CalendarIndex(calendar)
+                self.assertEqual((index.ordinals, index.day_types, index.busy, index.free_hours), (expected.ordinals, expected.day_types, expected.busy, expected.free_hours))
+                schedule_cache.clear()
+                response = client.post("/scheduler/logic/activity/", json=input)
+                columnar = client.post("/scheduler/logic/activity/columnar", json=columnar_input(input))
+                self.assertEqual(columnar.status_code, response.status_code)
+                self.assertTrue(columnar.json()["metadata"]["cached"])
+                self.assertEqual(columnar.json().get("solutions"), response.json().get("solutions"))
+                schedule_cache.clear()
+                columnar = client.post("/scheduler/logic/activity/columnar", json=columnar_input(input))
+                self.assertFalse(columnar.json()["metadata"]["cached"])
+                self.assertEqual(columnar.json().get("solutions"), response.json().get("solutions"))
+
+    def test_columnar_matches_any_list_order(self):
+        """86 Test: Con los TestInputs, en cualquier orden de la lista de días, ambos formatos dan el mismo plan sin depender de cuál llenó la caché"""
+        for testId in range(1, 25):
+            input = load_json_input(testId)
+            if not input["activity"].get("startOfActivity"):
+                # Sin fecha de inicio la lista de días debe tener exactamente los 21 días de la ventana
+                end = date.fromisoformat(input["activity"]["endOfActivity"])
+                input["calendar"] = [day for day in input["calendar"] if end - timedelta(days=17) <= date.fromisoformat(day["calendarDate"]) <= end + timedelta(days=3)]
+            schedule_cache.clear()
+            columnar = client.post("/scheduler/logic/activity/columnar", json=columnar_input(input))
+            self.assertIn(columnar.status_code, (200, 201, 401))
+            shuffled = list(input["calendar"])
+            random.Random(testId).shuffle(shuffled)
+            orders = {"ascending": sorted(input["calendar"], key=lambda day: day["calendarDate"]),
+                      "descending": sorted(input["calendar"], key=lambda day: day["calendarDate"], reverse=True),
+                      "shuffled": shuffled}
+            for order, calendar in orders.items():
+                with self.subTest(testId=testId, order=order):
+                    # Caché fría: la lista resuelve por sí misma; caché llena por la lista: el formato en columnas la reutiliza
+                    schedule_cache.clear()
+                    response = client.post("/scheduler/logic/activity/", json=dict(input, calendar=calendar))
+                    self.assertEqual(response.status_code, columnar.status_code)
+                    self.assertEqual(response.json().get("solutions"), columnar.json().get("solutions"))
+                    self.assertEqual(client.post("/scheduler/logic/activity/columnar", json=columnar_input(input)).json().get("solutions"),
+                                     response.json().get("solutions"))
+
+    def test_columnar_days_without_start(self):
+        """87 Test: Sin fecha de inicio el calendario en columnas necesita exactamente 21 días, igual que la lista de días"""
+        input = load_json_input(5)
+        input["activity"]["startOfActivity"] = None
+        end = date.fromisoformat(input["activity"]["endOfActivity"])
+        for days, expected in ((21, 200), (22, 422), (30, 422)):
+            with self.subTest(days=days):
+                input["calendar"] = [{"calendarDate": (end + timedelta(days=3 - i)).isoformat(), "dayType": "Normal", "totalHoursBusy": 0} for i in range(days)]
+                self.assertEqual(client.post("/scheduler/logic/activity/", json=input).status_code == 422, expected == 422)
+                self.assertEqual(client.post("/scheduler/logic/activity/columnar", json=columnar_input(input)).status_code == 422, expected == 422)
 
 if __name__ == "__main__":
     unittest.main()